@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class ApiConfig(AppConfig):
+    """Класс конфигурации для хранения данных приложения."""
+
+    name = 'api'
@@ -0,0 +1,7 @@
+API_PAGE_SIZE = 20
+
+API_MAX_PAGE_SIZE = 1000
+
+API_REALM = 'yatube'
+
+API_AUTH_CACHE_TIMEOUT = 60
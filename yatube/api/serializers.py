@@ -0,0 +1,128 @@
+from posts.models import Comment, Follow, Group, Post, User
+
+
+def image_url(name):
+    """Адрес картинки поста в хранилище или None."""
+    if not name:
+        return None
+    return Post._meta.get_field('image').storage.url(name)
+
+
+class Serializer:
+    """
+    Представление модели в API поверх queryset.values().
+
+    fields - поля ответа и колонки, из которых они берутся (через
+    `__` для связанных моделей), relations - поля, которые можно
+    раскрыть (`?expand=`) во вложенный объект другого Serializer,
+    converters - преобразования значений колонок. Нужные колонки
+    выбираются одним запросом с JOIN, поэтому ни поля ответа,
+    ни раскрытие связей не дают N+1.
+    """
+
+    def __init__(self, model, fields, relations=None, converters=None):
+        self.model = model
+        self.fields = fields
+        self.relations = relations or {}
+        self.converters = converters or {}
+
+    def parse(self, fields=None, expand=None):
+        """
+        Поля ответа и раскрываемые связи из параметров `?fields=`
+        и `?expand=` (имена через запятую). Неизвестные имена -
+        ValueError.
+        """
+        chosen = [name for name in (fields or '').split(',') if name]
+        unknown = set(chosen) - set(self.fields)
+        if unknown:
+            raise ValueError(
+                f'Неизвестные поля: {", ".join(sorted(unknown))}'
+            )
+        expanded = {name for name in (expand or '').split(',') if name}
+        unknown = expanded - set(self.relations)
+        if unknown:
+            raise ValueError(
+                f'Нельзя раскрыть: {", ".join(sorted(unknown))}'
+            )
+        return chosen or list(self.fields), expanded
+
+    def columns(self, fields, expand, prefix=''):
+        """Колонки для values() под выбранные поля и связи."""
+        columns = []
+        for name in fields:
+            if name in expand:
+                nested = self.relations[name]
+                columns.extend(nested.columns(
+                    list(nested.fields), (), f'{prefix}{name}__'
+                ))
+            else:
+                columns.append(prefix + self.fields[name])
+        return columns
+
+    def represent(self, row, fields, expand, prefix=''):
+        """Словарь ответа из строки values()."""
+        result = {}
+        for name in fields:
+            if name in expand:
+                nested = self.relations[name]
+                key = f'{prefix}{name}__'
+                result[name] = None if row[key + 'id'] is None else (
+                    nested.represent(row, list(nested.fields), (), key)
+                )
+                continue
+            value = row[prefix + self.fields[name]]
+            convert = self.converters.get(name)
+            result[name] = convert(value) if convert else value
+        return result
+
+
+USER = Serializer(User, {
+    'id': 'id',
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+})
+
+GROUP = Serializer(Group, {
+    'id': 'id',
+    'title': 'title',
+    'slug': 'slug',
+    'description': 'description',
+    'posts_count': 'posts_count',
+})
+
+POST = Serializer(
+    Post,
+    {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+    },
+    relations={'author': USER, 'group': GROUP},
+    converters={'image': image_url},
+)
+
+COMMENT = Serializer(
+    Comment,
+    {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+    relations={'author': USER},
+)
+
+FOLLOW = Serializer(
+    Follow,
+    {
+        'id': 'id',
+        'user': 'user__username',
+        'author': 'author__username',
+    },
+    relations={'user': USER, 'author': USER},
+)
@@ -0,0 +1,250 @@
+import base64
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.crypto import salted_hmac
+
+from posts.models import Comment, Follow, Group, Post, User
+
+from . import views
+
+
+def read_json(response):
+    """Тело ответа как JSON."""
+    return json.loads(response.content)
+
+
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', password='secret-pass',
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {index}', author=cls.author, group=cls.group,
+            )
+            for index in range(5)
+        ]
+        cls.post = cls.posts[-1]
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def send(self, client, method, url, data=None, **extra):
+        return getattr(client, method)(
+            url, json.dumps(data or {}), content_type='application/json',
+            **extra,
+        )
+
+    def test_post_list_is_paginated_by_cursor(self):
+        """Список постов листается курсором от новых к старым."""
+        url = reverse('api:posts')
+        first = read_json(self.client.get(url, {'limit': 3}))
+        self.assertEqual(
+            [post['id'] for post in first['results']],
+            [post.pk for post in self.posts[::-1][:3]],
+        )
+        second = read_json(self.client.get(first['next']))
+        self.assertEqual(
+            [post['id'] for post in second['results']],
+            [post.pk for post in self.posts[::-1][3:]],
+        )
+        self.assertIsNone(second['next'])
+
+    def test_sparse_fields_and_expand(self):
+        """?fields= ограничивает поля, ?expand= раскрывает связи."""
+        response = self.client.get(reverse('api:posts'), {
+            'fields': 'id,author,group', 'expand': 'author', 'limit': 1,
+        })
+        post = read_json(response)['results'][0]
+        self.assertEqual(set(post), {'id', 'author', 'group'})
+        self.assertEqual(post['author']['username'], self.author.username)
+        self.assertEqual(post['group'], self.group.slug)
+
+        response = self.client.get(reverse('api:posts'), {'fields': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_expand_does_not_grow_queries(self):
+        """Раскрытие связей не добавляет запросов на каждый пост."""
+        url = reverse('api:posts')
+        params = {'expand': 'author,group'}
+        with self.assertNumQueries(1):
+            read_json(self.client.get(url, params))
+        Post.objects.create(text='Еще', author=self.reader, group=self.group)
+        with self.assertNumQueries(1):
+            results = read_json(self.client.get(url, params))['results']
+        self.assertEqual(len(results), len(self.posts) + 1)
+
+    def test_list_queries_are_counted(self):
+        """Запросы страницы списка выполняются внутри обработчика."""
+        response = self.client.get(reverse('api:posts'))
+        self.assertEqual(response['X-Query-Count'], '1')
+
+    def test_create_post(self):
+        """Пост создается от имени пользователя, группа - по slug."""
+        response = self.send(
+            self.author_client, 'post', reverse('api:posts'),
+            {'text': 'Новый пост', 'group': self.group.slug},
+        )
+        self.assertEqual(response.status_code, 201)
+        data = read_json(response)
+        self.assertEqual(data['author'], self.author.username)
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertTrue(Post.objects.filter(
+            pk=data['id'], author=self.author, text='Новый пост',
+        ).exists())
+
+        response = self.send(
+            self.author_client, 'post', reverse('api:posts'), {'text': ''},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', read_json(response)['detail'])
+
+    def basic(self, password):
+        token = base64.b64encode(f'author:{password}'.encode()).decode()
+        return {'HTTP_AUTHORIZATION': f'Basic {token}'}
+
+    def test_basic_authentication(self):
+        """Клиент без сессии входит по Authorization: Basic."""
+        basic = self.basic
+        url = reverse('api:posts')
+        response = self.send(
+            self.client, 'post', url, {'text': 'Basic'},
+            **basic('secret-pass'),
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.send(
+            self.client, 'post', url, {'text': 'Basic'}, **basic('wrong'),
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Basic', response['WWW-Authenticate'])
+        response = self.send(self.client, 'post', url, {'text': 'Anon'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_basic_check_is_cached(self):
+        """Пароль проверяется один раз, пока он не сменился."""
+        url = reverse('api:follows')
+        with mock.patch(
+            'api.views.authenticate', wraps=views.authenticate,
+        ) as check:
+            for _ in range(3):
+                response = self.client.get(url, **self.basic('secret-pass'))
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(check.call_count, 1)
+            author = User.objects.get(pk=self.author.pk)
+            digest = salted_hmac(
+                'api.basic', 'author:secret-pass'
+            ).hexdigest()
+            user_id, stamp = cache.get(views.AUTH_KEY.format(digest=digest))
+            self.assertEqual(user_id, author.pk)
+            self.assertNotIn(author.password, stamp)
+            author.set_password('new-pass')
+            author.save()
+            response = self.client.get(url, **self.basic('secret-pass'))
+            self.assertEqual(response.status_code, 401)
+
+    def test_session_requires_csrf(self):
+        """Изменяющий запрос с сессией без CSRF-токена отклоняется."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.author)
+        response = self.send(
+            client, 'post', reverse('api:posts'), {'text': 'No token'},
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_only_author_edits_post(self):
+        """Изменять и удалять пост может только автор."""
+        url = reverse('api:post_detail', args=[self.post.pk])
+        response = self.send(
+            self.reader_client, 'patch', url, {'text': 'Чужой'},
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(
+            self.reader_client.delete(url).status_code, 403
+        )
+
+        response = self.send(
+            self.author_client, 'patch', url, {'text': 'Исправлено'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(read_json(response)['group'], self.group.slug)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Исправлено')
+
+        self.assertEqual(self.author_client.delete(url).status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_comments(self):
+        """Комментарии создаются, читаются и правятся только автором."""
+        url = reverse('api:comments', args=[self.post.pk])
+        response = self.send(
+            self.reader_client, 'post', url, {'text': 'Комментарий'},
+        )
+        self.assertEqual(response.status_code, 201)
+        comment_id = read_json(response)['id']
+        results = read_json(self.client.get(url))['results']
+        self.assertEqual(
+            [(item['id'], item['author']) for item in results],
+            [(comment_id, self.reader.username)],
+        )
+        detail = reverse(
+            'api:comment_detail', args=[self.post.pk, comment_id]
+        )
+        response = self.send(
+            self.author_client, 'patch', detail, {'text': 'Чужой'},
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.reader_client.delete(detail).status_code, 204)
+        self.assertFalse(Comment.objects.filter(pk=comment_id).exists())
+
+    def test_follows(self):
+        """Подписка на автора, запрет подписки на себя и отписка."""
+        url = reverse('api:follows')
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'reader'},
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'author'},
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'author'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 1)
+
+        results = read_json(self.reader_client.get(
+            url, {'expand': 'author'}
+        ))['results']
+        self.assertEqual(results[0]['author']['id'], self.author.pk)
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        detail = reverse('api:follow_detail', args=['author'])
+        self.assertEqual(self.reader_client.delete(detail).status_code, 204)
+        self.assertEqual(self.reader_client.delete(detail).status_code, 404)
+
+    def test_groups_are_read_only(self):
+        """Группы только читаются."""
+        response = self.client.get(
+            reverse('api:group_detail', args=[self.group.slug])
+        )
+        self.assertEqual(read_json(response)['title'], self.group.title)
+        response = self.send(
+            self.author_client, 'post', reverse('api:groups'),
+        )
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET')
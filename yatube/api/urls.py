@@ -0,0 +1,25 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/posts/', views.posts, name='posts'),
+    path('v1/posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'v1/posts/<int:post_id>/comments/', views.comments, name='comments'
+    ),
+    path(
+        'v1/posts/<int:post_id>/comments/<int:comment_id>/',
+        views.comment_detail,
+        name='comment_detail'
+    ),
+    path('v1/groups/', views.groups, name='groups'),
+    path('v1/groups/<slug:slug>/', views.group_detail, name='group_detail'),
+    path('v1/follows/', views.follows, name='follows'),
+    path(
+        'v1/follows/<str:username>/', views.follow_detail,
+        name='follow_detail'
+    ),
+]
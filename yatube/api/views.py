@@ -0,0 +1,410 @@
+import base64
+import binascii
+import json
+from functools import wraps
+
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import get_object_or_404
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.views.decorators.csrf import csrf_exempt
+
+from core.queries import query_budget
+from posts.caching import get_group, get_post
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import CursorPaginator
+
+from .constants import (API_AUTH_CACHE_TIMEOUT, API_MAX_PAGE_SIZE,
+                        API_PAGE_SIZE, API_REALM)
+from .serializers import COMMENT, FOLLOW, GROUP, POST
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+AUTH_KEY = 'api:auth:{digest}'
+
+
+class ApiError(Exception):
+    """Ошибка запроса к API: код ответа и описание для клиента."""
+
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def error_response(status, detail):
+    response = json_response({'detail': detail}, status)
+    if status == 401:
+        response['WWW-Authenticate'] = f'Basic realm="{API_REALM}"'
+    return response
+
+
+def password_stamp(user):
+    """HMAC хеша пароля: меняется вместе с паролем, но не раскрывает его."""
+    return salted_hmac('api.basic.password', user.password).hexdigest()
+
+
+def basic_user(request, username, password):
+    """
+    Пользователь по имени и паролю из Authorization: Basic.
+
+    Проверка пароля (PBKDF2) дорогая, поэтому удачная проверка
+    запоминается в кеше на API_AUTH_CACHE_TIMEOUT по HMAC пары
+    имя:пароль на SECRET_KEY. Вместе с id хранится HMAC хеша пароля,
+    а не сам хеш: после смены пароля запись перестает подходить.
+    """
+    digest = salted_hmac('api.basic', f'{username}:{password}').hexdigest()
+    key = AUTH_KEY.format(digest=digest)
+    found = cache.get(key)
+    if found is not None:
+        user_id, stamp = found
+        user = User.objects.filter(pk=user_id, is_active=True).first()
+        if user is not None and constant_time_compare(
+            password_stamp(user), stamp
+        ):
+            return user
+    user = authenticate(request, username=username, password=password)
+    if user is not None:
+        cache.set(key, (user.pk, password_stamp(user)), API_AUTH_CACHE_TIMEOUT)
+    return user
+
+
+def authenticate_request(request):
+    """
+    Пользователь запроса: по сессии сайта, а без нее - по заголовку
+    Authorization: Basic. Для сессии изменяющие запросы проверяются
+    на CSRF, как формы сайта; с Basic cookie не используются и
+    проверка не нужна.
+    """
+    if request.user.is_authenticated:
+        if request.method not in SAFE_METHODS:
+            check = CsrfViewMiddleware()
+            check.process_request(request)
+            if check.process_view(request, None, (), {}) is not None:
+                raise ApiError(403, 'Запрос с сессией требует CSRF-токен.')
+        return request.user
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header.startswith('Basic '):
+        try:
+            username, _, password = base64.b64decode(
+                header[len('Basic '):]
+            ).decode().partition(':')
+        except (binascii.Error, UnicodeDecodeError):
+            raise ApiError(401, 'Неверный заголовок Authorization.')
+        user = basic_user(request, username, password)
+        if user is None:
+            raise ApiError(401, 'Неверное имя пользователя или пароль.')
+        return user
+    return request.user
+
+
+def api_view(*methods):
+    """
+    Декоратор обработчика API: допустимые методы, аутентификация
+    (см. authenticate_request) и ошибки в виде JSON {"detail": ...}.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in methods:
+                response = error_response(405, 'Метод не поддерживается.')
+                response['Allow'] = ', '.join(methods)
+                return response
+            try:
+                request.user = authenticate_request(request)
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                return error_response(error.status, error.detail)
+            except Http404:
+                return error_response(404, 'Не найдено.')
+        return wrapped
+    return decorator
+
+
+def require_user(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна аутентификация.')
+    return request.user
+
+
+def request_data(request):
+    """
+    Данные запроса: тело JSON, а для POST еще и обычная форма
+    (multipart - чтобы загрузить картинку поста).
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body.decode() or '{}')
+        except (ValueError, UnicodeDecodeError):
+            raise ApiError(400, 'Тело запроса - не JSON.')
+        if not isinstance(data, dict):
+            raise ApiError(400, 'Тело запроса должно быть объектом JSON.')
+        return data, None
+    if request.method == 'POST':
+        return request.POST.dict(), request.FILES
+    raise ApiError(415, 'Поддерживается только application/json.')
+
+
+def form_errors(form):
+    return {field: list(errors) for field, errors in form.errors.items()}
+
+
+def representation(request, serializer):
+    """Поля ответа и раскрываемые связи из `?fields=` и `?expand=`."""
+    try:
+        return serializer.parse(
+            request.GET.get('fields'), request.GET.get('expand')
+        )
+    except ValueError as error:
+        raise ApiError(400, str(error))
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, 'limit должен быть числом.')
+    if not 1 <= limit <= API_MAX_PAGE_SIZE:
+        raise ApiError(400, f'limit должен быть от 1 до {API_MAX_PAGE_SIZE}.')
+    return limit
+
+
+def next_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def list_response(request, queryset, serializer, ordering):
+    """
+    Страница списка курсором `?cursor=` размером `?limit=`:
+    {"results": [...], "next": адрес следующей страницы или null}.
+    Страница читается и сериализуется внутри обработчика, чтобы
+    запросы попали в бюджет и маршрутизацию на реплики.
+    """
+    fields, expand = representation(request, serializer)
+    limit = page_size(request)
+    keys = [name.lstrip('-') for name in ordering]
+    columns = serializer.columns(fields, expand)
+    rows = queryset.values(*dict.fromkeys(columns + keys))
+    paginator = CursorPaginator(rows, limit, ordering)
+    page = paginator.page(request.GET.get('cursor'))
+    return json_response({
+        'results': [
+            serializer.represent(row, fields, expand) for row in page
+        ],
+        'next': next_url(request, paginator.next_cursor),
+    })
+
+
+def object_response(request, queryset, serializer, status=200):
+    """Один объект из queryset в представлении serializer."""
+    fields, expand = representation(request, serializer)
+    row = queryset.values(*serializer.columns(fields, expand)).first()
+    if row is None:
+        raise Http404
+    return json_response(serializer.represent(row, fields, expand), status)
+
+
+def post_form_data(data, post=None):
+    """
+    Данные для PostForm: группа в API задается slug, а при PATCH
+    не переданные поля берутся из поста.
+    """
+    values = {'text': post.text, 'group': post.group_id} if post else {}
+    values.update(data)
+    slug = data.get('group')
+    if slug:
+        values['group'] = Group.objects.filter(slug=slug).values_list(
+            'pk', flat=True
+        ).first()
+        if values['group'] is None:
+            raise ApiError(400, {'group': ['Группа не найдена.']})
+    return values
+
+
+def author_only(request, obj, message):
+    """Изменять и удалять объект может только его автор."""
+    user = require_user(request)
+    if obj.author_id != user.pk:
+        raise ApiError(403, message)
+    return user
+
+
+def save_post(request, form, status):
+    if not form.is_valid():
+        raise ApiError(400, form_errors(form))
+    post = form.save(commit=False)
+    post.author = request.user
+    with transaction.atomic():
+        post.save()
+    return object_response(request, Post.objects.filter(pk=post.pk), POST,
+                           status)
+
+
+@query_budget(20)
+@api_view('GET', 'POST')
+def posts(request):
+    """
+    Список постов от новых к старым (`?author=` - имя автора,
+    `?group=` - slug группы) и создание поста.
+    """
+    if request.method == 'POST':
+        require_user(request)
+        data, files = request_data(request)
+        return save_post(
+            request, PostForm(post_form_data(data), files=files), 201
+        )
+    queryset = Post.objects.all()
+    if request.GET.get('author'):
+        queryset = queryset.filter(author__username=request.GET['author'])
+    if request.GET.get('group'):
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    return list_response(request, queryset, POST, ('-pub_date', '-id'))
+
+
+@query_budget(14)
+@api_view('GET', 'PUT', 'PATCH', 'DELETE')
+def post_detail(request, post_id):
+    """Пост; изменять и удалять его может только автор."""
+    if request.method in SAFE_METHODS:
+        post = get_post(post_id)
+        return object_response(request, Post.objects.filter(pk=post.pk), POST)
+    # Изменения - только над постом из базы, а не из кеша.
+    post = get_object_or_404(Post, pk=post_id)
+    author_only(request, post, 'Изменять пост может только автор.')
+    if request.method == 'DELETE':
+        with transaction.atomic():
+            post.delete()
+        return HttpResponse(status=204)
+    data, files = request_data(request)
+    form = PostForm(
+        post_form_data(data, post if request.method == 'PATCH' else None),
+        files=files,
+        instance=post,
+    )
+    return save_post(request, form, 200)
+
+
+@query_budget(10)
+@api_view('GET', 'POST')
+def comments(request, post_id):
+    """Комментарии к посту от новых к старым и новый комментарий."""
+    post = get_post(post_id)
+    if request.method == 'POST':
+        user = require_user(request)
+        data, _ = request_data(request)
+        form = CommentForm(data)
+        if not form.is_valid():
+            raise ApiError(400, form_errors(form))
+        comment = form.save(commit=False)
+        comment.author = user
+        comment.post = post
+        with transaction.atomic():
+            comment.save()
+        return object_response(
+            request, Comment.objects.filter(pk=comment.pk), COMMENT, 201
+        )
+    return list_response(
+        request, Comment.objects.filter(post_id=post.pk), COMMENT,
+        ('-created', '-id'),
+    )
+
+
+@query_budget(10)
+@api_view('GET', 'PUT', 'PATCH', 'DELETE')
+def comment_detail(request, post_id, comment_id):
+    """Комментарий; изменять и удалять его может только автор."""
+    comment = Comment.objects.filter(post_id=post_id, pk=comment_id).first()
+    if comment is None:
+        raise Http404
+    if request.method in SAFE_METHODS:
+        return object_response(
+            request, Comment.objects.filter(pk=comment.pk), COMMENT
+        )
+    author_only(request, comment, 'Изменять комментарий может только автор.')
+    if request.method == 'DELETE':
+        with transaction.atomic():
+            comment.delete()
+        return HttpResponse(status=204)
+    data, _ = request_data(request)
+    form = CommentForm(data, instance=comment)
+    if not form.is_valid():
+        raise ApiError(400, form_errors(form))
+    with transaction.atomic():
+        form.save()
+    return object_response(
+        request, Comment.objects.filter(pk=comment.pk), COMMENT
+    )
+
+
+@query_budget(4)
+@api_view('GET')
+def groups(request):
+    """Список групп."""
+    return list_response(request, Group.objects.all(), GROUP, ('id',))
+
+
+@query_budget(4)
+@api_view('GET')
+def group_detail(request, slug):
+    """Группа по slug."""
+    group = get_group(slug)
+    return object_response(request, Group.objects.filter(pk=group.pk), GROUP)
+
+
+@query_budget(16)
+@api_view('GET', 'POST')
+def follows(request):
+    """
+    Подписки текущего пользователя и новая подписка: {"author": имя}.
+    Подписаться на самого себя нельзя; повторная подписка
+    возвращает существующую.
+    """
+    user = require_user(request)
+    if request.method == 'GET':
+        return list_response(
+            request, Follow.objects.filter(user=user), FOLLOW, ('-id',)
+        )
+    data, _ = request_data(request)
+    author = User.objects.filter(username=data.get('author') or '').first()
+    if author is None:
+        raise ApiError(400, {'author': ['Автор не найден.']})
+    if author == user:
+        raise ApiError(400, {'author': ['Нельзя подписаться на себя.']})
+    with transaction.atomic():
+        follow, created = Follow.objects.get_or_create(
+            user=user, author=author,
+        )
+    return object_response(
+        request, Follow.objects.filter(pk=follow.pk), FOLLOW,
+        201 if created else 200,
+    )
+
+
+@query_budget(12)
+@api_view('GET', 'DELETE')
+def follow_detail(request, username):
+    """Подписка текущего пользователя на автора и отписка."""
+    user = require_user(request)
+    following = Follow.objects.filter(user=user, author__username=username)
+    if request.method == 'GET':
+        return object_response(request, following, FOLLOW)
+    with transaction.atomic():
+        deleted, _ = following.delete()
+    if not deleted:
+        raise Http404
+    return HttpResponse(status=204)
@@ -0,0 +1,110 @@
+import time
+
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+Database = base.Database
+
+# Профили настроек SQLite: stock - поведение Django по умолчанию
+# (журнал отката, отложенные транзакции), tuned - для нескольких
+# воркеров: WAL, ожидание блокировки, транзакции BEGIN IMMEDIATE
+# и повтор запросов, получивших "database is locked".
+SQLITE_PROFILES = {
+    'stock': {
+        'pragmas': {'journal_mode': 'DELETE'},
+        'immediate': False,
+        'retries': 0,
+    },
+    'tuned': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -64000,
+            'mmap_size': 268435456,
+            'busy_timeout': 5000,
+            'temp_store': 'MEMORY',
+        },
+        'immediate': True,
+        'retries': 5,
+    },
+}
+
+RETRY_DELAY = 0.05
+
+
+def profile():
+    """
+    Профиль из settings.SQLITE_PROFILE; прагмы из settings.SQLITE_PRAGMAS
+    дополняют и переопределяют прагмы профиля.
+    """
+    chosen = SQLITE_PROFILES[getattr(settings, 'SQLITE_PROFILE', 'stock')]
+    pragmas = {
+        **chosen['pragmas'], **getattr(settings, 'SQLITE_PRAGMAS', {}),
+    }
+    return {**chosen, 'pragmas': pragmas}
+
+
+def is_locked(error):
+    return 'database is locked' in str(error)
+
+
+class RetryingCursorWrapper(base.SQLiteCursorWrapper):
+    """
+    Курсор, повторяющий с растущей паузой запрос, получивший
+    "database is locked". Повторяются только запросы вне транзакции:
+    внутри нее прерванный запрос мог оставить транзакцию неполной.
+    """
+
+    retries = 0
+
+    def _retry(self, method, *args):
+        for attempt in range(self.retries + 1):
+            try:
+                return method(self, *args)
+            except Database.OperationalError as error:
+                if (attempt == self.retries or not is_locked(error)
+                        or self.connection.in_transaction):
+                    raise
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+
+    def execute(self, query, params=None):
+        return self._retry(base.SQLiteCursorWrapper.execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(
+            base.SQLiteCursorWrapper.executemany, query, param_list
+        )
+
+
+class DatabaseFeatures(base.DatabaseFeatures):
+    # Оконные функции есть в SQLite с 3.25, Django 2.2 их не включает.
+    supports_over_clause = Database.sqlite_version_info >= (3, 25, 0)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Бэкенд SQLite с профилем настроек: прагмы выполняются при каждом
+    новом соединении, в профиле tuned транзакции открываются через
+    BEGIN IMMEDIATE - блокировка на запись берется сразу и ожидается
+    по busy_timeout, а не падает при попытке записи посреди транзакции.
+    """
+
+    features_class = DatabaseFeatures
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        self.profile = profile()
+        for name, value in self.profile['pragmas'].items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=RetryingCursorWrapper)
+        cursor.retries = self.profile['retries']
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        if self.profile['immediate']:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
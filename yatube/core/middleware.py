@@ -0,0 +1,85 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .queries import QueryBudgetExceeded, QueryRecorder, record_view
+from .routers import (REPLICA_PIN_COOKIE, pick_replica, replica_aliases,
+                      use_replica)
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Промежуточный слой, который считает SQL-запросы каждого запроса.
+
+    Число запросов, их суммарное время и число дублей отдаются
+    в заголовках X-Query-Count, X-Query-Time-Ms и X-Query-Duplicates
+    и попадают в скользящую сводку по имени представления.
+    Превышение бюджета @query_budget пишется в журнал, а при
+    settings.QUERY_BUDGET_STRICT приводит к исключению.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        response['X-Query-Count'] = recorder.count
+        response['X-Query-Time-Ms'] = f'{recorder.total_time * 1000:.1f}'
+        response['X-Query-Duplicates'] = recorder.duplicates
+        match = request.resolver_match
+        if match is None:
+            return response
+
+        record_view(match.view_name, recorder)
+        budget = getattr(match.func, 'query_budget', None)
+        if budget is not None and recorder.count > budget:
+            message = (
+                f'{match.view_name}: {recorder.count} SQL-запросов '
+                f'при бюджете {budget}'
+            )
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    Промежуточный слой для чтения из реплик.
+
+    Безопасные запросы (GET, HEAD, OPTIONS) читают из одной случайной
+    реплики на весь запрос. После изменяющего запроса пользователь
+    получает cookie на settings.DATABASE_REPLICA_PIN_SECONDS секунд и
+    до ее истечения читает основную базу: так он видит свои записи,
+    пока реплики догоняют.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        replica = None
+        if safe and REPLICA_PIN_COOKIE not in request.COOKIES:
+            replica = pick_replica()
+        with use_replica(replica):
+            response = self.get_response(request)
+        if not safe and replica_aliases():
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1',
+                max_age=getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
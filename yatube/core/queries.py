@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from functools import wraps
+
+QUERY_STATS_WINDOW = 100
+
+_summary = defaultdict(lambda: deque(maxlen=QUERY_STATS_WINDOW))
+_summary_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше запросов, чем позволяет бюджет."""
+
+
+class QueryRecorder:
+    """Обертка execute_wrapper: считает запросы, их время и дубли."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total_time += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Сколько раз повторялся уже выполненный шаблон SQL (признак N+1)."""
+        return sum(
+            count - 1 for count in self.statements.values() if count > 1
+        )
+
+
+def query_budget(limit):
+    """
+    Декоратор: допустимое число SQL-запросов представления.
+    Проверяется QueryInstrumentationMiddleware.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            return view(*args, **kwargs)
+        wrapped.query_budget = limit
+        return wrapped
+    return decorator
+
+
+def record_view(view_name, recorder):
+    """Добавляет замер запроса в скользящую сводку по представлениям."""
+    with _summary_lock:
+        _summary[view_name].append(
+            (recorder.count, recorder.total_time, recorder.duplicates)
+        )
+
+
+def view_summary():
+    """Средние и максимальные показатели последних запросов представлений."""
+    with _summary_lock:
+        samples = {name: list(rows) for name, rows in _summary.items()}
+    summary = {}
+    for name, rows in samples.items():
+        counts, times, duplicates = zip(*rows)
+        summary[name] = {
+            'requests': len(rows),
+            'queries_avg': sum(counts) / len(rows),
+            'queries_max': max(counts),
+            'time_ms_avg': sum(times) / len(rows) * 1000,
+            'time_ms_max': max(times) * 1000,
+            'duplicates_max': max(duplicates),
+        }
+
+    return summary
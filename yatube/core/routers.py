@@ -0,0 +1,75 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+_state = threading.local()
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def current_replica():
+    """Реплика, выбранная для текущего запроса, или None."""
+    return getattr(_state, 'replica', None)
+
+
+@contextmanager
+def use_replica(alias):
+    """
+    Разрешает читать из реплики alias внутри блока. Первая запись
+    в блоке переключает оставшиеся чтения на основную базу.
+    """
+    saved = current_replica()
+    _state.replica = alias
+    try:
+        yield
+    finally:
+        _state.replica = saved
+
+
+@contextmanager
+def use_primary():
+    """Все чтения внутри блока - из основной базы."""
+    with use_replica(None):
+        yield
+
+
+class PrimaryReplicaRouter:
+    """
+    Роутер основной базы и реплик для чтения.
+
+    Пишет всегда в основную базу (default). Модели приложений из
+    settings.DATABASE_REPLICA_APPS читаются из реплики только внутри
+    use_replica (его включает ReplicaPinningMiddleware для безопасных
+    запросов); команды, фоновые задачи и запросы после записи читают
+    основную базу, поэтому видят свои изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = current_replica()
+        apps = getattr(settings, 'DATABASE_REPLICA_APPS', ('posts',))
+        if replica is not None and model._meta.app_label in apps:
+            return replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.replica = None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replica_aliases()
+
+
+def pick_replica():
+    """Случайная реплика из settings.DATABASE_REPLICAS или None."""
+    replicas = replica_aliases()
+    return random.choice(replicas) if replicas else None
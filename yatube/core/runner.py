@@ -0,0 +1,20 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class StrictQueryBudgetRunner(DiscoverRunner):
+    """
+    Запуск тестов со строгими бюджетами запросов.
+
+    Любое превышение @query_budget во время тестов становится
+    исключением QueryBudgetExceeded, а не записью в журнал.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._strict_budgets = override_settings(QUERY_BUDGET_STRICT=True)
+        self._strict_budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._strict_budgets.disable()
+        super().teardown_test_environment(**kwargs)
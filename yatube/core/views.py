@@ -1,5 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from .queries import view_summary
+
 
 def page_not_found(request, exception):
     """Функция для обработки пользовательской страницы 404."""
@@ -18,3 +22,9 @@ def internal_server_error(request):
     return render(
         request, 'core/500.html', {'path': request.path}, status=500
     )
+
+
+@staff_member_required
+def query_summary(request):
+    """Сводка SQL-запросов по представлениям для сотрудников."""
+    return JsonResponse(view_summary())
@@ -1,10 +1,131 @@
+import hashlib
+
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models import QuerySet
+
+from .constants import ADMIN_FACETS_CACHE_TIMEOUT
+from .models import AuthorStats, Group, Post, Comment, Follow
+from .paginators import EstimatedCountPaginator
+
+
+class FacetQuerySet(QuerySet):
+    """
+    QuerySet списка админки, который кеширует запросы иерархии дат:
+    границы дат (aggregate) и списки годов, месяцев и дней (dates).
+    """
+
+    def _cached(self, queryset, suffix, compute):
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return compute()
+        key = 'admin_facets:' + hashlib.md5(
+            f'{queryset.db}:{sql}:{params}:{suffix}'.encode()
+        ).hexdigest()
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            cache.set(key, value, ADMIN_FACETS_CACHE_TIMEOUT)
+        return value
+
+    def aggregate(self, *args, **kwargs):
+        return self._cached(
+            self.order_by(), f'aggregate:{args}:{kwargs}',
+            lambda: super(FacetQuerySet, self).aggregate(*args, **kwargs),
+        )
+
+    def dates(self, field_name, kind, order='ASC'):
+        return self._cached(
+            self.order_by(), f'dates:{field_name}:{kind}:{order}',
+            lambda: list(super(FacetQuerySet, self).dates(
+                field_name, kind, order
+            )),
+        )
+
+
+class FacetChangeList(ChangeList):
+    """Список админки с кешированной иерархией дат."""
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return FacetQuerySet(
+            model=queryset.model, query=queryset.query,
+            using=queryset._db, hints=queryset._hints,
+        )
+
+
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """
+    Автодополнение, которое подписывает выбранное значение уже
+    загруженным объектом (`loaded`), а не запросом на каждую строку.
+    """
+
+    loaded = None
+
+    def optgroups(self, name, value, attr=None):
+        loaded = self.loaded
+        selected = [str(item) for item in value if item not in ('', None)]
+        if loaded is None or selected != [str(loaded.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, loaded.pk, self.choices.field.label_from_instance(loaded),
+            True, len(options),
+        ))
+        return [(None, options, 0)]
 
-from .models import Group, Post, Comment, Follow
+
+class LoadedRelationsForm(forms.ModelForm):
+    """
+    Форма строки списка: виджетам автодополнения передаются связанные
+    объекты, загруженные через list_select_related.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, LoadedAutocompleteSelect):
+                widget.loaded = getattr(self.instance, name, None)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Базовые настройки списков для больших таблиц: счетчик записей
+    из кеша без второго COUNT(*) по всей таблице, кешированная
+    иерархия дат и автодополнение без запроса на каждую строку.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return FacetChangeList
+
+    def get_changelist_form(self, request, **kwargs):
+        return super().get_changelist_form(
+            request, form=LoadedRelationsForm, **kwargs
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if ('widget' not in kwargs
+                and db_field.name in self.get_autocomplete_fields(request)):
+            kwargs['widget'] = LoadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     """
     Класс для настройки отображения модели Post
     в админ-панели через декоратор.
@@ -12,8 +133,11 @@ class PostAdmin(admin.ModelAdmin):
 
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
 
 
@@ -25,16 +149,21 @@ class GroupAdmin(admin.ModelAdmin):
     """
 
     list_display = ('title', 'slug', 'description')
+    search_fields = ('title', 'slug')
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     """
     Класс для настройки отображения модели Comment
     в админ-панели через декоратор.
     """
 
     list_display = ('post', 'author', 'text', 'created')
+    list_select_related = ('post', 'author')
+    raw_id_fields = ('post',)
+    autocomplete_fields = ('author',)
+    date_hierarchy = 'created'
 
 
 @admin.register(Follow)
@@ -45,3 +174,20 @@ class FollowAdmin(admin.ModelAdmin):
     """
 
     list_display = ('author', 'user')
+    list_select_related = ('author', 'user')
+    autocomplete_fields = ('author', 'user')
+
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    """
+    Класс для настройки отображения модели AuthorStats
+    в админ-панели через декоратор.
+    """
+
+    list_display = (
+        'author', 'posts_count', 'followers_count',
+        'following_count', 'comments_count',
+    )
+    list_select_related = ('author',)
+    readonly_fields = list_display
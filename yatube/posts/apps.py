@@ -5,3 +5,6 @@ class PostsConfig(AppConfig):
     """Класс конфигурации для хранения данных приложения."""
 
     name = 'posts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,408 @@
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.parse
+import urllib.request
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import (DEFAULT_DB_ALIAS, OperationalError,
+                       close_old_connections, connections, transaction)
+from django.db.models import Count
+from django.middleware.csrf import _get_new_csrf_token
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.backends.sqlite3.base import is_locked
+
+from .constants import (BENCHMARK_FOLLOWS, BENCHMARK_MIN_DELTA_KB,
+                        BENCHMARK_MIN_DELTA_MS, BENCHMARK_REPEATS,
+                        POSTS_PER_PAGE)
+from .models import Comment, Follow, Group, Post, User
+
+BENCHMARK_USERNAME = 'benchmark'
+
+VIEWS = (
+    'index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+    'post_create', 'add_comment',
+)
+
+
+class Target:
+    """Запрос к одному обработчику и ожидаемый код ответа."""
+
+    def __init__(self, view, url, data=None):
+        self.view = view
+        self.url = url
+        self.data = data
+        self.method = 'POST' if data is not None else 'GET'
+        self.expected_status = 302 if data is not None else 200
+
+
+def benchmark_user():
+    """
+    Пользователь, от имени которого идут запросы. Подписывается на
+    самых популярных авторов, чтобы лента подписок не была пустой.
+    """
+    user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+    authors = Follow.objects.order_by().values('author').annotate(
+        followers=Count('pk')
+    ).order_by('-followers').values_list('author', flat=True)
+    for author_id in authors[:BENCHMARK_FOLLOWS]:
+        if author_id != user.pk:
+            Follow.objects.get_or_create(user=user, author_id=author_id)
+    return user
+
+
+def targets(user):
+    """Запросы ко всем обработчикам на данных из базы."""
+    post = Post.objects.order_by().annotate(
+        comments_total=Count('comments')
+    ).order_by('-comments_total', '-pk').select_related('author').first()
+    if post is None:
+        post = Post.objects.create(author=user, text='Benchmark post')
+    group = Group.objects.order_by('-posts_count').first()
+    if group is None:
+        group = Group.objects.create(
+            title='Benchmark', slug='benchmark', description='Benchmark',
+        )
+    found = {
+        'index': Target('index', reverse('posts:index')),
+        'group_posts': Target('group_posts', reverse(
+            'posts:group_list', args=[group.slug]
+        )),
+        'profile': Target('profile', reverse(
+            'posts:profile', args=[post.author.username]
+        )),
+        'post_detail': Target('post_detail', reverse(
+            'posts:post_detail', args=[post.pk]
+        )),
+        'follow_index': Target('follow_index', reverse('posts:follow_index')),
+        'post_create': Target(
+            'post_create', reverse('posts:post_create'),
+            {'text': 'Benchmark post', 'group': group.pk},
+        ),
+        'add_comment': Target(
+            'add_comment', reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'Benchmark comment'},
+        ),
+    }
+    return [found[view] for view in VIEWS]
+
+
+class ClientRunner:
+    """Запросы через тестовый клиент Django в том же процессе."""
+
+    mode = 'client'
+
+    def __init__(self, user):
+        self.client = Client(SERVER_NAME='localhost')
+        self.client.force_login(user)
+
+    def request(self, target):
+        if target.method == 'POST':
+            response = self.client.post(target.url, target.data)
+        else:
+            response = self.client.get(target.url)
+        return response.status_code, response.get('X-Query-Count')
+
+    def close(self):
+        pass
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ServerRunner:
+    """
+    Запросы по HTTP к настоящему WSGI-серверу (wsgiref) в отдельном
+    потоке. Сессия берется у тестового клиента, CSRF-токен передается
+    в cookie и заголовке, как это делает браузер.
+    """
+
+    mode = 'server'
+
+    def __init__(self, user):
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(user)
+        self.csrf_token = _get_new_csrf_token()
+        self.cookie = '; '.join((
+            f'{settings.SESSION_COOKIE_NAME}='
+            f'{client.cookies[settings.SESSION_COOKIE_NAME].value}',
+            f'{settings.CSRF_COOKIE_NAME}={self.csrf_token}',
+        ))
+        self.server = make_server(
+            '127.0.0.1', 0, WSGIHandler(), handler_class=QuietHandler,
+        )
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True,
+        )
+        self.thread.start()
+        self.opener = urllib.request.build_opener(NoRedirect)
+
+    def request(self, target):
+        data = None
+        headers = {'Cookie': self.cookie}
+        if target.method == 'POST':
+            data = urllib.parse.urlencode(target.data).encode()
+            headers['X-CSRFToken'] = self.csrf_token
+        request = urllib.request.Request(
+            self.base_url + target.url, data=data, headers=headers,
+        )
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                return response.status, response.headers['X-Query-Count']
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code, error.headers['X-Query-Count']
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        connections.close_all()
+
+
+def percentile(values, share):
+    """Значение, не меньше которого доля share отсортированных значений."""
+    ordered = sorted(values)
+    index = min(int(round(share * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def sample(runner, target, requests):
+    """Задержки requests запросов в мс и числа запросов к базе."""
+    latencies, query_counts = [], []
+    for _ in range(requests):
+        started = time.perf_counter()
+        status, query_count = runner.request(target)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status != target.expected_status:
+            raise RuntimeError(
+                f'{target.view}: ответ {status} вместо '
+                f'{target.expected_status}'
+            )
+        if query_count is not None:
+            query_counts.append(int(query_count))
+    return latencies, query_counts
+
+
+def measure(runner, target, requests, warmup, repeats=BENCHMARK_REPEATS):
+    """
+    Задержки p50/p95 и число запросов к базе: repeats серий по
+    requests запросов после warmup прогревочных, в результат идут
+    медианы p50 и p95 серий, а разброс p95 между сериями сохраняется
+    как мера шума (см. compare). Пик памяти - отдельным проходом с
+    tracemalloc, чтобы трассировка не искажала задержки.
+    """
+    for _ in range(warmup):
+        runner.request(target)
+    p50s, p95s, query_counts = [], [], []
+    for _ in range(repeats):
+        latencies, counts = sample(runner, target, requests)
+        p50s.append(percentile(latencies, 0.5))
+        p95s.append(percentile(latencies, 0.95))
+        query_counts.extend(counts)
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(min(requests, 3)):
+            tracemalloc.reset_peak()
+            runner.request(target)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    return {
+        'requests': requests,
+        'repeats': repeats,
+        'p50_ms': round(statistics.median(p50s), 2),
+        'p95_ms': round(statistics.median(p95s), 2),
+        'p95_spread_ms': round(max(p95s) - min(p95s), 2),
+        'queries': max(query_counts) if query_counts else None,
+        'memory_kb': round(max(peaks) / 1024, 1),
+    }
+
+
+def run(mode, requests, warmup, views=VIEWS, repeats=BENCHMARK_REPEATS):
+    """Прогоняет обработчики и возвращает результаты в виде словаря."""
+    user = benchmark_user()
+    runner = (ServerRunner if mode == 'server' else ClientRunner)(user)
+    try:
+        results = {
+            target.view: measure(runner, target, requests, warmup, repeats)
+            for target in targets(user) if target.view in views
+        }
+    finally:
+        runner.close()
+    return {
+        'mode': runner.mode,
+        'posts': Post.objects.count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'views': results,
+    }
+
+
+def _grew(current, saved, threshold, min_delta):
+    return current > saved * (1 + threshold) and current - saved >= min_delta
+
+
+def compare(results, baseline, threshold):
+    """
+    Регрессии относительно базовой линии того же режима: рост медианы
+    p95 и памяти больше чем на долю threshold и любой рост числа
+    запросов к базе. Чтобы не ловить шум, рост p95 должен быть не
+    меньше BENCHMARK_MIN_DELTA_MS и разброса p95 между сериями в обоих
+    замерах, рост памяти - не меньше BENCHMARK_MIN_DELTA_KB.
+    """
+    regressions = []
+    saved_views = baseline.get(results['mode'], {}).get('views', {})
+    for view, current in results['views'].items():
+        saved = saved_views.get(view)
+        if not saved:
+            continue
+        p95, saved_p95 = current['p95_ms'], saved['p95_ms']
+        noise = max(
+            BENCHMARK_MIN_DELTA_MS,
+            current.get('p95_spread_ms', 0) + saved.get('p95_spread_ms', 0),
+        )
+        if _grew(p95, saved_p95, threshold, noise):
+            regressions.append(f'{view}: p95 {saved_p95} -> {p95} мс')
+        if _grew(current['memory_kb'], saved['memory_kb'], threshold,
+                 BENCHMARK_MIN_DELTA_KB):
+            regressions.append(
+                f'{view}: память {saved["memory_kb"]} -> '
+                f'{current["memory_kb"]} КБ'
+            )
+        if (current['queries'] is not None and saved['queries'] is not None
+                and current['queries'] > saved['queries']):
+            regressions.append(
+                f'{view}: запросов {saved["queries"]} -> {current["queries"]}'
+            )
+    return regressions
+
+
+def load_baseline(path):
+    """Базовые линии по режимам: {"client": {...}, "server": {...}}."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)
+
+
+def save_baseline(path, results):
+    """Записывает результаты как базовую линию своего режима."""
+    baseline = load_baseline(path)
+    baseline[results['mode']] = results
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump(baseline, stream, ensure_ascii=False, indent=2)
+        stream.write('\n')
+
+
+# Настройки до и после: профиль SQLite и CONN_MAX_AGE (None - из
+# settings.DATABASES).
+CONCURRENCY_SETUPS = {
+    'stock': ('stock', 0),
+    'tuned': ('tuned', None),
+}
+
+
+def _concurrency_worker(operations, write_share, user_id, post_ids, seed,
+                        stats, latencies):
+    rng = random.Random(seed)
+    try:
+        for _ in range(operations):
+            started = time.perf_counter()
+            try:
+                if rng.random() < write_share:
+                    with transaction.atomic():
+                        post = Post.objects.get(pk=rng.choice(post_ids))
+                        Comment.objects.create(
+                            post=post, author_id=user_id,
+                            text='Benchmark comment',
+                        )
+                else:
+                    list(Post.objects.select_related('author', 'group')[
+                        :POSTS_PER_PAGE
+                    ])
+            except OperationalError as error:
+                stats['locked' if is_locked(error) else 'errors'] += 1
+            else:
+                stats['ok'] += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                close_old_connections()
+    finally:
+        connections.close_all()
+
+
+def concurrency(setup, workers, operations, write_share, seed=0):
+    """
+    Нагрузка из workers потоков, у каждого свое соединение, как у
+    воркеров gunicorn: operations операций на поток, доля write_share -
+    чтение поста и комментарий к нему в одной транзакции, остальные -
+    чтение ленты. После каждой операции соединение закрывается по
+    правилам CONN_MAX_AGE, как в конце запроса.
+    """
+    profile, conn_max_age = CONCURRENCY_SETUPS[setup]
+    user = benchmark_user()
+    post_ids = list(Post.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    )[:100]) or [Post.objects.create(author=user, text='Benchmark post').pk]
+    settings_dict = connections.databases[DEFAULT_DB_ALIAS]
+    saved = settings_dict['CONN_MAX_AGE']
+    connections.close_all()
+    stats = [{'ok': 0, 'locked': 0, 'errors': 0} for _ in range(workers)]
+    latencies = [[] for _ in range(workers)]
+    with override_settings(SQLITE_PROFILE=profile):
+        if conn_max_age is not None:
+            settings_dict['CONN_MAX_AGE'] = conn_max_age
+        try:
+            # Режим журнала переключается одним соединением до старта.
+            connections[DEFAULT_DB_ALIAS].ensure_connection()
+            threads = [
+                threading.Thread(target=_concurrency_worker, args=(
+                    operations, write_share, user.pk, post_ids, seed + index,
+                    stats[index], latencies[index],
+                ))
+                for index in range(workers)
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            seconds = time.perf_counter() - started
+        finally:
+            settings_dict['CONN_MAX_AGE'] = saved
+            connections.close_all()
+    total = {
+        key: sum(worker[key] for worker in stats)
+        for key in ('ok', 'locked', 'errors')
+    }
+    merged = [value for worker in latencies for value in worker]
+    return {
+        'setup': setup,
+        'workers': workers,
+        'operations': workers * operations,
+        **total,
+        'locked_share': round(total['locked'] / (workers * operations), 4),
+        'seconds': round(seconds, 2),
+        'throughput': round(total['ok'] / seconds, 1),
+        'p95_ms': round(percentile(merged, 0.95), 2) if merged else None,
+    }
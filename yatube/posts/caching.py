@@ -0,0 +1,261 @@
+import atexit
+import hashlib
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.core.cache import cache
+from django.http import Http404
+
+from .constants import (METRICS_FLUSH_INTERVAL, MODEL_CACHE_LOCK_TIMEOUT,
+                        MODEL_CACHE_STALE_GRACE, MODEL_CACHE_TIMEOUT,
+                        MODEL_CACHE_WAIT_STEP, MODEL_CACHE_WAIT_STEPS)
+from .models import Group, Post, User
+
+VERSION_KEY = 'posts:version:{name}'
+
+OBJECT_KEY = 'posts:object:{namespace}:{lookup}'
+
+LOCK_KEY = '{key}:lock'
+
+METRIC_KEY = 'posts:metrics:{namespace}:{event}'
+
+METRIC_EVENTS = ('hit', 'miss', 'stale', 'wait')
+
+# Поля пользователя, которые попадают в общий кеш. Хеш пароля, почта
+# и флаги доступа остаются только в базе.
+PUBLIC_USER_FIELDS = ('id', 'username', 'first_name', 'last_name')
+
+# Счетчики событий, еще не перенесенные в общий кеш (см. flush_metrics).
+_pending_metrics = Counter()
+_pending_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def get_versions(names):
+    """
+    Версии объектов для ключей фрагментного кеша одним запросом к кешу.
+    Отсутствующим версиям выдается новое случайное значение.
+    """
+    keys = {name: VERSION_KEY.format(name=name) for name in names}
+    found = cache.get_many(keys.values())
+    missing = {
+        key: _new_version() for key in keys.values() if key not in found
+    }
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+
+    return {name: found[key] for name, key in keys.items()}
+
+
+def bump_versions(names):
+    """Меняет версии объектов, делая их закешированные фрагменты старыми."""
+    cache.set_many(
+        {VERSION_KEY.format(name=name): _new_version() for name in names},
+        None,
+    )
+
+
+def post_version_names(post):
+    """От чего зависит фрагмент статьи: пост, его автор и группа."""
+    names = [f'post:{post.pk}', f'user:{post.author_id}']
+    if post.group_id is not None:
+        names.append(f'group:{post.group_id}')
+
+    return names
+
+
+def attach_versions(page_obj):
+    """
+    Проставляет `cache_version` каждому посту страницы и самой странице.
+
+    Версия страницы складывается из id и версий показанных постов,
+    поэтому новый, удаленный или измененный пост сразу меняет ключ.
+    """
+    posts = list(page_obj)
+    versions = get_versions({
+        name for post in posts for name in post_version_names(post)
+    })
+    page_key = hashlib.md5()
+    for post in posts:
+        post.cache_version = '.'.join(
+            versions[name] for name in post_version_names(post)
+        )
+        page_key.update(f'{post.pk}:{post.cache_version};'.encode())
+    page_obj.cache_version = page_key.hexdigest()
+
+    return page_obj
+
+
+def record(namespace, event):
+    """
+    Увеличивает счетчик события кеша в памяти процесса. В общее
+    хранилище счетчики переносит flush_metrics, поэтому попадание
+    в кеш не пишет в него.
+    """
+    with _pending_lock:
+        _pending_metrics[namespace, event] += 1
+
+
+def flush_metrics(force=False):
+    """
+    Прибавляет накопленные в процессе счетчики к счетчикам в общем
+    кеше - не чаще раза в METRICS_FLUSH_INTERVAL секунд, если не force.
+    Вызывается после ответа на запрос (сигнал request_finished).
+    """
+    global _flushed_at
+    with _pending_lock:
+        if not _pending_metrics or not force and (
+            time.monotonic() - _flushed_at < METRICS_FLUSH_INTERVAL
+        ):
+            return
+        pending = dict(_pending_metrics)
+        _pending_metrics.clear()
+        _flushed_at = time.monotonic()
+    for (namespace, event), count in pending.items():
+        key = METRIC_KEY.format(namespace=namespace, event=event)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            if not cache.add(key, count, None):
+                cache.incr(key, count)
+
+
+atexit.register(flush_metrics, force=True)
+
+
+def cache_metrics(namespaces):
+    """Счетчики попаданий и промахов кеша по пространствам имен."""
+    flush_metrics(force=True)
+    keys = {
+        (namespace, event): METRIC_KEY.format(
+            namespace=namespace, event=event
+        )
+        for namespace in namespaces for event in METRIC_EVENTS
+    }
+    found = cache.get_many(keys.values())
+    metrics = {namespace: {} for namespace in namespaces}
+    for (namespace, event), key in keys.items():
+        metrics[namespace][event] = found.get(key, 0)
+
+    return metrics
+
+
+def _object_key(namespace, lookup):
+    """Ключ объекта; lookup хешируется, так как может содержать пробелы."""
+    digest = hashlib.md5(str(lookup).encode()).hexdigest()
+
+    return OBJECT_KEY.format(namespace=namespace, lookup=digest)
+
+
+def _still_valid(entry):
+    """Совпадают ли версии зависимостей с сохраненными в записи."""
+    depends = entry['depends']
+
+    return not depends or get_versions(depends) == depends
+
+
+def cache_aside(namespace, lookup, loader, depends_on=None,
+                timeout=MODEL_CACHE_TIMEOUT):
+    """
+    Чтение через кеш (cache-aside) с защитой от "давки" (stampede).
+
+    Запись хранится дольше своего срока свежести на
+    MODEL_CACHE_STALE_GRACE: пока один процесс под блокировкой
+    перечитывает значение из базы, остальные отдают устаревшее.
+    Если значения в кеше нет совсем, процессы без блокировки
+    недолго ждут его появления. depends_on(value) возвращает имена
+    версий (см. get_versions), при смене которых запись устаревает.
+    """
+    key = _object_key(namespace, lookup)
+    entry = cache.get(key)
+    if entry is not None and _still_valid(entry):
+        if entry['fresh_until'] > time.time():
+            record(namespace, 'hit')
+            return entry['value']
+        if not cache.add(
+            LOCK_KEY.format(key=key), 1, MODEL_CACHE_LOCK_TIMEOUT
+        ):
+            record(namespace, 'stale')
+            return entry['value']
+    elif not cache.add(
+        LOCK_KEY.format(key=key), 1, MODEL_CACHE_LOCK_TIMEOUT
+    ):
+        record(namespace, 'wait')
+        for _ in range(MODEL_CACHE_WAIT_STEPS):
+            time.sleep(MODEL_CACHE_WAIT_STEP)
+            entry = cache.get(key)
+            if entry is not None and _still_valid(entry):
+                return entry['value']
+    record(namespace, 'miss')
+    try:
+        value = loader()
+        depends = depends_on(value) if depends_on and value else []
+        cache.set(key, {
+            'value': value,
+            'fresh_until': time.time() + timeout,
+            'depends': get_versions(depends) if depends else {},
+        }, timeout + MODEL_CACHE_STALE_GRACE)
+    finally:
+        cache.delete(LOCK_KEY.format(key=key))
+
+    return value
+
+
+def forget_object(namespace, lookup):
+    """Удаляет закешированный объект после его изменения."""
+    cache.delete(_object_key(namespace, lookup))
+
+
+def _or_404(value):
+    if value is None:
+        raise Http404
+    return value
+
+
+def _private_user_fields(prefix=''):
+    return [
+        prefix + field.name for field in User._meta.concrete_fields
+        if field.name not in PUBLIC_USER_FIELDS
+    ]
+
+
+def get_group(slug):
+    """Группа по slug через кеш, аналог get_object_or_404."""
+    return _or_404(cache_aside(
+        'group', slug, lambda: Group.objects.filter(slug=slug).first(),
+    ))
+
+
+def get_author(username):
+    """
+    Пользователь по username через кеш, аналог get_object_or_404.
+    Загружаются только PUBLIC_USER_FIELDS.
+    """
+    return _or_404(cache_aside(
+        'user', username,
+        lambda: User.objects.only(
+            *PUBLIC_USER_FIELDS
+        ).filter(username=username).first(),
+    ))
+
+
+def get_post(post_id):
+    """
+    Пост с автором и группой через кеш, аналог get_object_or_404.
+    Запись устаревает при смене версии автора или группы. У автора
+    загружаются только PUBLIC_USER_FIELDS.
+    """
+    return _or_404(cache_aside(
+        'post', post_id,
+        lambda: Post.objects.select_related(
+            'author', 'group'
+        ).defer(*_private_user_fields('author__')).filter(pk=post_id).first(),
+        depends_on=lambda post: post_version_names(post)[1:],
+    ))
@@ -0,0 +1,149 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.views.decorators.http import condition
+
+from . import counters
+from .caching import get_author, get_group, get_post
+from .models import Comment, Post
+
+CHANGED_KEY = 'posts:changed:{name}'
+
+# Изменения, видные на всех страницах: имена авторов, названия групп,
+# массовая загрузка данных.
+SITE = 'site'
+
+
+def post_page(post_id):
+    """Имя страницы поста для отметок об изменении."""
+    return counters.feed('post', post_id)
+
+
+def post_pages(post_id, author_id, group_id=None):
+    """Страницы, на которых виден пост: ленты и страница поста."""
+    names = [
+        counters.feed('all'), counters.feed('author', author_id),
+        post_page(post_id),
+    ]
+    if group_id is not None:
+        names.append(counters.feed('group', group_id))
+
+    return names
+
+
+def touch(names):
+    """Отмечает время изменения лент и страниц с именами names."""
+    now = time.time()
+    cache.set_many(
+        {CHANGED_KEY.format(name=name): now for name in names}, None
+    )
+
+
+def changed_at(names):
+    """
+    Отметки изменения по именам одним запросом к кешу. Отсутствующие
+    (например, после очистки кеша) считаются изменившимися сейчас.
+    """
+    keys = {name: CHANGED_KEY.format(name=name) for name in names}
+    found = cache.get_many(keys.values())
+    missing = {key: time.time() for key in keys.values() if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+
+    return {name: found[key] for name, key in keys.items()}
+
+
+def validators(newest, names, user):
+    """
+    ETag и Last-Modified страницы: по самой новой записи на ней и
+    отметкам изменения ее лент. Пользователь входит в ETag, так как
+    страницы для разных пользователей различаются.
+    """
+    changed = changed_at([*names, SITE])
+    last_modified = datetime.fromtimestamp(
+        max(changed.values()), timezone.utc
+    )
+    if newest is not None:
+        last_modified = max(last_modified, newest)
+    etag = hashlib.md5(
+        f'{user.pk}:{newest}:{sorted(changed.items())}'.encode()
+    ).hexdigest()
+
+    return etag, last_modified
+
+
+def page_etag(request):
+    """ETag страницы, посчитанный conditional_page, или None."""
+    found = getattr(request, '_page_validators', None)
+    return found[0] if found else None
+
+
+def conditional_page(state):
+    """
+    Декоратор страницы с условным GET (304 Not Modified).
+
+    state(request, *args, **kwargs) возвращает время самой новой
+    записи на странице и имена ее лент; страница при этом
+    не строится. Валидаторы считаются один раз на запрос, а
+    загруженный объект страницы обработчик берет из page_object.
+    """
+    def page_validators(request, *args, **kwargs):
+        if not hasattr(request, '_page_validators'):
+            newest, names = state(request, *args, **kwargs)
+            request._page_validators = validators(newest, names, request.user)
+        return request._page_validators
+
+    return condition(
+        etag_func=lambda *args, **kwargs: page_validators(*args, **kwargs)[0],
+        last_modified_func=(
+            lambda *args, **kwargs: page_validators(*args, **kwargs)[1]
+        ),
+    )
+
+
+def page_object(request, loader, *args):
+    """
+    Объект страницы (группа, автор, пост), уже загруженный
+    state-функцией на этом запросе, иначе loader(*args).
+    """
+    found = getattr(request, '_conditional_object', None)
+    return found if found is not None else loader(*args)
+
+
+def _newest_post(post_list):
+    return post_list.aggregate(newest=Max('pub_date'))['newest']
+
+
+def index_state(request):
+    return _newest_post(Post.objects.all()), [counters.feed('all')]
+
+
+def group_state(request, slug):
+    group = request._conditional_object = get_group(slug)
+    return (
+        _newest_post(Post.objects.filter(group=group)),
+        [counters.feed('group', group.pk)],
+    )
+
+
+def profile_state(request, username):
+    author = request._conditional_object = get_author(username)
+    return (
+        _newest_post(Post.objects.filter(author=author)),
+        [counters.feed('author', author.pk)],
+    )
+
+
+def post_state(request, post_id):
+    post = request._conditional_object = get_post(post_id)
+    newest = Comment.objects.filter(post_id=post.pk).aggregate(
+        newest=Max('created')
+    )['newest']
+    return (
+        max(post.pub_date, newest) if newest else post.pub_date,
+        [post_page(post.pk), counters.feed('author', post.author_id)],
+    )
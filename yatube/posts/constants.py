@@ -2,4 +2,96 @@ POST_START_WITH = 15
 
 POSTS_PER_PAGE = 10
 
+COMMENTS_PER_PAGE = 20
+
 ALL_POSTS = 12
+
+COUNTS_CACHE_TIMEOUT = 60 * 60
+
+APPROXIMATE_COUNT_FROM = 10000
+
+PAGE_RANGE_WINDOW = 3
+
+STATS_BATCH_SIZE = 1000
+
+TIMELINE_LENGTH = 1000
+
+FANOUT_MAX_FOLLOWERS = 10000
+
+FANOUT_BATCH_SIZE = 1000
+
+TIMELINE_TRIM_BATCH_SIZE = 200
+
+MODEL_CACHE_TIMEOUT = 60 * 5
+
+MODEL_CACHE_STALE_GRACE = 60
+
+MODEL_CACHE_LOCK_TIMEOUT = 10
+
+MODEL_CACHE_WAIT_STEPS = 10
+
+MODEL_CACHE_WAIT_STEP = 0.05
+
+METRICS_FLUSH_INTERVAL = 30
+
+THUMBNAIL_WORKERS = 2
+
+THUMBNAIL_PRESETS = (
+    ('350x400', {'crop': 'center', 'upscale': True}),
+)
+
+VARIANT_WIDTHS = (350, 700, 1050)
+
+VARIANT_FORMATS = ('AVIF', 'WEBP')
+
+VARIANT_QUALITY = 80
+
+IMAGE_UPLOAD_MAX_BYTES = 25 * 2 ** 20
+
+IMAGE_MAX_BYTES = 2 * 2 ** 20
+
+IMAGE_MAX_SIDE = 2560
+
+IMAGE_QUALITY_STEPS = (85, 75, 65, 55)
+
+IMAGE_CLAIM_TIMEOUT = 60
+
+SWEEP_BATCH_SIZE = 1000
+
+SEARCH_BATCH_SIZE = 2000
+
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+PAGE_CACHE_COMPRESS_LEVEL = 6
+
+ADMIN_COUNT_CACHE_TIMEOUT = 60 * 5
+
+ADMIN_FACETS_CACHE_TIMEOUT = 60 * 10
+
+TRANSFER_BATCH_SIZE = 1000
+
+TRANSFER_CHUNK_SIZE = 2000
+
+DATASET_BATCH_SIZE = 20000
+
+DATASET_TEXT_POOL = 2000
+
+BENCHMARK_REQUESTS = 30
+
+BENCHMARK_WARMUP = 3
+
+BENCHMARK_REPEATS = 5
+
+BENCHMARK_THRESHOLD = 0.2
+
+BENCHMARK_MIN_DELTA_MS = 10
+
+BENCHMARK_MIN_DELTA_KB = 256
+
+BENCHMARK_FOLLOWS = 20
+
+CONCURRENCY_WORKERS = 8
+
+CONCURRENCY_OPERATIONS = 200
+
+CONCURRENCY_WRITE_SHARE = 0.2
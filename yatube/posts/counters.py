@@ -0,0 +1,46 @@
+from django.core.cache import cache
+
+from .constants import COUNTS_CACHE_TIMEOUT
+
+COUNT_KEY = 'posts:count:{feed}'
+
+
+def feed(kind, pk=None):
+    """
+    Имя ленты для слоя счетчиков: `all`, `group:<id>`,
+    `author:<id>` или `follow:<id подписчика>`.
+    """
+    return kind if pk is None else f'{kind}:{pk}'
+
+
+def get_count(feed_name, post_list):
+    """
+    Число постов в ленте из кеша. При промахе выполняется
+    один COUNT(*) по переданному queryset, результат кешируется.
+    """
+    key = COUNT_KEY.format(feed=feed_name)
+    count = cache.get(key)
+    if count is None:
+        count = post_list.count()
+        cache.set(key, count, COUNTS_CACHE_TIMEOUT)
+
+    return count
+
+
+def change_counts(feed_names, delta):
+    """
+    Сдвигает закешированные счетчики лент на delta.
+    Отсутствующие в кеше счетчики будут посчитаны при первом чтении.
+    """
+    for feed_name in feed_names:
+        try:
+            cache.incr(COUNT_KEY.format(feed=feed_name), delta)
+        except ValueError:
+            pass
+
+
+def forget_counts(feed_names):
+    """Сбрасывает счетчики лент, чтобы они были пересчитаны при чтении."""
+    cache.delete_many(
+        [COUNT_KEY.format(feed=feed_name) for feed_name in feed_names]
+    )
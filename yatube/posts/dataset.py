@@ -0,0 +1,246 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from . import conditional, counters
+from .constants import DATASET_BATCH_SIZE, DATASET_TEXT_POOL
+from .models import Comment, Follow, Group, Post, User
+from .transfer import restore_dates
+
+DATASET_PASSWORD = 'password'
+
+
+def power_law_index(rng, size, alpha):
+    """
+    Случайный индекс 0..size-1 с вероятностью ~ 1 / (индекс + 1)^alpha.
+    Считается обратной функцией распределения, без массива весов,
+    поэтому подходит для миллионов записей.
+    """
+    if size <= 1:
+        return 0
+    u = rng.random()
+    if alpha == 1:
+        rank = size ** u
+    else:
+        power = 1 - alpha
+        rank = ((size ** power - 1) * u + 1) ** (1 / power)
+    return min(int(rank) - 1, size - 1)
+
+
+class DatasetBuilder:
+    """
+    Генератор синтетических данных для нагрузочных проверок.
+
+    Тексты берутся из заранее созданного Faker пула, id новых записей
+    назначаются заранее (после текущего максимума), поэтому внешние
+    ключи считаются без запросов, а вставка идет bulk_create пачками
+    по batch_size, каждая в своей транзакции. Популярность авторов
+    (посты и подписчики) и постов (комментарии) распределена по
+    степенному закону с показателем alpha.
+    """
+
+    def __init__(self, seed=None, alpha=1.2, days=365,
+                 batch_size=DATASET_BATCH_SIZE, locale='ru_RU'):
+        self.rng = random.Random(seed)
+        self.faker = Faker(locale)
+        self.faker.seed_instance(seed)
+        self.alpha = alpha
+        self.days = days
+        self.batch_size = batch_size
+        self.now = timezone.now()
+        self.created = {}
+        self._texts = None
+
+    def texts(self):
+        if self._texts is None:
+            self._texts = [
+                self.faker.text(max_nb_chars=self.rng.choice((80, 200, 600)))
+                for _ in range(DATASET_TEXT_POOL)
+            ]
+        return self._texts
+
+    def moment(self):
+        return self.now - timedelta(seconds=self.rng.randrange(
+            max(self.days * 24 * 60 * 60, 1)
+        ))
+
+    def first_pk(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def insert(self, model, objects, dates=()):
+        """
+        Вставляет объекты из итератора пачками; возвращает их число.
+        Сгенерированные значения полей auto_now_add из dates
+        возвращаются после вставки, как при загрузке выгрузки
+        (см. transfer.restore_dates).
+        """
+        objects = iter(objects)
+        inserted = 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            saved = {
+                id(obj): [getattr(obj, name) for name in dates]
+                for obj in batch
+            }
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+                restore_dates(model, batch, saved, dates)
+            inserted += len(batch)
+        self.created[model._meta.model_name] = inserted
+        return inserted
+
+    def users(self, count):
+        start = self.first_pk(User)
+        password = make_password(DATASET_PASSWORD)
+        self.insert(User, (
+            User(
+                pk=pk,
+                username=f'{self.faker.user_name()}{pk}',
+                first_name=self.faker.first_name(),
+                last_name=self.faker.last_name(),
+                password=password,
+                date_joined=self.moment(),
+            )
+            for pk in range(start, start + count)
+        ))
+        return range(start, start + count)
+
+    def groups(self, count):
+        start = self.first_pk(Group)
+        self.insert(Group, (
+            Group(
+                pk=pk,
+                title=self.faker.catch_phrase()[:200],
+                slug=f'group-{pk}',
+                description=self.rng.choice(self.texts()),
+            )
+            for pk in range(start, start + count)
+        ))
+        return range(start, start + count)
+
+    def pick(self, ids):
+        return ids[power_law_index(self.rng, len(ids), self.alpha)]
+
+    def posts(self, count, user_ids, group_ids, group_share=0.7):
+        start = self.first_pk(Post)
+        texts = self.texts()
+
+        def build():
+            for pk in range(start, start + count):
+                group_id = None
+                if group_ids and self.rng.random() < group_share:
+                    group_id = self.pick(group_ids)
+                yield Post(
+                    pk=pk,
+                    text=self.rng.choice(texts),
+                    pub_date=self.moment(),
+                    author_id=self.pick(user_ids),
+                    group_id=group_id,
+                )
+
+        self.insert(Post, build(), dates=('pub_date',))
+        return range(start, start + count)
+
+    def comments(self, count, post_ids, user_ids):
+        start = self.first_pk(Comment)
+        texts = self.texts()
+        self.insert(Comment, (
+            Comment(
+                pk=pk,
+                post_id=self.pick(post_ids),
+                author_id=self.rng.choice(user_ids),
+                text=self.rng.choice(texts)[:500],
+                created=self.moment(),
+            )
+            for pk in range(start, start + count)
+        ), dates=('created',))
+
+    def follows(self, user_ids, mean_degree):
+        """
+        Подписки: число подписок у пользователя распределено
+        экспоненциально со средним mean_degree, выбор авторов - по
+        степенному закону, так что у немногих авторов большинство
+        подписчиков.
+        """
+        def build():
+            for user_id in user_ids:
+                degree = min(
+                    int(self.rng.expovariate(1 / mean_degree)),
+                    len(user_ids) - 1,
+                )
+                authors = set()
+                for _ in range(degree * 2):
+                    if len(authors) >= degree:
+                        break
+                    author_id = self.pick(user_ids)
+                    if author_id != user_id:
+                        authors.add(author_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        if mean_degree > 0 and len(user_ids) > 1:
+            self.insert(Follow, build())
+
+    def images(self, count, post_ids, size=(800, 600)):
+        """
+        Создает count разных картинок и раздает их случайным постам.
+        Миниатюры и варианты не строятся (см. warm_thumbnails).
+        """
+        storage = Post._meta.get_field('image').storage
+        picked = self.rng.sample(post_ids, min(count, len(post_ids)))
+        updated = []
+        for pk in picked:
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', size, color).save(buffer, 'JPEG')
+            name = storage.save(
+                f'posts/dataset_{pk}.jpg', ContentFile(buffer.getvalue())
+            )
+            updated.append(Post(
+                pk=pk, image=name, image_width=size[0],
+                image_height=size[1], image_bytes=buffer.tell(),
+            ))
+        with transaction.atomic():
+            Post.objects.bulk_update(
+                updated,
+                ['image', 'image_width', 'image_height', 'image_bytes'],
+                batch_size=self.batch_size,
+            )
+        self.created['image'] = len(updated)
+
+    def reset_sequences(self):
+        """
+        Сдвигает последовательности id после вставки с явными id
+        (нужно PostgreSQL; для SQLite список команд пуст).
+        """
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Post, Comment, Follow]
+        )
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def forget_counts(self, user_ids, group_ids):
+        """
+        Сбрасывает кеш счетчиков лент, затронутых новыми данными, и
+        отмечает изменение всех страниц для условного GET.
+        """
+        feeds = [counters.feed('all')]
+        feeds.extend(counters.feed('group', pk) for pk in group_ids)
+        for kind in ('author', 'follow'):
+            feeds.extend(counters.feed(kind, pk) for pk in user_ids)
+        for start in range(0, len(feeds), self.batch_size):
+            counters.forget_counts(feeds[start:start + self.batch_size])
+        conditional.touch([conditional.SITE])
@@ -1,6 +1,7 @@
 from django import forms
 
 from .models import Post, Comment
+from .uploads import normalize_image
 
 
 class PostForm(forms.ModelForm):
@@ -10,6 +11,22 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('group', 'text', 'image')
 
+    def clean_image(self):
+        """Нормализует новую картинку и запоминает ее размеры в посте."""
+        image = self.cleaned_data.get('image')
+        if not image:
+            self.instance.image_width = None
+            self.instance.image_height = None
+            self.instance.image_bytes = None
+            return image
+        if image == self.initial.get('image'):
+            return image
+        image, width, height, size = normalize_image(image)
+        self.instance.image_width = width
+        self.instance.image_height = height
+        self.instance.image_bytes = size
+        return image
+
 
 class CommentForm(forms.ModelForm):
     """Класс формы для создания нового комментария."""
@@ -0,0 +1,169 @@
+import os
+
+from django.core.files.storage import default_storage
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore
+
+from .constants import SWEEP_BATCH_SIZE
+from .models import Post
+from .thumbnails import source_file
+
+RELEASING_SUFFIX = '.releasing'
+
+
+def _is_needed(storage, name, path):
+    """Нужен ли файл: есть ссылки, пометка claim или записанная копия."""
+    return (
+        storage.is_claimed(name)
+        or os.path.exists(path)
+        or Post.objects.filter(image=name).exists()
+    )
+
+
+def _delete_derived(source, variant_names):
+    """Удаляет миниатюры sorl и варианты. Возвращает число байт."""
+    reclaimed = 0
+    thumbnail_keys = default.kvstore._get(source.key, 'thumbnails') or []
+    for key in thumbnail_keys:
+        thumbnail = default.kvstore._get(key)
+        if thumbnail is not None and thumbnail.exists():
+            reclaimed += thumbnail.storage.size(thumbnail.name)
+    default.kvstore.delete(source)
+    for variant_name in variant_names:
+        if default_storage.exists(variant_name):
+            reclaimed += default_storage.size(variant_name)
+            default_storage.delete(variant_name)
+
+    return reclaimed
+
+
+def release_image(name, variant_names):
+    """
+    Удаляет картинку, на которую больше не ссылается ни один пост,
+    вместе с миниатюрами sorl, их записями в хранилище ключей и
+    вариантами. Пока ссылки есть, ничего не трогает.
+
+    Исходник сначала атомарно переименовывается, и только потом
+    проверяются ссылки и пометка повторной загрузки (claim). Если
+    загрузка того же файла успела его найти или записала заново,
+    файл возвращается на место, а миниатюры и варианты остаются.
+    Возвращает число освобожденных байт.
+    """
+    if not name or Post.objects.filter(image=name).exists():
+        return 0
+    source = source_file(name)
+    path = source.storage.path(name)
+    releasing = path + RELEASING_SUFFIX
+    try:
+        os.replace(path, releasing)
+    except FileNotFoundError:
+        releasing = None
+    if _is_needed(source.storage, name, path):
+        if releasing is not None:
+            os.replace(releasing, path)
+        return 0
+    reclaimed = _delete_derived(source, variant_names)
+    if releasing is not None:
+        reclaimed += os.path.getsize(releasing)
+        os.remove(releasing)
+
+    return reclaimed
+
+
+def _rows(identity, batch_size):
+    """Записи хранилища ключей sorl пачками, без загрузки всех ключей."""
+    prefix = add_prefix('', identity)
+    last_key = prefix
+    while True:
+        rows = list(KVStore.objects.filter(
+            key__startswith=prefix, key__gt=last_key,
+        ).order_by('key').values_list('key', 'value')[:batch_size])
+        if not rows:
+            return
+        last_key = rows[-1][0]
+        yield from rows
+
+
+def sweep_kvstore(dry_run=False, batch_size=SWEEP_BATCH_SIZE):
+    """
+    Сверяет хранилище ключей sorl с файлами: убирает записи об
+    отсутствующих исходниках и миниатюрах и пустые списки миниатюр.
+    Возвращает число удаленных или исправленных записей.
+    """
+    kvstore = default.kvstore
+    fixed = 0
+    for key, value in _rows('image', batch_size):
+        image_file = deserialize_image_file(value)
+        if not image_file.exists():
+            fixed += 1
+            if not dry_run:
+                kvstore.delete(image_file)
+    for key, _ in _rows('thumbnails', batch_size):
+        key = del_prefix(key)
+        thumbnail_keys = kvstore._get(key, 'thumbnails') or []
+        alive = [
+            thumbnail_key for thumbnail_key in thumbnail_keys
+            if kvstore._get(thumbnail_key) is not None
+        ]
+        if alive == thumbnail_keys and kvstore._get(key) is not None:
+            continue
+        fixed += 1
+        if dry_run:
+            continue
+        if alive and kvstore._get(key) is not None:
+            kvstore._set(key, alive, 'thumbnails')
+        else:
+            kvstore._delete(key, 'thumbnails')
+
+    return fixed
+
+
+def _walk(path):
+    """Файлы каталога и подкаталогов по одному, через os.scandir."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def sweep_cache_files(dry_run=False, batch_size=SWEEP_BATCH_SIZE):
+    """
+    Удаляет из каталога миниатюр файлы, о которых не знает хранилище
+    ключей sorl. Возвращает число файлов и освобожденных байт.
+    """
+    storage = default.storage
+    root = storage.path(sorl_settings.THUMBNAIL_PREFIX)
+    removed = reclaimed = 0
+    if not os.path.isdir(root):
+        return removed, reclaimed
+
+    def flush(batch):
+        nonlocal removed, reclaimed
+        known = set(KVStore.objects.filter(
+            key__in=list(batch)
+        ).values_list('key', flat=True))
+        for key, entry in batch.items():
+            if key in known:
+                continue
+            removed += 1
+            reclaimed += entry.stat().st_size
+            if not dry_run:
+                os.remove(entry.path)
+
+    batch = {}
+    for entry in _walk(root):
+        name = os.path.relpath(entry.path, storage.path('')).replace(
+            os.sep, '/'
+        )
+        batch[add_prefix(ImageFile(name, storage).key)] = entry
+        if len(batch) == batch_size:
+            flush(batch)
+            batch = {}
+    flush(batch)
+
+    return removed, reclaimed
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts import benchmark
+from posts.constants import (CONCURRENCY_OPERATIONS, CONCURRENCY_WORKERS,
+                             CONCURRENCY_WRITE_SHARE)
+
+
+class Command(BaseCommand):
+    """Конкурентная нагрузка на SQLite до и после настройки."""
+
+    help = (
+        'Нагружает базу из нескольких потоков с отдельными соединениями '
+        'и сравнивает долю ошибок "database is locked" и пропускную '
+        'способность для настроек stock (как в Django по умолчанию) и '
+        'tuned (WAL, прагмы, BEGIN IMMEDIATE, CONN_MAX_AGE). Создает '
+        'комментарии, поэтому запускайте на отдельной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--setups',
+            nargs='+',
+            choices=tuple(benchmark.CONCURRENCY_SETUPS),
+            default=tuple(benchmark.CONCURRENCY_SETUPS),
+            help='Какие настройки сравнивать.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=CONCURRENCY_WORKERS,
+            help='Сколько потоков-воркеров.',
+        )
+        parser.add_argument(
+            '--operations',
+            type=int,
+            default=CONCURRENCY_OPERATIONS,
+            help='Сколько операций выполняет каждый воркер.',
+        )
+        parser.add_argument(
+            '--write-share',
+            type=float,
+            default=CONCURRENCY_WRITE_SHARE,
+            help='Доля пишущих операций, от 0 до 1.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора операций.',
+        )
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError('Замер имеет смысл только для SQLite.')
+        if options['workers'] < 1 or options['operations'] < 1:
+            raise CommandError('Нужны хотя бы один воркер и одна операция.')
+        for setup in options['setups']:
+            result = benchmark.concurrency(
+                setup, options['workers'], options['operations'],
+                options['write_share'], options['seed'],
+            )
+            self.stdout.write(
+                f'{setup:<6} успешно {result["ok"]:>6}  '
+                f'locked {result["locked"]:>5} '
+                f'({result["locked_share"]:.1%})  '
+                f'ошибок {result["errors"]:>4}  '
+                f'{result["throughput"]:>8} оп/с  '
+                f'p95 {result["p95_ms"]} мс'
+            )
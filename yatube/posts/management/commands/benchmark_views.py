@@ -0,0 +1,119 @@
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+from posts.constants import (BENCHMARK_REPEATS, BENCHMARK_REQUESTS,
+                             BENCHMARK_THRESHOLD, BENCHMARK_WARMUP)
+
+
+class Command(BaseCommand):
+    """Замер производительности обработчиков постов."""
+
+    help = (
+        'Замеряет задержку p50/p95, число запросов к базе и пик памяти '
+        'для обработчиков постов и сравнивает с базовой линией в JSON. '
+        'Создает посты и комментарии, поэтому запускайте на отдельной '
+        'базе (ее можно заполнить командой build_dataset).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            choices=('client', 'server'),
+            default='client',
+            help='Тестовый клиент Django или настоящий WSGI-сервер.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=BENCHMARK_REQUESTS,
+            help='Сколько замеряемых запросов к каждому обработчику.',
+        )
+        parser.add_argument(
+            '--repeats',
+            type=int,
+            default=BENCHMARK_REPEATS,
+            help='Сколько серий замера; в результат идут медианы серий.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=BENCHMARK_WARMUP,
+            help='Сколько прогревочных запросов перед замером.',
+        )
+        parser.add_argument(
+            '--views',
+            nargs='+',
+            choices=benchmark.VIEWS,
+            default=benchmark.VIEWS,
+            help='Какие обработчики замерять.',
+        )
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(settings.BASE_DIR, 'benchmark_baseline.json'),
+            help='Файл базовой линии.',
+        )
+        parser.add_argument(
+            '--save',
+            action='store_true',
+            help='Записать результаты как новую базовую линию.',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=BENCHMARK_THRESHOLD,
+            help='Допустимый рост p95 и памяти, доля (0.2 - на 20%%).',
+        )
+        parser.add_argument(
+            '--build-dataset',
+            action='store_true',
+            help='Сначала заполнить базу командой build_dataset.',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['repeats'] < 1:
+            raise CommandError(
+                'Нужны хотя бы одна серия и один замеряемый запрос.'
+            )
+        if options['build_dataset']:
+            call_command('build_dataset', seed=0, stdout=self.stdout)
+        try:
+            results = benchmark.run(
+                options['mode'], options['requests'], options['warmup'],
+                options['views'], options['repeats'],
+            )
+        except RuntimeError as error:
+            raise CommandError(error)
+        for view, metrics in results['views'].items():
+            self.stdout.write(
+                f'{view:<14} p50 {metrics["p50_ms"]:>8} мс  '
+                f'p95 {metrics["p95_ms"]:>8} мс '
+                f'(±{metrics["p95_spread_ms"]})  '
+                f'запросов {metrics["queries"]}  '
+                f'память {metrics["memory_kb"]} КБ'
+            )
+        path = options['baseline']
+        if options['save']:
+            benchmark.save_baseline(path, results)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовая линия записана в {path}.'
+            ))
+            return
+        baseline = benchmark.load_baseline(path)
+        if results['mode'] not in baseline:
+            self.stdout.write(
+                f'Базовой линии режима {results["mode"]} в {path} нет, '
+                'сравнение пропущено (создайте ее с --save).'
+            )
+            return
+        regressions = benchmark.compare(
+            results, baseline, options['threshold']
+        )
+        if regressions:
+            raise CommandError(
+                'Регрессии производительности:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
@@ -0,0 +1,89 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.constants import DATASET_BATCH_SIZE
+from posts.dataset import DATASET_PASSWORD, DatasetBuilder
+
+
+class Command(BaseCommand):
+    """Синтетический набор данных для проверки производительности."""
+
+    help = (
+        'Создает пользователей, группы, посты, комментарии, подписки и '
+        'картинки со степенным распределением популярности авторов, '
+        'затем пересчитывает счетчики, ленты подписок и поисковый индекс.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default, help_text in (
+            ('users', 1000, 'Сколько пользователей создать.'),
+            ('groups', 20, 'Сколько групп создать.'),
+            ('posts', 10000, 'Сколько постов создать.'),
+            ('comments', 20000, 'Сколько комментариев создать.'),
+            ('images', 0, 'Скольким постам добавить картинки.'),
+            ('days', 365, 'За сколько последних дней даты постов.'),
+            ('batch-size', DATASET_BATCH_SIZE,
+             'Сколько записей вставлять в одной транзакции.'),
+        ):
+            parser.add_argument(
+                f'--{name}', type=int, default=default, help=help_text,
+            )
+        parser.add_argument(
+            '--follows',
+            type=float,
+            default=20,
+            help='Среднее число подписок у пользователя.',
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=1.2,
+            help='Показатель степенного закона популярности авторов.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Зерно генератора для воспроизводимого набора.',
+        )
+        parser.add_argument(
+            '--skip-derived',
+            action='store_true',
+            help='Не пересчитывать счетчики, ленты и поисковый индекс.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 and (options['posts'] or options['comments']):
+            raise CommandError('Для постов нужен хотя бы один пользователь.')
+        if options['posts'] < 1 and options['comments']:
+            raise CommandError('Для комментариев нужен хотя бы один пост.')
+        builder = DatasetBuilder(
+            seed=options['seed'],
+            alpha=options['alpha'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+        )
+        started = time.monotonic()
+        user_ids = builder.users(options['users'])
+        group_ids = builder.groups(options['groups'])
+        post_ids = builder.posts(options['posts'], user_ids, group_ids)
+        builder.comments(options['comments'], post_ids, user_ids)
+        builder.follows(user_ids, options['follows'])
+        if options['images']:
+            builder.images(options['images'], post_ids)
+        builder.reset_sequences()
+        builder.forget_counts(user_ids, group_ids)
+        self.stdout.write(
+            'Создано: ' + ', '.join(
+                f'{name} {count}' for name, count in builder.created.items()
+            ) + f' за {time.monotonic() - started:.1f} с. '
+            f'Пароль пользователей: {DATASET_PASSWORD}.'
+        )
+        if not options['skip_derived']:
+            call_command('recount_stats', stdout=self.stdout)
+            call_command('rebuild_feeds', stdout=self.stdout)
+            call_command('rebuild_search_index', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с.'
+        ))
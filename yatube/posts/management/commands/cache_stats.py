@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.caching import cache_metrics
+
+NAMESPACES = ('group', 'user', 'post', 'page')
+
+
+class Command(BaseCommand):
+    """Вывод счетчиков попаданий и промахов кеша объектов и страниц."""
+
+    help = (
+        'Показывает попадания и промахи кеша объектов и страниц '
+        'приложения posts.'
+    )
+
+    def handle(self, *args, **options):
+        for namespace, events in cache_metrics(NAMESPACES).items():
+            total = sum(events.values())
+            ratio = events['hit'] / total * 100 if total else 0
+            details = ', '.join(
+                f'{event}: {count}' for event, count in events.items()
+            )
+            self.stdout.write(
+                f'{namespace}: {details}; попаданий {ratio:.1f}%'
+            )
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.constants import TRANSFER_CHUNK_SIZE
+from posts.transfer import MODEL_NAMES, write_csv, write_ndjson
+
+
+class Command(BaseCommand):
+    """Потоковая выгрузка пользователей, групп, постов и подписок."""
+
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в NDJSON (все модели в одном файле) или CSV (одна модель).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=('ndjson', 'csv'),
+            default='ndjson',
+            help='Формат выгрузки.',
+        )
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            choices=MODEL_NAMES,
+            default=MODEL_NAMES,
+            help='Какие модели выгружать; для CSV - ровно одна.',
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Файл для выгрузки, "-" - стандартный вывод.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=TRANSFER_CHUNK_SIZE,
+            help='Сколько строк читать из базы за один раз.',
+        )
+
+    def handle(self, *args, **options):
+        names = [name for name in MODEL_NAMES if name in options['models']]
+        if options['format'] == 'csv' and len(names) != 1:
+            raise CommandError('Для CSV укажите одну модель в --models.')
+        if options['output'] == '-':
+            written = self.write(self.stdout, names, options)
+            report = self.stderr
+        else:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as stream:
+                written = self.write(stream, names, options)
+            report = self.stdout
+        report.write(self.style.SUCCESS('Выгружено: ' + ', '.join(
+            f'{name} {written[name]}' for name in names
+        ) + '.'))
+
+    def write(self, stream, names, options):
+        if options['format'] == 'csv':
+            return write_csv(stream, names[0], options['chunk_size'])
+        return write_ndjson(stream, names, options['chunk_size'])
@@ -0,0 +1,80 @@
+import os
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.constants import TRANSFER_BATCH_SIZE
+from posts.transfer import MODEL_NAMES, Importer, read_csv, read_ndjson
+
+
+class Command(BaseCommand):
+    """Пакетная загрузка данных, выгруженных командой export_data."""
+
+    help = (
+        'Загружает пользователей, группы, посты, комментарии и подписки '
+        'из NDJSON или CSV пачками через bulk_create, сопоставляя id '
+        'связей, затем пересчитывает счетчики и ленты подписок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл выгрузки, "-" - стандартный ввод.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=('ndjson', 'csv'),
+            help='Формат файла; по умолчанию - по расширению.',
+        )
+        parser.add_argument(
+            '--model',
+            choices=MODEL_NAMES,
+            help='Модель записей в CSV.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TRANSFER_BATCH_SIZE,
+            help='Сколько записей вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--media-root',
+            help='Каталог media источника, откуда копировать картинки.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        if file_format == 'csv' and not options['model']:
+            raise CommandError('Для CSV укажите модель в --model.')
+        if options['media_root'] and not os.path.isdir(options['media_root']):
+            raise CommandError(f'Нет каталога {options["media_root"]}.')
+        importer = Importer(options['batch_size'], options['media_root'])
+        if path == '-':
+            self.load(importer, sys.stdin, file_format, options)
+        else:
+            with open(path, encoding='utf-8', newline='') as stream:
+                self.load(importer, stream, file_format, options)
+        importer.forget_counts()
+        call_command('recount_stats', stdout=self.stdout)
+        call_command('rebuild_feeds', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено: ' + ', '.join(
+                f'{name} {importer.created[name]}' for name in MODEL_NAMES
+            ) + '; пропущено: ' + ', '.join(
+                f'{name} {importer.skipped[name]}' for name in MODEL_NAMES
+            ) + '.'
+        ))
+
+    def load(self, importer, stream, file_format, options):
+        if file_format == 'csv':
+            records = read_csv(stream, options['model'])
+        else:
+            records = read_ndjson(stream)
+        try:
+            importer.load(records)
+        except (ValueError, ValidationError) as error:
+            raise CommandError(error)
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.constants import FANOUT_BATCH_SIZE
+from posts.models import FeedEntry, Follow
+from posts.timeline import rebuild
+
+
+class Command(BaseCommand):
+    """Заполнение готовых лент подписок по существующим подпискам."""
+
+    help = 'Пересобирает ленты подписок (FeedEntry) для всех подписчиков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить существующие записи лент перед заполнением.',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            FeedEntry.objects.all().delete()
+        rebuilt = 0
+        last_user_id = 0
+        while True:
+            user_ids = list(
+                Follow.objects.filter(user_id__gt=last_user_id).order_by(
+                    'user_id'
+                ).values_list('user_id', flat=True).distinct()[
+                    :FANOUT_BATCH_SIZE
+                ]
+            )
+            if not user_ids:
+                break
+            with transaction.atomic():
+                rebuild(last_user_id + 1, user_ids[-1])
+            last_user_id = user_ids[-1]
+            rebuilt += len(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент подписок: {rebuilt}.'
+        ))
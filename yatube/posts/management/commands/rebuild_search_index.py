@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.constants import SEARCH_BATCH_SIZE
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """Перестройка поискового индекса постов."""
+
+    help = 'Перестраивает поисковый индекс постов с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SEARCH_BATCH_SIZE,
+            help='Сколько постов индексировать за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed}.'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.constants import STATS_BATCH_SIZE
+from posts.stats import recount_author_stats, recount_group_stats
+
+
+class Command(BaseCommand):
+    """Пересчет денормализованных счетчиков авторов и групп с нуля."""
+
+    help = 'Пересчитывает счетчики авторов и групп, исправляя расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=STATS_BATCH_SIZE,
+            help='Сколько записей пересчитывать за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        authors = recount_author_stats(batch_size)
+        groups = recount_group_stats(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено записей: авторов {authors}, групп {groups}.'
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts.constants import SWEEP_BATCH_SIZE
+from posts.housekeeping import sweep_cache_files, sweep_kvstore
+
+
+class Command(BaseCommand):
+    """Уборка миниатюр sorl.thumbnail."""
+
+    help = (
+        'Сверяет хранилище ключей sorl.thumbnail с media/cache и удаляет '
+        'осиротевшие записи и файлы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SWEEP_BATCH_SIZE,
+            help='Сколько записей или файлов проверять за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        rows = sweep_kvstore(options['dry_run'], options['batch_size'])
+        files, reclaimed = sweep_cache_files(
+            options['dry_run'], options['batch_size']
+        )
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: записей хранилища ключей {rows}, файлов {files}, '
+            f'освобождено {reclaimed / 2 ** 20:.1f} МБ.'
+        ))
@@ -0,0 +1,70 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.constants import THUMBNAIL_PRESETS, THUMBNAIL_WORKERS
+from posts.thumbnails import AsyncThumbnailBackend, generate, source_file
+
+IMAGES_DIR = 'posts'
+
+
+def image_names(directory=IMAGES_DIR):
+    """Все файлы каталога хранилища, включая вложенные."""
+    if not default_storage.exists(directory):
+        return
+    dirs, files = default_storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name)
+    for name in dirs:
+        yield from image_names(os.path.join(directory, name))
+
+
+class Command(BaseCommand):
+    """Построение миниатюр для уже загруженных изображений постов."""
+
+    help = 'Заранее строит миниатюры для всех изображений в media/posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=THUMBNAIL_WORKERS,
+            help='Число потоков генерации.',
+        )
+
+    def warm(self, name):
+        """Строит недостающие миниатюры изображения, возвращает их число."""
+        backend = AsyncThumbnailBackend()
+        built = 0
+        for geometry_string, options in THUMBNAIL_PRESETS:
+            if backend.cached_thumbnail(
+                source_file(name), geometry_string, **options
+            ):
+                continue
+            generate(name, geometry_string, options)
+            built += 1
+        return built
+
+    def warm_in_thread(self, name):
+        try:
+            return self.warm(name)
+        except Exception as error:
+            self.stderr.write(f'{name}: {error}')
+            return None
+        finally:
+            connections.close_all()
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for result in pool.map(self.warm_in_thread, image_names()):
+                if result is None:
+                    failed += 1
+                else:
+                    built += result
+        self.stdout.write(self.style.SUCCESS(
+            f'Построено миниатюр: {built}, ошибок: {failed}.'
+        ))
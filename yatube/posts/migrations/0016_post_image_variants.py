@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.TextField(blank=True, default='', editable=False, help_text='JSON-список уменьшенных копий, см. posts.variants', verbose_name='Варианты картинки'),
+        ),
+    ]
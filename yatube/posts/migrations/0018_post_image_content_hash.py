@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:26
+
+from django.db import migrations, models
+import posts.storages
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, storage=posts.storages.ContentHashStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+    ]
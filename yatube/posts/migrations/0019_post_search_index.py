@@ -0,0 +1,46 @@
+from django.db import migrations
+
+from posts.stemmer import stem_words
+
+FTS_TABLE = 'posts_search'
+
+
+def create_index(apps, schema_editor):
+    """Таблица FTS5 для поиска; на других базах ничего не делает."""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING '
+            "fts5(body, tokenize='unicode61 remove_diacritics 2')"
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+            (
+                (post_id, ' '.join(stem_words(text)))
+                for post_id, text in Post.objects.values_list(
+                    'pk', 'text'
+                ).iterator()
+            ),
+        )
+
+
+def drop_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_image_content_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def count_by(queryset, field):
+    return dict(
+        queryset.order_by().values(field).annotate(
+            count=Count('id')
+        ).values_list(field, 'count')
+    )
+
+
+def create_author_stats(apps, schema_editor):
+    """Счетчики для пользователей, у которых их еще нет."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    Comment = apps.get_model('posts', 'Comment')
+    missing = list(User.objects.filter(
+        stats__isnull=True
+    ).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(missing), BATCH_SIZE):
+        author_ids = missing[start:start + BATCH_SIZE]
+        posts = count_by(
+            Post.objects.filter(author_id__in=author_ids), 'author_id'
+        )
+        followers = count_by(
+            Follow.objects.filter(author_id__in=author_ids), 'author_id'
+        )
+        following = count_by(
+            Follow.objects.filter(user_id__in=author_ids), 'user_id'
+        )
+        comments = count_by(
+            Comment.objects.filter(author_id__in=author_ids), 'author_id'
+        )
+        AuthorStats.objects.bulk_create([
+            AuthorStats(
+                author_id=author_id,
+                posts_count=posts.get(author_id, 0),
+                followers_count=followers.get(author_id, 0),
+                following_count=following.get(author_id, 0),
+                comments_count=comments.get(author_id, 0),
+            )
+            for author_id in author_ids
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0019_post_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_author_stats, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
 from .constants import POST_START_WITH
+from .storages import ContentHashStorage
 
 User = get_user_model()
 
@@ -18,6 +21,11 @@ class Group(models.Model):
         verbose_name='URL',
     )
     description = models.TextField(verbose_name='Описание')
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество постов',
+    )
 
     class Meta:
         verbose_name = 'Сообщество'
@@ -57,17 +65,53 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=ContentHashStorage(),
+        blank=True,
+        db_index=True,
+    )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', blank=True, null=True, editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', blank=True, null=True, editable=False,
+    )
+    image_bytes = models.PositiveIntegerField(
+        'Размер картинки в байтах', blank=True, null=True, editable=False,
+    )
+    image_variants = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        default='',
+        editable=False,
+        help_text='JSON-список уменьшенных копий, см. posts.variants',
     )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Публикация'
         verbose_name_plural = 'Публикации'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:POST_START_WITH]
 
+    @property
+    def variants(self):
+        """Список вариантов картинки: имя файла, ширина и формат."""
+        return json.loads(self.image_variants) if self.image_variants else []
+
 
 class Comment(models.Model):
     """Модель для хранения комментариев к постам."""
@@ -99,9 +143,15 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx',
+            ),
+        ]
 
     def __str__(self):
-        return self.title
+        return self.text[:POST_START_WITH]
 
 
 class Follow(models.Model):
@@ -123,8 +173,94 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка на авторов'
         verbose_name_plural = 'Подписки на авторов'
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx',
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'author'], name='unique_subscription'
             )
         ]
+
+
+class AuthorStats(models.Model):
+    """
+    Модель для хранения денормализованных счетчиков автора.
+    Поддерживается сигналами моделей Post, Follow и Comment.
+    """
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков',
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписок',
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество комментариев',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'Статистика {self.author_id}'
+
+
+class FeedEntry(models.Model):
+    """
+    Модель для хранения готовой ленты подписок: при публикации поста
+    его id раскладывается по лентам подписчиков автора.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Публикация',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date', '-post_id')
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_entry_user_date_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_feed_entry'
+            )
+        ]
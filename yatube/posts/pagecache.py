@@ -0,0 +1,66 @@
+import hashlib
+import zlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .caching import record
+from .conditional import page_etag
+from .constants import PAGE_CACHE_COMPRESS_LEVEL, PAGE_CACHE_TIMEOUT
+
+PAGE_KEY = 'posts:page:{digest}'
+
+
+def _page_key(request):
+    """Ключ страницы по пути и строке запроса."""
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+    return PAGE_KEY.format(digest=digest)
+
+
+def _cacheable(response):
+    return (
+        response.status_code == 200 and not response.streaming
+        and not response.cookies
+    )
+
+
+def anonymous_page_cache(view):
+    """
+    Декоратор: кеш страниц целиком для анонимных пользователей.
+
+    Ставится под conditional_page: запись хранится вместе с ETag
+    страницы и отдается, только пока ETag не изменился, поэтому
+    сигналы, отмечающие изменение лент (см. conditional.touch),
+    сразу делают записи старыми. Содержимое сжимается zlib.
+    Авторизованные пользователи видят свои ветки шаблонов
+    (шапка, переключатель лент), для них кеш не используется.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        etag = page_etag(request)
+        if (etag is None or request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated):
+            return view(request, *args, **kwargs)
+        key = _page_key(request)
+        entry = cache.get(key)
+        if entry is not None and entry['etag'] == etag:
+            record('page', 'hit')
+            return HttpResponse(
+                zlib.decompress(entry['content']),
+                content_type=entry['content_type'],
+            )
+        record('page', 'miss')
+        response = view(request, *args, **kwargs)
+        if _cacheable(response):
+            cache.set(key, {
+                'etag': etag,
+                'content': zlib.compress(
+                    response.content, PAGE_CACHE_COMPRESS_LEVEL
+                ),
+                'content_type': response['Content-Type'],
+            }, PAGE_CACHE_TIMEOUT)
+        return response
+
+    return wrapped
@@ -0,0 +1,225 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .constants import (ADMIN_COUNT_CACHE_TIMEOUT, APPROXIMATE_COUNT_FROM,
+                        PAGE_RANGE_WINDOW)
+
+
+class CountedPaginator(Paginator):
+    """
+    Нумерованный вывод, который берет число записей из слоя
+    счетчиков вместо COUNT(*) на каждый запрос.
+
+    Для больших лент счетчик считается приблизительным: вместо всех
+    номеров страниц показывается окно вокруг текущей.
+    """
+
+    is_cursor = False
+
+    def __init__(self, object_list, per_page, count_func):
+        super().__init__(object_list, per_page)
+        self._count_func = count_func
+        self.visible_range = range(0)
+
+    @cached_property
+    def count(self):
+        return self._count_func()
+
+    @property
+    def is_approximate(self):
+        return self.count >= APPROXIMATE_COUNT_FROM
+
+    def page(self, number):
+        page = super().page(number)
+        if self.is_approximate:
+            first = max(page.number - PAGE_RANGE_WINDOW, 1)
+            last = min(page.number + PAGE_RANGE_WINDOW, self.num_pages)
+            self.visible_range = range(first, last + 1)
+        else:
+            self.visible_range = self.page_range
+
+        return page
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списков админки для больших таблиц.
+
+    COUNT(*) выполняется не чаще раза в ADMIN_COUNT_CACHE_TIMEOUT
+    для одного и того же запроса. Для таблицы без фильтров на
+    PostgreSQL берется оценка планировщика (pg_class.reltuples),
+    если она не меньше APPROXIMATE_COUNT_FROM.
+    """
+
+    def _estimate(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < APPROXIMATE_COUNT_FROM:
+            return None
+        return int(row[0])
+
+    @cached_property
+    def count(self):
+        estimate = self._estimate()
+        if estimate is not None:
+            return estimate
+        queryset = self.object_list.order_by()
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = 'admin_count:' + hashlib.md5(
+            f'{queryset.db}:{sql}:{params}'.encode()
+        ).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, ADMIN_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class CursorPaginator(Paginator):
+    """
+    Постраничный вывод по ключу (keyset pagination).
+
+    Вместо OFFSET/COUNT(*) страница выбирается условием на значения
+    полей сортировки последней показанной записи, поэтому любая страница
+    стоит столько же, сколько первая. Положение в ленте передается
+    непрозрачным токеном `?cursor=`.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-id')):
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.ordering = ordering
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._number = 1
+        self._has_next = False
+
+    @property
+    def num_pages(self):
+        """
+        Сколько страниц "видно" с текущей позиции курсора.
+
+        Стандартный `Page` вычисляет `has_next`/`has_previous` через
+        номер страницы и `num_pages`, поэтому без COUNT(*) отдаем
+        минимально достаточное значение.
+        """
+        return self._number + int(self._has_next)
+
+    def _fields(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def _encode(self, direction, obj):
+        model = self.object_list.model
+        if isinstance(obj, dict):
+            # Строка values(): позиция берется из ее ключей.
+            obj = model(**{name: obj[name] for name in self._fields()})
+        position = [
+            model._meta.get_field(name).value_to_string(obj)
+            for name in self._fields()
+        ]
+        raw = json.dumps({'d': direction, 'p': position}).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        """Разбор токена; для испорченного токена возвращается None."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            data = json.loads(raw.decode())
+            direction, position = data['d'], data['p']
+            if (not isinstance(position, list)
+                    or len(position) != len(self.ordering)
+                    or None in position):
+                return None
+            model = self.object_list.model
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self._fields(), position)
+            ]
+        except (binascii.Error, ValueError, KeyError, TypeError,
+                AttributeError, UnicodeDecodeError, ValidationError):
+            return None
+        if direction not in ('n', 'p') or None in values:
+            return None
+        return direction, values
+
+    def _seek(self, values, forward, fields=None):
+        """Условие "строго после (или до) позиции" для сортировки ключа."""
+        fields = fields or self._fields()
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{fields[index]}__{lookup}': values[index]})
+            for prev_index in range(index):
+                step &= Q(**{fields[prev_index]: values[prev_index]})
+            condition |= step
+        return condition
+
+    def _reversed_ordering(self, fields=None):
+        return [
+            field if name.startswith('-') else f'-{field}'
+            for name, field in zip(self.ordering, fields or self._fields())
+        ]
+
+    def _fetch(self, position, forward, limit):
+        """
+        Не более limit записей после (или до) позиции в порядке обхода:
+        ближайшие к позиции идут первыми.
+        """
+        items = self.object_list
+        if position is not None:
+            items = items.filter(self._seek(position, forward))
+        if not forward:
+            items = items.order_by(*self._reversed_ordering())
+        return list(items[:limit])
+
+    def page(self, cursor=None):
+        """Возвращает страницу, начинающуюся с позиции курсора."""
+        decoded = self._decode(cursor) if cursor else None
+        limit = self.per_page + 1
+        if decoded is None:
+            items = self._fetch(None, True, limit)
+            has_previous, has_next = False, len(items) > self.per_page
+            items = items[:self.per_page]
+        elif decoded[0] == 'n':
+            items = self._fetch(decoded[1], True, limit)
+            has_previous, has_next = True, len(items) > self.per_page
+            items = items[:self.per_page]
+        else:
+            items = self._fetch(decoded[1], False, limit)
+            has_previous, has_next = len(items) > self.per_page, True
+            items = items[:self.per_page][::-1]
+        if not items and decoded is not None:
+            return self.page()
+        self._number = 2 if has_previous else 1
+        self._has_next = has_next
+        self.next_cursor = self._encode('n', items[-1]) if has_next else None
+        self.previous_cursor = (
+            self._encode('p', items[0]) if has_previous else None
+        )
+        return Page(items, self._number, self)
+
+    def get_page(self, cursor=None):
+        return self.page(cursor)
@@ -0,0 +1,187 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .stemmer import stem_words
+
+FTS_TABLE = 'posts_search'
+
+
+def document(post):
+    """Текст поста для индекса: основы слов через пробел."""
+    return ' '.join(stem_words(post.text))
+
+
+class SearchBackend:
+    """
+    Интерфейс поискового индекса постов.
+
+    Индекс хранит только id постов; сами посты выбираются из базы
+    (см. SearchResults). Запрос разбивается на основы слов, найденными
+    считаются посты, в которых есть все основы.
+    """
+
+    def index(self, posts):
+        """Добавляет или обновляет посты в индексе."""
+
+    def remove(self, post_ids):
+        """Удаляет посты из индекса."""
+
+    def clear(self):
+        """Очищает индекс целиком."""
+
+    def search(self, terms, offset, limit):
+        """id найденных постов от более к менее релевантным."""
+        raise NotImplementedError
+
+    def count(self, terms):
+        """Сколько всего постов найдено."""
+        raise NotImplementedError
+
+
+class SqliteFtsBackend(SearchBackend):
+    """
+    Индекс в виртуальной таблице SQLite FTS5 (миграция 0019).
+    rowid записи совпадает с id поста, порядок - по bm25.
+    """
+
+    def _match(self, terms):
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def index(self, posts):
+        rows = [(post.pk, document(post)) for post in posts]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(post_id,) for post_id, _ in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                rows,
+            )
+
+    def remove(self, post_ids):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(post_id,) for post_id in post_ids],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, terms, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s OFFSET %s',
+                [self._match(terms), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, terms):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self._match(terms)],
+            )
+            return cursor.fetchone()[0]
+
+
+class SubstringBackend(SearchBackend):
+    """
+    Запасной вариант для баз без FTS5: отдельного индекса нет,
+    основы ищутся в тексте через ILIKE, новые посты идут первыми.
+    """
+
+    def _filter(self, terms):
+        condition = Q()
+        for term in terms:
+            condition &= Q(text__icontains=term)
+        return Post.objects.filter(condition)
+
+    def search(self, terms, offset, limit):
+        return list(self._filter(terms).values_list(
+            'pk', flat=True
+        )[offset:offset + limit])
+
+    def count(self, terms):
+        return self._filter(terms).order_by().count()
+
+
+def get_backend():
+    """
+    Поисковый бэкенд из settings.POSTS_SEARCH_BACKEND, а если он
+    не задан - FTS5 для SQLite и поиск по подстроке для других баз.
+    """
+    path = getattr(settings, 'POSTS_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SqliteFtsBackend()
+    return SubstringBackend()
+
+
+class SearchResults:
+    """
+    Результаты поиска как ленивая последовательность постов
+    для пагинатора: срез - один запрос к индексу и один к постам.
+    """
+
+    def __init__(self, query, backend=None):
+        self.query = query
+        self.terms = stem_words(query)
+        self.backend = backend or get_backend()
+
+    @cached_property
+    def _count(self):
+        return self.backend.count(self.terms) if self.terms else 0
+
+    def count(self):
+        return self._count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        stop = self._count if item.stop is None else item.stop
+        if not self.terms or stop <= start:
+            return []
+        ids = self.backend.search(self.terms, start, stop - start)
+        posts = Post.objects.select_related('group', 'author').in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+
+def search_posts(query):
+    """Посты, подходящие под запрос, от более к менее релевантным."""
+    return SearchResults(query)
+
+
+def rebuild_index(batch_size, backend=None):
+    """
+    Перестраивает индекс с нуля пачками по id, каждая пачка в своей
+    транзакции. Возвращает число проиндексированных постов.
+    """
+    backend = backend or get_backend()
+    backend.clear()
+    indexed = 0
+    last_id = 0
+    while True:
+        posts = list(
+            Post.objects.filter(pk__gt=last_id).order_by('pk').only(
+                'pk', 'text'
+            )[:batch_size]
+        )
+        if not posts:
+            return indexed
+        backend.index(posts)
+        indexed += len(posts)
+        last_id = posts[-1].pk
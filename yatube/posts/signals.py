@@ -0,0 +1,333 @@
+import json
+from functools import partial
+
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (conditional, counters, housekeeping, search, thumbnails,
+               timeline, variants)
+from .caching import bump_versions, flush_metrics, forget_object
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+from .stats import change_author_stats, change_group_posts_count
+
+
+def post_feeds(post, group_id):
+    """Ленты, в которые попадает пост (кроме лент подписчиков)."""
+    feeds = [counters.feed('all'), counters.feed('author', post.author_id)]
+    if group_id is not None:
+        feeds.append(counters.feed('group', group_id))
+
+    return feeds
+
+
+def follower_feeds(author_id):
+    """Ленты подписок всех подписчиков автора."""
+    return [
+        counters.feed('follow', user_id)
+        for user_id in Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+    ]
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """Запоминает прежние группу и изображение редактируемого поста."""
+    if instance.pk is None:
+        return
+    (
+        instance._saved_group_id,
+        instance._saved_image,
+        instance._saved_variants,
+    ) = Post.objects.filter(pk=instance.pk).values_list(
+        'group_id', 'image', 'image_variants'
+    ).first() or (None, None, '')
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    """Обновляет счетчики лент после создания или переноса поста."""
+    if created:
+        counters.change_counts(post_feeds(instance, instance.group_id), 1)
+        counters.forget_counts(follower_feeds(instance.author_id))
+        change_author_stats(instance.author_id, posts_count=1)
+        if instance.group_id is not None:
+            change_group_posts_count(instance.group_id, 1)
+        if timeline.fanout_enabled():
+            timeline.push_post(instance)
+        return
+    saved_group_id = getattr(instance, '_saved_group_id', None)
+    if saved_group_id != instance.group_id:
+        if saved_group_id is not None:
+            counters.change_counts(
+                [counters.feed('group', saved_group_id)], -1
+            )
+            change_group_posts_count(saved_group_id, -1)
+        if instance.group_id is not None:
+            counters.change_counts(
+                [counters.feed('group', instance.group_id)], 1
+            )
+            change_group_posts_count(instance.group_id, 1)
+
+
+def forget_post_image(name, image_variants):
+    """Ставит в очередь освобождение картинки, миниатюр и вариантов."""
+    if not name:
+        return
+    variant_names = [
+        variant['name']
+        for variant in (json.loads(image_variants) if image_variants else [])
+    ]
+    thumbnails.run_in_background(
+        housekeeping.release_image, name, variant_names
+    )
+
+
+@receiver(post_save, sender=Post)
+def queue_post_thumbnails(sender, instance, created, **kwargs):
+    """
+    Ставит в очередь миниатюры и варианты нового или замененного
+    изображения; прежнее изображение освобождается.
+    """
+    if not created and instance.image.name == getattr(
+        instance, '_saved_image', None
+    ):
+        return
+    if instance.image_variants:
+        instance.image_variants = ''
+        Post.objects.filter(pk=instance.pk).update(image_variants='')
+    if not created:
+        forget_post_image(
+            getattr(instance, '_saved_image', None),
+            getattr(instance, '_saved_variants', ''),
+        )
+    if not instance.image:
+        return
+    # Пост с картинкой зафиксирован: пометка повторной загрузки больше
+    # не нужна, файл защищает ссылка из базы.
+    transaction.on_commit(
+        partial(instance.image.storage.unclaim, instance.image.name)
+    )
+    thumbnails.schedule_presets(instance.image.name)
+    thumbnails.run_in_background(
+        variants.save_variants, instance.pk, instance.image.name
+    )
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_post_image(sender, instance, **kwargs):
+    """Освобождает картинку удаленного поста."""
+    forget_post_image(instance.image.name, instance.image_variants)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    """Обновляет счетчики лент после удаления поста."""
+    counters.change_counts(post_feeds(instance, instance.group_id), -1)
+    counters.forget_counts(follower_feeds(instance.author_id))
+    change_author_stats(instance.author_id, posts_count=-1)
+    if instance.group_id is not None:
+        change_group_posts_count(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, update_fields=None, **kwargs):
+    """Обновляет пост в поисковом индексе, если менялся его текст."""
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    search.get_backend().index([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    """Убирает удаленный пост из поискового индекса."""
+    search.get_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def count_follow_feed(sender, instance, **kwargs):
+    """Сбрасывает счетчик ленты подписок после (от)писки."""
+    counters.forget_counts([counters.feed('follow', instance.user_id)])
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    """Обновляет счетчики подписок и подписчиков."""
+    if created:
+        change_author_stats(instance.author_id, followers_count=1)
+        change_author_stats(instance.user_id, following_count=1)
+        if timeline.fanout_enabled():
+            timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    """Обновляет счетчики подписок и подписчиков после отписки."""
+    change_author_stats(instance.author_id, followers_count=-1)
+    change_author_stats(instance.user_id, following_count=-1)
+    timeline.cleanup(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    """Обновляет счетчик комментариев автора."""
+    if created:
+        change_author_stats(instance.author_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    """Обновляет счетчик комментариев автора после удаления."""
+    change_author_stats(instance.author_id, comments_count=-1)
+
+
+@receiver(post_delete, sender=Group)
+def count_deleted_group(sender, instance, **kwargs):
+    """Сбрасывает счетчик ленты удаленной группы."""
+    counters.forget_counts([counters.feed('group', instance.pk)])
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    """Заводит нулевые счетчики новому пользователю."""
+    if created and not raw:
+        AuthorStats.objects.create(author=instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_version(sender, instance, **kwargs):
+    """Устаревает фрагменты кеша с измененным постом."""
+    bump_versions([f'post:{instance.pk}'])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_version(sender, instance, **kwargs):
+    """Устаревает фрагменты кеша со ссылками на группу."""
+    bump_versions([f'group:{instance.pk}'])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_version(sender, instance, update_fields=None, **kwargs):
+    """
+    Устаревает фрагменты кеша с именем автора.
+    Обновление только last_login при входе на сайт пропускается.
+    """
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_versions([f'user:{instance.pk}'])
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    """Запоминает прежний slug редактируемой группы."""
+    if instance.pk is not None:
+        instance._saved_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    """Запоминает прежнее имя редактируемого пользователя."""
+    if instance.pk is not None and update_fields is None:
+        instance._saved_username = User.objects.filter(
+            pk=instance.pk
+        ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_cached_post(sender, instance, **kwargs):
+    """Удаляет пост из кеша объектов."""
+    forget_object('post', instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_cached_group(sender, instance, **kwargs):
+    """Удаляет группу из кеша объектов по новому и прежнему slug."""
+    forget_object('group', instance.slug)
+    saved_slug = getattr(instance, '_saved_slug', None)
+    if saved_slug and saved_slug != instance.slug:
+        forget_object('group', saved_slug)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """Удаляет пользователя из кеша объектов по новому и прежнему имени."""
+    forget_object('user', instance.username)
+    saved_username = getattr(instance, '_saved_username', None)
+    if saved_username and saved_username != instance.username:
+        forget_object('user', saved_username)
+
+
+@receiver(request_finished)
+def flush_cache_metrics(sender, **kwargs):
+    """Переносит счетчики кеша в общее хранилище после ответа."""
+    flush_metrics()
+
+
+@receiver(request_finished)
+def build_deferred_thumbnails(sender, **kwargs):
+    """Строит миниатюры, которых не хватило странице, после ответа."""
+    thumbnails.build_deferred()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def touch_post_pages(sender, instance, **kwargs):
+    """Отмечает изменение страниц с постом, включая прежнюю группу."""
+    names = conditional.post_pages(
+        instance.pk, instance.author_id, instance.group_id
+    )
+    saved_group_id = getattr(instance, '_saved_group_id', None)
+    if saved_group_id is not None:
+        names.append(counters.feed('group', saved_group_id))
+    conditional.touch(names)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_comment_pages(sender, instance, **kwargs):
+    """Отмечает изменение страницы поста и статистики автора."""
+    conditional.touch([
+        conditional.post_page(instance.post_id),
+        counters.feed('author', instance.author_id),
+    ])
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def touch_follow_pages(sender, instance, **kwargs):
+    """Отмечает изменение профилей и ленты подписок."""
+    conditional.touch([
+        counters.feed('author', instance.author_id),
+        counters.feed('author', instance.user_id),
+        counters.feed('follow', instance.user_id),
+    ])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def touch_group_pages(sender, instance, **kwargs):
+    """Название группы видно на всех страницах с ее постами."""
+    conditional.touch([conditional.SITE])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def touch_user_pages(sender, instance, update_fields=None, **kwargs):
+    """
+    Имя автора видно на всех страницах с его постами.
+    Обновление только last_login при входе на сайт пропускается.
+    """
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    conditional.touch([conditional.SITE])
@@ -0,0 +1,132 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+STATS_FIELDS = (
+    'posts_count', 'followers_count', 'following_count', 'comments_count',
+)
+
+
+def change_author_stats(author_id, **deltas):
+    """
+    Сдвигает счетчики автора одним UPDATE с F-выражениями.
+
+    Запись заводится при создании пользователя; отсутствующую запись
+    и уменьшение ниже нуля (рассинхронизация) исправляет пересчет
+    командой `recount_stats`.
+    """
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    for field, delta in deltas.items():
+        if delta < 0:
+            stats = stats.filter(**{f'{field}__gte': -delta})
+    stats.update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def change_group_posts_count(group_id, delta):
+    """Сдвигает счетчик постов группы."""
+    groups = Group.objects.filter(pk=group_id)
+    if delta < 0:
+        groups = groups.filter(posts_count__gte=-delta)
+    groups.update(posts_count=F('posts_count') + delta)
+
+
+def count_by(queryset, field):
+    """Словарь {значение поля: число строк} одним GROUP BY."""
+    return dict(
+        queryset.order_by().values(field).annotate(
+            count=Count('id')
+        ).values_list(field, 'count')
+    )
+
+
+def count_author_stats(author_ids):
+    """Точные значения счетчиков для набора авторов."""
+    counts = {
+        'posts_count': count_by(
+            Post.objects.filter(author_id__in=author_ids), 'author_id'
+        ),
+        'followers_count': count_by(
+            Follow.objects.filter(author_id__in=author_ids), 'author_id'
+        ),
+        'following_count': count_by(
+            Follow.objects.filter(user_id__in=author_ids), 'user_id'
+        ),
+        'comments_count': count_by(
+            Comment.objects.filter(author_id__in=author_ids), 'author_id'
+        ),
+    }
+
+    return {
+        author_id: AuthorStats(author_id=author_id, **{
+            field: counts[field].get(author_id, 0) for field in STATS_FIELDS
+        })
+        for author_id in author_ids
+    }
+
+
+def get_author_stats(author):
+    """
+    Счетчики автора. Запись заводится при создании пользователя;
+    если ее нет, отдаются нули до пересчета командой `recount_stats`.
+    """
+    return (
+        AuthorStats.objects.filter(author=author).first()
+        or AuthorStats(author=author)
+    )
+
+
+def recount_author_stats(batch_size):
+    """
+    Пересчитывает счетчики всех авторов пачками по batch_size.
+    Возвращает число исправленных записей.
+    """
+    fixed = 0
+    last_pk = 0
+    while True:
+        author_ids = list(
+            User.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', flat=True
+            )[:batch_size]
+        )
+        if not author_ids:
+            return fixed
+        last_pk = author_ids[-1]
+        actual = count_author_stats(author_ids)
+        stored = AuthorStats.objects.in_bulk(author_ids)
+        changed = [
+            stats for author_id, stats in actual.items()
+            if author_id in stored and any(
+                getattr(stats, field) != getattr(stored[author_id], field)
+                for field in STATS_FIELDS
+            )
+        ]
+        missing = [
+            stats for author_id, stats in actual.items()
+            if author_id not in stored
+        ]
+        with transaction.atomic():
+            AuthorStats.objects.bulk_update(changed, STATS_FIELDS)
+            AuthorStats.objects.bulk_create(missing)
+        fixed += len(changed) + len(missing)
+
+
+def recount_group_stats(batch_size):
+    """
+    Пересчитывает счетчики постов всех групп.
+    Возвращает число исправленных записей.
+    """
+    changed = [
+        group for group in Group.objects.annotate(actual=Count('posts'))
+        if group.posts_count != group.actual
+    ]
+    for group in changed:
+        group.posts_count = group.actual
+    with transaction.atomic():
+        Group.objects.bulk_update(
+            changed, ['posts_count'], batch_size=batch_size
+        )
+
+    return len(changed)
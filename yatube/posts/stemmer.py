@@ -0,0 +1,128 @@
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+WORD_RE = re.compile(r'\w+')
+
+STEM_CACHE_SIZE = 100000
+
+
+def _endings(*groups):
+    """
+    Окончания (окончание, нужна ли перед ним "а" или "я") от длинных
+    к коротким: так первое совпадение - самое длинное.
+    """
+    pairs = [
+        (ending, after_a)
+        for endings, after_a in groups
+        for ending in endings.split()
+    ]
+    return sorted(pairs, key=lambda pair: -len(pair[0]))
+
+
+PERFECTIVE_GERUND = _endings(
+    ('в вши вшись', True),
+    ('ив ивши ившись ыв ывши ывшись', False),
+)
+ADJECTIVE = _endings((
+    'ее ие ые ое ими ыми ей ий ый ой ем им ым ом его ого ему ому '
+    'их ых ую юю ая яя ою ею', False,
+))
+PARTICIPLE = _endings(
+    ('ем нн вш ющ щ', True),
+    ('ивш ывш ующ', False),
+)
+REFLEXIVE = _endings(('ся сь', False))
+VERB = _endings(
+    ('ла на ете йте ли й л ем н ло но ет ют ны ть ешь нно', True),
+    ('ила ыла ена ейте уйте ите или ыли ей уй ил ыл им ым ен ило ыло '
+     'ено ят ует уют ит ыт ены ить ыть ишь ую ю', False),
+)
+NOUN = _endings((
+    'а ев ов ие ье е иями ями ами еи ии и ией ей ой ий й иям ям ием '
+    'ем ам ом о у ах иях ях ы ь ию ью ю ия ья я', False,
+))
+SUPERLATIVE = _endings(('ейш ейше', False))
+DERIVATIONAL = _endings(('ост ость', False))
+
+
+def _strip(word, endings):
+    """Слово без самого длинного подходящего окончания или None."""
+    for ending, after_a in endings:
+        if not word.endswith(ending):
+            continue
+        stem = word[:-len(ending)]
+        if after_a and not stem.endswith(('а', 'я')):
+            continue
+        return stem
+    return None
+
+
+def _region(word, start):
+    """Начало области после первой согласной, идущей за гласной."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _strip_inflection(rv):
+    """Шаг 1: деепричастие или возвратная частица и окончание."""
+    stripped = _strip(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    reflexive = _strip(rv, REFLEXIVE)
+    if reflexive is not None:
+        rv = reflexive
+    adjective = _strip(rv, ADJECTIVE)
+    if adjective is not None:
+        participle = _strip(adjective, PARTICIPLE)
+        return adjective if participle is None else participle
+    for endings in (VERB, NOUN):
+        stripped = _strip(rv, endings)
+        if stripped is not None:
+            return stripped
+    return rv
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word):
+    """
+    Основа русского слова по алгоритму Snowball (Портер).
+    Окончания ищутся только в области RV - после первой гласной.
+    """
+    word = word.lower().replace('ё', 'е')
+    rv_start = next(
+        (index + 1 for index, char in enumerate(word) if char in VOWELS),
+        len(word),
+    )
+    r2 = _region(word, _region(word, 0))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    rv = _strip_inflection(rv)
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    derivational = _strip(rv, DERIVATIONAL)
+    if derivational is not None and rv_start + len(derivational) >= r2:
+        rv = derivational
+
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        superlative = _strip(rv, SUPERLATIVE)
+        if superlative is not None:
+            rv = superlative
+            if rv.endswith('нн'):
+                rv = rv[:-1]
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+
+    return prefix + rv
+
+
+def stem_words(text):
+    """Основы всех слов текста в исходном порядке."""
+    return [stem(word) for word in WORD_RE.findall(text)]
@@ -0,0 +1,64 @@
+import hashlib
+import os
+
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from .constants import IMAGE_CLAIM_TIMEOUT
+
+CLAIM_KEY = 'posts:image-claim:{digest}'
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """
+    Файловое хранилище, которое называет файлы по SHA-256 содержимого.
+
+    Повторная загрузка того же файла получает уже существующее имя
+    и ничего не записывает, поэтому одинаковые картинки хранятся и
+    обрабатываются (миниатюры, варианты) один раз. Файл удаляется
+    только после того, как на него не ссылается ни один пост
+    (см. posts.housekeeping.release_image).
+
+    Повторная загрузка сначала помечает имя в кеше на
+    IMAGE_CLAIM_TIMEOUT (claim): пост с этим именем еще не сохранен,
+    и освобождение картинки в это время файл не удаляет.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        self.claim(name)
+        if self.exists(name):
+            return name
+        self.unclaim(name)
+        return super().save(name, content, max_length)
+
+    def _claim_key(self, name):
+        digest = hashlib.md5(name.encode()).hexdigest()
+        return CLAIM_KEY.format(digest=digest)
+
+    def claim(self, name):
+        """Помечает файл как занятый еще не сохраненным постом."""
+        cache.set(self._claim_key(name), 1, IMAGE_CLAIM_TIMEOUT)
+
+    def unclaim(self, name):
+        cache.delete(self._claim_key(name))
+
+    def is_claimed(self, name):
+        return cache.get(self._claim_key(name)) is not None
@@ -0,0 +1,52 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from posts.variants import MIME_TYPES, available_formats
+
+register = template.Library()
+
+PICTURE_SIZES = '(max-width: 576px) 100vw, 350px'
+
+
+def _srcset(variants):
+    return ', '.join(
+        f'{default_storage.url(variant["name"])} {variant["width"]}w'
+        for variant in variants
+    )
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post, sizes=PICTURE_SIZES):
+    """
+    Разметка <picture> по сохраненным вариантам картинки поста.
+    Имена файлов берутся из post.image_variants, а размеры - из
+    post.image_width/image_height, без обращения к диску.
+    """
+    by_format = {}
+    for variant in post.variants:
+        by_format.setdefault(variant['format'], []).append(variant)
+    modern = available_formats()
+    sources = [
+        {'type': MIME_TYPES[name], 'srcset': _srcset(by_format[name])}
+        for name in modern if name in by_format
+    ]
+    fallback = next(
+        (items for name, items in by_format.items() if name not in modern),
+        [],
+    )
+
+    width = height = None
+    if fallback and post.image_width and post.image_height:
+        width = fallback[0]['width']
+        height = round(post.image_height * width / post.image_width)
+
+    return {
+        'sources': sources,
+        'width': width,
+        'height': height,
+        'fallback_src': (
+            default_storage.url(fallback[0]['name']) if fallback else ''
+        ),
+        'fallback_srcset': _srcset(fallback),
+        'sizes': sizes,
+    }
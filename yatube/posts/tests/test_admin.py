@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+
+class AdminChangeListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass',
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def add_posts(self, count):
+        for number in range(count):
+            post = Post.objects.create(
+                author=self.admin, group=self.group, text=f'Пост {number}',
+            )
+            Comment.objects.create(
+                post=post, author=self.admin, text=f'Комментарий {number}',
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк."""
+        for model in ('post', 'comment'):
+            url = reverse(f'admin:posts_{model}_changelist')
+            with self.subTest(model=model):
+                Post.objects.all().delete()
+                self.add_posts(2)
+                few = self.count_queries(url)
+                self.add_posts(10)
+                self.assertEqual(self.count_queries(url), few)
+
+    def test_counts_and_dates_are_cached(self):
+        """Повторный показ списка не считает записи и даты заново."""
+        self.add_posts(3)
+        url = reverse('admin:posts_post_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 3)
+        sql = ' '.join(query['sql'] for query in queries).upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('MIN(', sql)
+
+    def test_editable_group_renders_selected_only(self):
+        """В строке списка выбрана группа поста без списка всех групп."""
+        Group.objects.create(title='Другая', slug='other', description='-')
+        self.add_posts(1)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, 'selected>Группа</option>')
+        self.assertNotContains(response, '>Другая</option>')
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .. import benchmark
+from ..models import Follow, Group, Post, User
+
+
+class BenchmarkTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        Post.objects.create(author=author, group=group, text='Пост')
+        Follow.objects.create(user=reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def benchmark(self, *args):
+        call_command(
+            'benchmark_views', '--requests=2', '--warmup=0', '--repeats=2',
+            f'--baseline={self.path}', *args, stdout=StringIO(),
+        )
+
+    def test_run_measures_every_view(self):
+        """Замер есть для каждого обработчика."""
+        results = benchmark.run('client', requests=2, warmup=0, repeats=2)
+        self.assertEqual(set(results['views']), set(benchmark.VIEWS))
+        for metrics in results['views'].values():
+            self.assertGreater(metrics['p95_ms'], 0)
+            self.assertGreater(metrics['queries'], 0)
+            self.assertGreater(metrics['memory_kb'], 0)
+        self.assertTrue(Follow.objects.filter(
+            user__username=benchmark.BENCHMARK_USERNAME
+        ).exists())
+
+    def test_compare_reports_regressions(self):
+        """Рост сверх порога и новые запросы считаются регрессией."""
+        saved = {'p95_ms': 10, 'queries': 5, 'memory_kb': 1000}
+        baseline = {'client': {'views': {'index': saved}}}
+        current = {'mode': 'client', 'views': {'index': dict(saved)}}
+        self.assertEqual(benchmark.compare(current, baseline, 0.2), [])
+        current['views']['index'].update(p95_ms=11.5, memory_kb=1100)
+        self.assertEqual(benchmark.compare(current, baseline, 0.2), [])
+        current['views']['index'].update(
+            p95_ms=20, queries=6, memory_kb=2000
+        )
+        self.assertEqual(len(benchmark.compare(current, baseline, 0.2)), 3)
+        current['views']['index'].update(
+            p95_ms=30, p95_spread_ms=25, queries=5, memory_kb=1000
+        )
+        self.assertEqual(benchmark.compare(current, baseline, 0.2), [])
+        current['mode'] = 'server'
+        self.assertEqual(benchmark.compare(current, baseline, 0.2), [])
+
+    def test_command_fails_on_regression(self):
+        """Команда сохраняет базовую линию и падает на регрессии."""
+        self.benchmark('--views', 'index', 'post_detail', '--save')
+        with open(self.path, encoding='utf-8') as stream:
+            baseline = json.load(stream)
+        self.assertEqual(
+            set(baseline['client']['views']), {'index', 'post_detail'}
+        )
+        baseline['client']['views']['index']['queries'] = 0
+        with open(self.path, 'w', encoding='utf-8') as stream:
+            json.dump(baseline, stream)
+        with self.assertRaisesMessage(CommandError, 'index: запросов 0'):
+            self.benchmark('--views', 'index')
@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase
+
+from .. import caching
+from ..models import Group, Post, User
+
+
+class CacheAsideTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test user')
+        cls.group = Group.objects.create(
+            title='Test_group_title',
+            slug='Test_URL',
+            description='Test_description',
+        )
+        cls.post = Post.objects.create(
+            text='Test text', author=cls.user, group=cls.group,
+        )
+
+    def setUp(self):
+        caching.flush_metrics(force=True)
+        cache.clear()
+
+    def test_lookup_is_served_from_cache(self):
+        """Повторный запрос объекта не обращается к базе."""
+        caching.get_group(self.group.slug)
+        with self.assertNumQueries(0):
+            group = caching.get_group(self.group.slug)
+        self.assertEqual(group, self.group)
+        metrics = caching.cache_metrics(['group'])['group']
+        self.assertEqual((metrics['hit'], metrics['miss']), (1, 1))
+
+    def test_missing_object_raises_404(self):
+        """Отсутствующий объект дает Http404 и тоже кешируется."""
+        with self.assertRaises(Http404):
+            caching.get_author('nobody')
+        with self.assertNumQueries(0), self.assertRaises(Http404):
+            caching.get_author('nobody')
+        User.objects.create_user(username='nobody')
+        self.assertEqual(caching.get_author('nobody').username, 'nobody')
+
+    def test_cached_post_follows_author_changes(self):
+        """Кешированный пост устаревает при изменении автора."""
+        caching.get_post(self.post.pk)
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        post = caching.get_post(self.post.pk)
+        self.assertEqual(post.author.first_name, 'Renamed')
+
+    def test_private_user_fields_are_not_cached(self):
+        """В кеш не попадают хеш пароля, почта и флаги пользователя."""
+        user = User.objects.get(pk=self.user.pk)
+        user.email = 'author@example.com'
+        user.set_password('secret-pass')
+        user.save()
+        caching.get_author(self.user.username)
+        caching.get_post(self.post.pk)
+        author = cache.get(
+            caching._object_key('user', self.user.username)
+        )['value']
+        post = cache.get(caching._object_key('post', self.post.pk))['value']
+        for user in (author, post.author):
+            with self.subTest(user=user.pk):
+                self.assertEqual(user.username, self.user.username)
+                self.assertEqual(
+                    user.get_deferred_fields(),
+                    set(caching._private_user_fields()),
+                )
+                self.assertNotIn('password', user.__dict__)
+                self.assertNotIn('email', user.__dict__)
+
+    def test_stale_value_is_served_while_refreshing(self):
+        """Пока значение перечитывается, остальные получают устаревшее."""
+        caching.get_group(self.group.slug)
+        key = caching._object_key('group', self.group.slug)
+        entry = cache.get(key)
+        entry['fresh_until'] = 0
+        cache.set(key, entry)
+        cache.add(caching.LOCK_KEY.format(key=key), 1)
+        with self.assertNumQueries(0):
+            caching.get_group(self.group.slug)
+        metrics = caching.cache_metrics(['group'])['group']
+        self.assertEqual(metrics['stale'], 1)
+
+    def test_hits_are_counted_in_process(self):
+        """Попадания считаются в процессе и не пишут в общий кеш."""
+        caching.get_group(self.group.slug)
+        caching.flush_metrics(force=True)
+        key = caching.METRIC_KEY.format(namespace='group', event='hit')
+        for _ in range(3):
+            caching.get_group(self.group.slug)
+        self.assertIsNone(cache.get(key))
+        metrics = caching.cache_metrics(['group'])['group']
+        self.assertEqual((metrics['hit'], metrics['miss']), (3, 1))
@@ -0,0 +1,127 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import caching
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Test_group_title',
+            slug='Test_URL',
+            description='Test_description',
+        )
+        cls.post = Post.objects.create(
+            text='Test text', author=cls.user, group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+
+    def revalidate(self, url, client=None):
+        """Статус повторного запроса с ETag первого ответа."""
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_repeat_visit_is_not_modified(self):
+        """Повторный запрос без изменений получает пустой ответ 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'],
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_not_modified_costs_one_query(self):
+        """Ответ 304 анонимному пользователю - один запрос к базе."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_if_modified_since(self):
+        """Клиент только с If-Modified-Since тоже получает 304."""
+        url = reverse('posts:index')
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_pages(self):
+        """Новые и измененные записи меняют валидаторы своих страниц."""
+        index, group, profile, detail = self.urls
+        changes = (
+            (index, lambda: Post.objects.create(
+                text='New', author=self.user,
+            )),
+            (group, lambda: Post.objects.filter(
+                pk=self.post.pk
+            ).first().save()),
+            (detail, lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Comment',
+            )),
+            (profile, lambda: Follow.objects.create(
+                user=User.objects.create_user(username='reader'),
+                author=self.user,
+            )),
+            (index, lambda: Group.objects.filter(
+                pk=self.group.pk
+            ).first().save()),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                change()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_bulk_comments_change_post_page(self):
+        """Комментарии, вставленные без сигналов, видны по Comment.created."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.user, text='Bulk'),
+        ])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Разные пользователи получают разные ETag одной страницы."""
+        url = reverse('posts:index')
+        authorized = Client()
+        authorized.force_login(self.user)
+        anonymous_etag = self.client.get(url)['ETag']
+        response = authorized.get(url, HTTP_IF_NONE_MATCH=anonymous_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.revalidate(url, authorized), 304)
+
+    def test_page_object_is_loaded_once(self):
+        """Обработчик берет объект страницы, загруженный для валидаторов."""
+        _, group, profile, detail = self.urls
+        for url, namespace in ((group, 'group'), (profile, 'user'),
+                               (detail, 'post')):
+            with self.subTest(url=url), mock.patch.object(
+                caching, 'cache_aside', wraps=caching.cache_aside,
+            ) as cache_aside:
+                self.client.get(url)
+                self.assertEqual(
+                    [call[0][0] for call in cache_aside.call_args_list],
+                    [namespace],
+                )
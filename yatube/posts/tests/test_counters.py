@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import counters
+from ..models import Follow, Group, Post, User
+from ..paginators import CountedPaginator
+
+
+class FeedCountersTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Test_group_title',
+            slug='Test_URL',
+            description='Test_description',
+        )
+
+    def setUp(self):
+        cache.clear()
+        Post.objects.create(text='Test text', author=self.author)
+
+    def test_count_is_cached(self):
+        """Повторное чтение счетчика не обращается к базе."""
+        with self.assertNumQueries(1):
+            counters.get_count(counters.feed('all'), Post.objects.all())
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                counters.get_count(counters.feed('all'), Post.objects.all()),
+                1,
+            )
+
+    def test_counts_follow_saved_and_deleted_posts(self):
+        """Счетчики лент обновляются при создании и удалении поста."""
+        feeds = {
+            counters.feed('all'): Post.objects.all(),
+            counters.feed('author', self.author.pk): self.author.posts.all(),
+            counters.feed('group', self.group.pk): self.group.posts.all(),
+        }
+        for feed_name, post_list in feeds.items():
+            counters.get_count(feed_name, post_list)
+        post = Post.objects.create(
+            text='New post', author=self.author, group=self.group,
+        )
+        expected = {
+            counters.feed('all'): 2,
+            counters.feed('author', self.author.pk): 2,
+            counters.feed('group', self.group.pk): 1,
+        }
+        for feed_name, count in expected.items():
+            with self.subTest(feed=feed_name), self.assertNumQueries(0):
+                self.assertEqual(
+                    counters.get_count(feed_name, feeds[feed_name]), count
+                )
+        post.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                counters.get_count(
+                    counters.feed('group', self.group.pk),
+                    self.group.posts.all(),
+                ),
+                0,
+            )
+
+    def test_follow_feed_count_is_reset(self):
+        """Счетчик ленты подписок сбрасывается при подписке."""
+        feed_name = counters.feed('follow', self.reader.pk)
+        post_list = Post.objects.filter(author__following__user=self.reader)
+        self.assertEqual(counters.get_count(feed_name, post_list), 0)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(counters.get_count(feed_name, post_list), 1)
+
+    def test_approximate_count_shows_page_window(self):
+        """Для огромной ленты выводится окно номеров страниц."""
+        paginator = CountedPaginator(
+            Post.objects.all(), 10, lambda: 10 ** 6
+        )
+        paginator.page(50)
+        self.assertTrue(paginator.is_approximate)
+        self.assertEqual(list(paginator.visible_range), list(range(47, 54)))
@@ -0,0 +1,78 @@
+import random
+import shutil
+import tempfile
+from collections import Counter
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+
+from ..dataset import power_law_index
+from ..models import (AuthorStats, Comment, FeedEntry, Follow, Group, Post,
+                      User)
+from ..search import search_posts
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class PowerLawTests(TestCase):
+
+    def test_index_in_range_and_skewed(self):
+        """Индексы в пределах размера, первые выпадают чаще всего."""
+        rng = random.Random(1)
+        hits = Counter(power_law_index(rng, 100, 1.2) for _ in range(5000))
+        self.assertTrue(set(hits) <= set(range(100)))
+        self.assertEqual(hits.most_common(1)[0][0], 0)
+        self.assertGreater(hits[0], hits[50] * 10)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BuildDatasetTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_build_dataset(self):
+        """Команда создает связанный набор данных и производные."""
+        User.objects.create_user(username='existing')
+        call_command(
+            'build_dataset', users=30, groups=3, posts=200, comments=100,
+            follows=5, images=2, days=30, batch_size=64, seed=7,
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 31)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertEqual(Post.objects.exclude(image='').count(), 2)
+        self.assertGreater(
+            Post.objects.dates('pub_date', 'day').count(), 1
+        )
+
+        top_author, top_posts = Post.objects.order_by().values_list(
+            'author'
+        ).annotate(total=Count('pk')).order_by('-total')[0]
+        self.assertGreater(top_posts, 200 / 30 * 2)
+        self.assertEqual(
+            AuthorStats.objects.get(author_id=top_author).posts_count,
+            top_posts,
+        )
+        self.assertTrue(
+            User.objects.get(pk=top_author).check_password('password')
+        )
+        follow = Follow.objects.first()
+        self.assertTrue(FeedEntry.objects.filter(
+            user_id=follow.user_id, author_id=follow.author_id
+        ).exists())
+        word = Post.objects.first().text.split()[0]
+        self.assertGreater(search_posts(word).count(), 0)
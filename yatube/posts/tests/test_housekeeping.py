@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .. import housekeeping, thumbnails, variants
+from ..constants import THUMBNAIL_PRESETS
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(name='image.png'):
+    buffer = BytesIO()
+    Image.new('RGB', (400, 300), 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class HousekeepingTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(default_storage.path('cache'), ignore_errors=True)
+        with mock.patch.object(thumbnails, 'run_in_background'), \
+                mock.patch.object(thumbnails, 'schedule_presets'):
+            self.post = Post.objects.create(
+                text='Test text', author=self.user, image=image_file(),
+            )
+        geometry_string, options = THUMBNAIL_PRESETS[0]
+        self.thumbnail = thumbnails.generate(
+            self.post.image.name, geometry_string, options
+        )
+        variants.save_variants(self.post.pk, self.post.image.name)
+        self.post.refresh_from_db()
+
+    def test_deleted_post_releases_image(self):
+        """Удаление поста освобождает картинку, миниатюры и варианты."""
+        name = self.post.image.name
+        variant_names = [item['name'] for item in self.post.variants]
+        with mock.patch.object(thumbnails, 'run_in_background') as queued:
+            self.post.delete()
+        queued.assert_called_once_with(
+            housekeeping.release_image, name, variant_names
+        )
+        self.assertGreater(
+            housekeeping.release_image(name, variant_names), 0
+        )
+        self.assertFalse(self.thumbnail.exists())
+        self.assertFalse(default_storage.exists(name))
+        self.assertIsNone(default.kvstore.get(self.thumbnail))
+        for variant_name in variant_names:
+            self.assertFalse(default_storage.exists(variant_name))
+
+    def test_shared_image_is_kept(self):
+        """Картинка, которой пользуется другой пост, не трогается."""
+        Post.objects.create(
+            text='Copy', author=self.user, image=self.post.image.name,
+        )
+        self.assertEqual(
+            housekeeping.release_image(self.post.image.name, []), 0
+        )
+        self.assertTrue(self.thumbnail.exists())
+
+    def test_duplicate_upload_keeps_released_image(self):
+        """Несохраненная повторная загрузка не дает удалить файл."""
+        name = self.post.image.name
+        variant_names = [item['name'] for item in self.post.variants]
+        with mock.patch.object(thumbnails, 'run_in_background'):
+            self.post.delete()
+        storage = Post._meta.get_field('image').storage
+        self.assertEqual(storage.save('posts/image.png', image_file()), name)
+        self.assertEqual(housekeeping.release_image(name, variant_names), 0)
+        self.assertTrue(storage.exists(name))
+        self.assertTrue(self.thumbnail.exists())
+
+    def test_duplicate_upload_during_release(self):
+        """Загрузка того же файла посреди освобождения его сохраняет."""
+        name = self.post.image.name
+        variant_names = [item['name'] for item in self.post.variants]
+        with mock.patch.object(thumbnails, 'run_in_background'):
+            self.post.delete()
+        storage = Post._meta.get_field('image').storage
+        is_claimed = storage.is_claimed
+
+        def upload_duplicate(claimed_name):
+            # Файл уже переименован: загрузка записывает его заново.
+            self.assertFalse(storage.exists(name))
+            self.assertEqual(
+                storage.save('posts/image.png', image_file()), name
+            )
+            return is_claimed(claimed_name)
+
+        with mock.patch.object(
+            storage, 'is_claimed', side_effect=upload_duplicate,
+        ):
+            self.assertEqual(
+                housekeeping.release_image(name, variant_names), 0
+            )
+        self.assertTrue(storage.exists(name))
+        self.assertFalse(os.path.exists(
+            storage.path(name) + housekeeping.RELEASING_SUFFIX
+        ))
+        self.assertTrue(self.thumbnail.exists())
+        for variant_name in variant_names:
+            self.assertTrue(default_storage.exists(variant_name))
+
+    def test_sweeper_removes_orphans(self):
+        """Уборка удаляет файлы и записи без пары, живые не трогает."""
+        orphan = default_storage.save('cache/00/00/orphan.png', ContentFile(
+            b'x' * 100
+        ))
+        lost = ImageFile('posts/lost.png', default_storage)
+        lost.set_size((10, 10))
+        default.kvstore.set(lost)
+
+        self.assertEqual(housekeeping.sweep_kvstore(dry_run=True), 1)
+        self.assertEqual(
+            housekeeping.sweep_cache_files(dry_run=True), (1, 100)
+        )
+        self.assertTrue(default_storage.exists(orphan))
+
+        self.assertEqual(housekeeping.sweep_kvstore(batch_size=1), 1)
+        self.assertEqual(
+            housekeeping.sweep_cache_files(batch_size=1), (1, 100)
+        )
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertIsNone(default.kvstore.get(lost))
+        self.assertTrue(self.thumbnail.exists())
+        self.assertIsNotNone(default.kvstore.get(self.thumbnail))
+        self.assertTrue(os.path.isdir(default_storage.path('cache')))
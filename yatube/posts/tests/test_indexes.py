@@ -0,0 +1,101 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+FEED_TABLES = ('posts_post', 'posts_comment', 'posts_follow',
+               'posts_feedentry')
+
+FULL_SCAN = re.compile(
+    r'SCAN (TABLE )?(?P<table>\w+)(?! USING)(?!\w)'
+)
+
+
+def query_plan(sql):
+    """Строки EXPLAIN QUERY PLAN для уже подставленного SQL."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class FeedIndexesTests(TestCase):
+    """
+    Каждый запрос представлений posts к таблицам лент
+    должен идти по индексу, без полного просмотра и без сортировки
+    во временном B-дереве.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Test_group_title',
+            slug='Test_URL',
+            description='Test_description',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Test text', author=cls.author, group=cls.group,
+        )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Hi')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def assert_indexed(self, url, data=None, allow_sort=False):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, data)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(
+                table in sql for table in FEED_TABLES
+            ):
+                continue
+            for line in query_plan(sql):
+                with self.subTest(url=url, data=data, plan=line, sql=sql):
+                    match = FULL_SCAN.search(line)
+                    self.assertFalse(
+                        match and match.group('table') in FEED_TABLES,
+                        'Полный просмотр таблицы ленты',
+                    )
+                    if not allow_sort:
+                        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', line)
+
+    def test_feed_views_use_indexes(self):
+        """Ленты (курсор и номера страниц) читаются по индексам."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+        for url in urls:
+            self.assert_indexed(url)
+            self.assert_indexed(url, {'page': 1})
+
+    def test_post_detail_uses_indexes(self):
+        """Страница поста и его комментарии читаются по индексам."""
+        self.assert_indexed(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+
+    def test_follow_index_uses_indexes(self):
+        """
+        Готовая лента подписок читается по индексам без сортировки.
+        Выборка через JOIN с подписками (без fan-out и по номерам
+        страниц) тоже идет по индексам, но сортирует посты авторов.
+        """
+        url = reverse('posts:follow_index')
+        with override_settings(POSTS_FOLLOW_FANOUT=True):
+            self.assert_indexed(url)
+        with override_settings(POSTS_FOLLOW_FANOUT=False):
+            self.assert_indexed(url, allow_sort=True)
+        self.assert_indexed(url, {'page': 1}, allow_sort=True)
@@ -0,0 +1,94 @@
+import zlib
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..pagecache import PAGE_KEY, _page_key
+
+
+class AnonymousPageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Test_group_title',
+            slug='Test_URL',
+            description='Test_description',
+        )
+        cls.post = Post.objects.create(
+            text='Test text', author=cls.user, group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def page_entries(self):
+        prefix = PAGE_KEY.format(digest='')
+        return [key for key in cache._cache if prefix in key]
+
+    def test_repeat_request_is_served_from_cache(self):
+        """Повторный анонимный запрос не строит страницу заново."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(1):
+                    second = self.client.get(url)
+                self.assertEqual(second.status_code, 200)
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(second['Content-Type'], first['Content-Type'])
+
+    def test_stored_page_is_compressed(self):
+        """В кеше лежит сжатое содержимое страницы."""
+        response = self.client.get(reverse('posts:index'))
+        entry = cache.get(_page_key(response.wsgi_request))
+        self.assertLess(len(entry['content']), len(response.content))
+        self.assertEqual(zlib.decompress(entry['content']), response.content)
+
+    def test_query_string_is_part_of_key(self):
+        """Страницы с разной строкой запроса кешируются отдельно."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index') + '?page=2')
+        self.assertEqual(len(self.page_entries()), 2)
+
+    def test_authenticated_user_bypasses_cache(self):
+        """Авторизованный пользователь получает свою страницу."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        authorized = Client()
+        authorized.force_login(self.user)
+        response = authorized.get(url)
+        self.assertContains(response, reverse('posts:post_create'))
+        self.assertEqual(len(self.page_entries()), 1)
+
+    def test_changes_invalidate_cached_pages(self):
+        """Новые записи сразу видны анонимным читателям."""
+        index = reverse('posts:index')
+        detail = reverse('posts:post_detail', args=[self.post.pk])
+        profile = reverse('posts:profile', args=[self.user.username])
+        changes = (
+            (index, 'New post', lambda: Post.objects.create(
+                text='New post', author=self.user,
+            )),
+            (detail, 'New comment', lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='New comment',
+            )),
+            (profile, 'подписчиков: <span class="badge bg-info">1<',
+             lambda: Follow.objects.create(
+                 user=User.objects.create_user(username='reader'),
+                 author=self.user,
+             )),
+        )
+        for url, text, change in changes:
+            with self.subTest(url=url):
+                self.client.get(url)
+                change()
+                self.assertContains(self.client.get(url), text)
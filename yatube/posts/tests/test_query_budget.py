@@ -0,0 +1,151 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import queries
+from core.queries import QueryBudgetExceeded
+from .. import views
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Test_group_title',
+            slug='Test_URL',
+            description='Test_description',
+        )
+        cls.post = Post.objects.create(
+            text='Test text', author=cls.user, group=cls.group,
+        )
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Comment {number}',
+            )
+        cls.image_post = Post.objects.create(
+            text='Image text', author=cls.user, group=cls.group,
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.image_post, author=cls.user,
+                text=f'Image comment {number}',
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_views_fit_their_budgets(self):
+        """Страницы укладываются в объявленный бюджет запросов."""
+        pages = {
+            reverse('posts:index'): views.index,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}):
+                views.group_posts,
+            reverse('posts:profile', kwargs={'username': self.user}):
+                views.profile,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}):
+                views.post_detail,
+            reverse('posts:follow_index'): views.follow_index,
+        }
+        for url, view in pages.items():
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertLessEqual(
+                    int(response['X-Query-Count']), view.query_budget
+                )
+
+    def test_post_detail_queries_do_not_grow_with_comments(self):
+        """Число запросов post_detail не зависит от числа комментариев."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        # Авторизованный клиент: анонимным страница отдается из кеша.
+        self.authorized_client.get(url)
+        # Сессия и пользователь, свежий комментарий для валидаторов
+        # условного GET, комментарии страницы и статистика автора.
+        with self.assertNumQueries(5):
+            self.authorized_client.get(url)
+        commenter = User.objects.create_user(username='commenter')
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=commenter, text='More')
+            for _ in range(5)
+        ])
+        with self.assertNumQueries(5):
+            response = self.authorized_client.get(url)
+        self.assertEqual(int(response['X-Query-Duplicates']), 0)
+        self.assertContains(response, commenter.username)
+
+    def test_post_detail_with_image_fits_budget(self):
+        """Пост с картинкой и комментариями укладывается в бюджет."""
+        url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.image_post.pk}
+        )
+        # Холодный кеш: к пяти запросам страницы добавляются сам пост
+        # и проверка готовой миниатюры в хранилище ключей sorl.
+        response = self.authorized_client.get(url)
+        self.assertEqual(int(response['X-Query-Count']), 7)
+        self.assertEqual(views.post_detail.query_budget, 7)
+        commenter = User.objects.create_user(username='image_commenter')
+        Comment.objects.bulk_create([
+            Comment(post=self.image_post, author=commenter, text='More')
+            for _ in range(5)
+        ])
+        cache.clear()
+        response = self.authorized_client.get(url)
+        self.assertEqual(int(response['X-Query-Count']), 7)
+        self.assertContains(response, commenter.username)
+
+    def test_headers_report_duplicates(self):
+        """Заголовки отчета есть в ответе, а сводка копится по view_name."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.client.get(url)
+        self.assertIn('X-Query-Time-Ms', response)
+        self.assertGreaterEqual(int(response['X-Query-Duplicates']), 0)
+        summary = queries.view_summary()['posts:post_detail']
+        self.assertGreaterEqual(summary['requests'], 1)
+
+    def test_exceeded_budget_fails_in_strict_mode(self):
+        """В строгом режиме превышение бюджета приводит к исключению."""
+        with mock.patch.object(views.index, 'query_budget', 0):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('posts:index'))
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_exceeded_budget_is_logged(self):
+        """Без строгого режима превышение только пишется в журнал."""
+        with mock.patch.object(views.index, 'query_budget', 0):
+            with self.assertLogs('core.middleware', 'WARNING'):
+                response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
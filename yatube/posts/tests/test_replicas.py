@@ -0,0 +1,118 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.routers import (REPLICA_PIN_COOKIE, PrimaryReplicaRouter,
+                          use_replica)
+
+from ..models import Group, Post, User
+
+REPLICA = 'replica_test'
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Основная база - тестовая база default, реплика - отдельный файл
+    SQLite, в который копируется снимок основной. Записи после снимка
+    есть только в основной базе, как у отставшей реплики.
+    """
+
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.replica_path = os.path.join(cls.tmp, 'replica.sqlite3')
+        connections.databases[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': cls.replica_path,
+        }
+        cls.settings = override_settings(DATABASE_REPLICAS=[REPLICA])
+        cls.settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings.disable()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer')
+        self.group = Group.objects.create(
+            title='Test_group_title', slug='Test_URL',
+            description='Test_description',
+        )
+        self.replicated = Post.objects.create(
+            text='Replicated text', author=self.user, group=self.group,
+        )
+        self.replicate()
+        self.fresh = Post.objects.create(
+            text='Fresh text', author=self.user, group=self.group,
+        )
+        self.client = Client()
+
+    def replicate(self):
+        """Копирует основную базу в файл реплики."""
+        connections[REPLICA].close()
+        primary = connections['default']
+        primary.ensure_connection()
+        target = sqlite3.connect(self.replica_path)
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+
+    def detail(self, post):
+        return self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+
+    def test_reads_in_request_come_from_replica(self):
+        """Безопасный запрос читает посты из реплики."""
+        self.assertEqual(self.detail(self.replicated).status_code, 200)
+        self.assertEqual(self.detail(self.fresh).status_code, 404)
+
+    def test_reads_outside_request_come_from_primary(self):
+        """Без middleware (команды, фоновые задачи) чтение из основной."""
+        self.assertTrue(Post.objects.filter(pk=self.fresh.pk).exists())
+
+    def test_write_pins_user_to_primary(self):
+        """После записи пользователь читает основную базу."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Own text'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+        own = Post.objects.get(text='Own text')
+        self.assertFalse(
+            Post.objects.using(REPLICA).filter(pk=own.pk).exists()
+        )
+        self.assertEqual(self.detail(own).status_code, 200)
+
+        del self.client.cookies[REPLICA_PIN_COOKIE]
+        cache.clear()
+        self.assertEqual(self.detail(own).status_code, 404)
+
+    def test_router(self):
+        """Реплика - только для моделей posts и только до записи."""
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        with use_replica(REPLICA):
+            self.assertEqual(router.db_for_read(Post), REPLICA)
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertFalse(router.allow_migrate(REPLICA, 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..search import SubstringBackend, get_backend, search_posts
+from ..stemmer import stem
+
+
+class StemmerTests(TestCase):
+
+    def test_word_forms_share_stem(self):
+        """Разные формы слова сводятся к одной основе."""
+        for forms in (
+            ('книга', 'книги', 'книгами', 'книгу'),
+            ('красивая', 'красивые', 'красивого'),
+            ('публикация', 'публикации', 'публикациями'),
+        ):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(word) for word in forms}), 1)
+
+    def test_short_and_latin_words_kept(self):
+        """Слова без русских окончаний не меняются."""
+        self.assertEqual(stem('Django'), 'django')
+        self.assertEqual(stem('ёж'), 'еж')
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Книжный клуб', slug='books', description='Описание',
+        )
+        cls.books = Post.objects.create(
+            author=cls.user, group=cls.group,
+            text='Книги, книги и еще раз книги: обзор новых книг',
+        )
+        cls.book = Post.objects.create(
+            author=cls.user, text='Прочитал интересную книгу про котов',
+        )
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Коты спят весь день',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def found(self, query):
+        return [post.pk for post in search_posts(query)[:10]]
+
+    def test_search_matches_word_forms(self):
+        """Запрос находит посты с другими формами слова."""
+        self.assertCountEqual(
+            self.found('книгами'), [self.books.pk, self.book.pk]
+        )
+        self.assertCountEqual(self.found('кот'), [self.book.pk, self.cats.pk])
+
+    def test_all_terms_required(self):
+        """Найдены только посты со всеми словами запроса."""
+        self.assertEqual(self.found('книга коты'), [self.book.pk])
+        self.assertEqual(self.found('лошади'), [])
+        self.assertEqual(self.found('  ,. '), [])
+
+    def test_results_ranked(self):
+        """Пост, где слово встречается чаще, идет первым."""
+        self.assertEqual(self.found('книги')[0], self.books.pk)
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(pk=self.cats.pk)
+        post.text = 'Собаки гуляют'
+        post.save()
+        self.assertEqual(self.found('собака'), [post.pk])
+        self.assertNotIn(post.pk, self.found('коты'))
+        post.delete()
+        self.assertEqual(self.found('собака'), [])
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает очищенный индекс."""
+        get_backend().clear()
+        self.assertEqual(self.found('книги'), [])
+        call_command('rebuild_search_index', batch_size=2, stdout=StringIO())
+        self.assertCountEqual(
+            self.found('книги'), [self.books.pk, self.book.pk]
+        )
+
+    def test_substring_backend(self):
+        """Запасной бэкенд находит те же посты без FTS."""
+        results = search_posts('книгами')
+        results.backend = SubstringBackend()
+        self.assertEqual(results.count(), 2)
+        self.assertCountEqual(
+            [post.pk for post in results[:10]],
+            [self.books.pk, self.book.pk],
+        )
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные посты."""
+        response = Client().get(reverse('posts:search'), {'q': 'коты'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+        self.assertEqual(
+            {post.pk for post in response.context['page_obj']},
+            {self.book.pk, self.cats.pk},
+        )
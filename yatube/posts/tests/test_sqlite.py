@@ -0,0 +1,92 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.db import connections
+from django.db.backends.sqlite3.base import SQLiteCursorWrapper
+from django.test import SimpleTestCase, override_settings
+
+from core.backends.sqlite3.base import DatabaseWrapper, RetryingCursorWrapper
+
+
+class SqliteProfileTests(SimpleTestCase):
+    """Прагмы профиля, BEGIN IMMEDIATE и повтор при блокировке."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'db.sqlite3')
+        self.wrappers = []
+
+    def tearDown(self):
+        for wrapper in self.wrappers:
+            wrapper.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def wrapper(self):
+        wrapper = DatabaseWrapper({
+            **connections['default'].settings_dict, 'NAME': self.path,
+        })
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PROFILE='tuned', SQLITE_PRAGMAS={})
+    def test_tuned_profile_applies_pragmas(self):
+        """Профиль tuned включает WAL и ожидание блокировки."""
+        wrapper = self.wrapper()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+
+    @override_settings(SQLITE_PROFILE='stock',
+                       SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_stock_profile_with_extra_pragmas(self):
+        """Профиль stock оставляет журнал отката, SQLITE_PRAGMAS
+        дополняет прагмы профиля."""
+        wrapper = self.wrapper()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+
+    @override_settings(SQLITE_PROFILE='tuned', SQLITE_PRAGMAS={})
+    def test_transaction_takes_write_lock_at_begin(self):
+        """В профиле tuned транзакция сразу берет блокировку на запись."""
+        wrapper = self.wrapper()
+        wrapper.set_autocommit(
+            False, force_begin_transaction_with_broken_autocommit=True,
+        )
+        other = sqlite3.connect(self.path, timeout=0)
+        try:
+            with self.assertRaisesMessage(
+                sqlite3.OperationalError, 'database is locked'
+            ):
+                other.execute('BEGIN IMMEDIATE')
+        finally:
+            other.close()
+            wrapper.rollback()
+            wrapper.set_autocommit(True)
+
+    def test_locked_statement_is_retried(self):
+        """Запрос вне транзакции повторяется после "database is locked"."""
+        cursor = sqlite3.connect(':memory:').cursor(
+            factory=RetryingCursorWrapper
+        )
+        cursor.retries = 2
+        locked = sqlite3.OperationalError('database is locked')
+        with mock.patch.object(
+            SQLiteCursorWrapper, 'execute',
+            side_effect=[locked, locked, 'done'],
+        ) as execute, mock.patch('time.sleep'):
+            self.assertEqual(cursor.execute('SELECT 1'), 'done')
+        self.assertEqual(execute.call_count, 3)
+
+        with mock.patch.object(
+            SQLiteCursorWrapper, 'execute', side_effect=locked,
+        ), mock.patch('time.sleep'):
+            with self.assertRaises(sqlite3.OperationalError):
+                cursor.execute('SELECT 1')
@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
+from ..stats import get_author_stats
+
+
+class AuthorStatsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Test_group_title',
+            slug='Test_URL',
+            description='Test_description',
+        )
+
+    def stats_of(self, user):
+        return AuthorStats.objects.get(author=user)
+
+    def test_new_user_gets_stats(self):
+        """Счетчики заводятся при создании пользователя."""
+        user = User.objects.create_user(username='newcomer')
+        self.assertEqual(self.stats_of(user).posts_count, 0)
+
+    def test_missing_stats_are_read_as_zeros(self):
+        """Без записи счетчиков чтение отдает нули и ничего не пишет."""
+        AuthorStats.objects.filter(author=self.reader).delete()
+        with self.assertNumQueries(1):
+            stats = get_author_stats(self.reader)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertFalse(
+            AuthorStats.objects.filter(author=self.reader).exists()
+        )
+
+    def test_post_changes_author_and_group_counts(self):
+        """Создание и удаление поста меняют счетчики автора и группы."""
+        post = Post.objects.create(
+            text='Test text', author=self.author, group=self.group,
+        )
+        self.assertEqual(self.stats_of(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.delete()
+        self.assertEqual(self.stats_of(self.author).posts_count, 0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_follow_and_comment_counts(self):
+        """Подписка и комментарий меняют счетчики обоих пользователей."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Test text', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Hi')
+        reader_stats = self.stats_of(self.reader)
+        self.assertEqual(self.stats_of(self.author).followers_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(reader_stats.comments_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats_of(self.author).followers_count, 0)
+        self.assertEqual(self.stats_of(self.reader).following_count, 0)
+
+    def test_recount_stats_repairs_drift(self):
+        """Команда recount_stats исправляет разошедшиеся счетчики."""
+        Post.objects.bulk_create([
+            Post(text='Test text', author=self.author, group=self.group),
+            Post(text='Test text', author=self.author, group=self.group),
+        ])
+        AuthorStats.objects.filter(author=self.reader).delete()
+        call_command('recount_stats', stdout=StringIO())
+        self.assertEqual(self.stats_of(self.author).posts_count, 2)
+        self.assertTrue(
+            AuthorStats.objects.filter(author=self.reader).exists()
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 2)
+
+    def test_profile_reads_precomputed_counts(self):
+        """Страница профиля показывает счетчики из AuthorStats."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = Client().get(
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+        self.assertEqual(response.context['stats'].followers_count, 1)
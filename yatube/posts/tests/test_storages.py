@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import housekeeping, thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentHashStorageTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, text, file_name):
+        client = Client()
+        client.force_login(self.user)
+        with mock.patch.object(thumbnails, 'run_in_background'), \
+                mock.patch.object(thumbnails, 'schedule_presets'):
+            client.post(reverse('posts:post_create'), {
+                'text': text,
+                'image': SimpleUploadedFile(
+                    file_name, SMALL_GIF, content_type='image/gif'
+                ),
+            })
+        post = Post.objects.get(text=text)
+        # TestCase не фиксирует транзакцию: снимаем пометку повторной
+        # загрузки, как это делает on_commit после сохранения поста.
+        post.image.storage.unclaim(post.image.name)
+        return post
+
+    def test_duplicate_upload_reuses_file(self):
+        """Одинаковые картинки хранятся одним файлом."""
+        first = self.create_post('First', 'image.gif')
+        second = self.create_post('Second', 'repost.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.endswith('.gif'))
+        storage = first.image.storage
+        directory = storage.path(first.image.name.rsplit('/', 1)[0])
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_file_is_removed_with_last_reference(self):
+        """Файл удаляется только вместе с последним постом."""
+        first = self.create_post('First', 'image.gif')
+        second = self.create_post('Second', 'repost.gif')
+        name = first.image.name
+        first.delete()
+        self.assertEqual(housekeeping.release_image(name, []), 0)
+        self.assertTrue(second.image.storage.exists(name))
+        second.delete()
+        self.assertGreater(housekeeping.release_image(name, []), 0)
+        self.assertFalse(second.image.storage.exists(name))
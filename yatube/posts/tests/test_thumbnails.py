@@ -0,0 +1,92 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from .. import thumbnails
+from ..management.commands.warm_thumbnails import Command, image_names
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(name='image.png', color='red'):
+    """Небольшая PNG-картинка для загрузки в пост."""
+    uploaded = SimpleUploadedFile(name, b'', content_type='image/png')
+    uploaded.file.seek(0)
+    Image.new('RGB', (40, 30), color).save(uploaded.file, 'PNG')
+    uploaded.file.seek(0)
+    uploaded.size = uploaded.file.getbuffer().nbytes
+    return uploaded
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        with mock.patch.object(thumbnails, 'schedule_presets'):
+            self.post = Post.objects.create(
+                text='Test text', author=self.user, image=image_file(),
+            )
+
+    def test_saved_image_is_queued(self):
+        """Новое или замененное изображение ставится в очередь."""
+        with mock.patch.object(thumbnails, 'schedule_presets') as queued:
+            Post.objects.create(
+                text='Test text', author=self.user, image=image_file(),
+            )
+            self.post.text = 'Edited'
+            self.post.save()
+            self.post.image = image_file('other.png', 'blue')
+            self.post.save()
+        self.assertEqual(queued.call_count, 2)
+
+    def test_missing_thumbnail_is_not_built_in_request(self):
+        """
+        Без готовой миниатюры отдается заглушка с оригиналом,
+        а генерация ставится в очередь один раз.
+        """
+        self.addCleanup(thumbnails._pending.clear)
+        with mock.patch.object(thumbnails, '_submit') as queued:
+            im = get_thumbnail(self.post.image, '350x400', crop='center')
+            get_thumbnail(self.post.image, '350x400', crop='center')
+            thumbnails.build_deferred()
+        self.assertTrue(im.is_pending)
+        self.assertEqual(im.url, self.post.image.url)
+        self.assertEqual((im.width, im.height), (350, 400))
+        queued.assert_called_once_with(
+            thumbnails.generate, self.post.image.name, '350x400',
+            {'crop': 'center'},
+        )
+
+    def test_generated_thumbnail_is_served(self):
+        """После фоновой генерации шаблоны получают миниатюру."""
+        options = {'crop': 'center', 'upscale': True}
+        thumbnails.generate(self.post.image.name, '350x400', options)
+        im = get_thumbnail(self.post.image, '350x400', **options)
+        self.assertFalse(getattr(im, 'is_pending', False))
+        self.assertNotEqual(im.url, self.post.image.url)
+
+    def test_warm_command_builds_missing_thumbnails(self):
+        """Команда прогрева строит только недостающие миниатюры."""
+        self.assertIn(self.post.image.name, list(image_names()))
+        command = Command()
+        self.assertEqual(command.warm(self.post.image.name), 1)
+        self.assertEqual(command.warm(self.post.image.name), 0)
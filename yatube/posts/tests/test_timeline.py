@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timeline
+from ..models import AuthorStats, FeedEntry, Follow, Post, User
+
+
+@override_settings(POSTS_FOLLOW_FANOUT=True)
+class FollowTimelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed_texts(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост попадает в готовые ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Fresh post', author=self.author)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed_texts(), ['Fresh post'])
+
+    def test_follow_backfills_and_unfollow_cleans_up(self):
+        """Подписка заполняет ленту старыми постами, отписка очищает."""
+        Post.objects.create(text='Old post', author=self.author)
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(self.feed_texts(), ['Old post'])
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed_texts(), [])
+
+    def test_celebrity_posts_are_pulled(self):
+        """Посты авторов-"звезд" подмешиваются в ленту при чтении."""
+        AuthorStats.objects.filter(author=self.star).update(
+            followers_count=10 ** 6
+        )
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='Author post', author=self.author)
+        Post.objects.create(text='Star post', author=self.star)
+        self.assertFalse(
+            FeedEntry.objects.filter(author=self.star).exists()
+        )
+        self.assertEqual(self.feed_texts(), ['Star post', 'Author post'])
+
+    def test_timeline_is_trimmed_on_write(self):
+        """Лента обрезается до TIMELINE_LENGTH записей при публикации."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(timeline, 'TIMELINE_LENGTH', 2):
+            for number in range(3):
+                Post.objects.create(text=f'Post {number}', author=self.author)
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(self.feed_texts(), ['Post 2', 'Post 1'])
+
+    def test_rebuild_keeps_latest_posts_without_celebrities(self):
+        """Пересборка кладет в ленту последние посты, кроме "звезд"."""
+        AuthorStats.objects.filter(author=self.star).update(
+            followers_count=10 ** 6
+        )
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        for number in range(3):
+            Post.objects.create(text=f'Post {number}', author=self.author)
+        Post.objects.create(text='Star post', author=self.star)
+        FeedEntry.objects.all().delete()
+        with mock.patch.object(timeline, 'TIMELINE_LENGTH', 2):
+            timeline.rebuild(self.reader.pk, self.reader.pk)
+        self.assertEqual(
+            list(FeedEntry.objects.filter(user=self.reader).values_list(
+                'post__text', flat=True
+            )),
+            ['Post 2', 'Post 1'],
+        )
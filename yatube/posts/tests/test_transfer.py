@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
+from ..search import search_posts
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+PUB_DATE = datetime(2020, 5, 17, 12, 30, tzinfo=timezone.utc)
+
+
+def export(*args):
+    output = StringIO()
+    call_command('export_data', *args, stdout=output, stderr=StringIO())
+    return output.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост про котов',
+        )
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=PUB_DATE, image='posts/cat.gif',
+        )
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий',
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def import_file(self, content, *args, suffix='.ndjson'):
+        path = os.path.join(TEMP_MEDIA_ROOT, 'export' + suffix)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        call_command('import_data', path, *args, stdout=StringIO())
+
+    def test_export_ndjson_in_dependency_order(self):
+        """NDJSON содержит все модели, ссылки идут после целей."""
+        rows = [json.loads(line) for line in export().splitlines()]
+        self.assertEqual(
+            [row['model'] for row in rows],
+            ['users', 'users', 'groups', 'posts', 'comments', 'follows'],
+        )
+        self.assertEqual(rows[3]['author'], self.author.pk)
+        self.assertNotIn('password', rows[0])
+
+    def test_round_trip_remaps_keys(self):
+        """Загрузка в пустую базу восстанавливает записи и связи."""
+        content = export()
+        source = os.path.join(TEMP_MEDIA_ROOT, 'source')
+        os.makedirs(os.path.join(source, 'posts'))
+        with open(os.path.join(source, 'posts', 'cat.gif'), 'wb') as image:
+            image.write(SMALL_GIF)
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.create_user(username='other')
+
+        self.import_file(content, '--batch-size=1', f'--media-root={source}')
+
+        post = Post.objects.get()
+        self.assertEqual(post.author.username, 'author')
+        self.assertEqual(post.group.slug, 'group')
+        self.assertEqual(post.pub_date, PUB_DATE)
+        self.assertTrue(post.image.name.endswith('.gif'))
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        comment = Comment.objects.get()
+        self.assertEqual((comment.post, comment.author.username),
+                         (post, 'reader'))
+        self.assertTrue(Follow.objects.filter(
+            user__username='reader', author__username='author'
+        ).exists())
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(AuthorStats.objects.get(author=post.author)
+                         .posts_count, 1)
+        self.assertEqual(search_posts('коты').count(), 1)
+
+    def test_hashed_image_name_survives_round_trip(self):
+        """Имя картинки по хешу содержимого не меняется при переносе."""
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        name = f'posts/{digest[:2]}/{digest}.gif'
+        Post.objects.filter(pk=self.post.pk).update(image=name)
+        content = export()
+        source = os.path.join(TEMP_MEDIA_ROOT, 'hashed')
+        os.makedirs(os.path.join(source, os.path.dirname(name)))
+        with open(os.path.join(source, name), 'wb') as image:
+            image.write(SMALL_GIF)
+        Post.objects.all().delete()
+
+        self.import_file(content, f'--media-root={source}')
+
+        self.assertEqual(Post.objects.get().image.name, name)
+
+    def test_import_reuses_existing_users_and_skips_duplicates(self):
+        """Повторная загрузка не дублирует пользователей и подписки."""
+        self.import_file(export())
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            set(Post.objects.values_list('author_id', flat=True)),
+            {self.author.pk},
+        )
+
+    def test_csv_round_trip(self):
+        """Посты из CSV ссылаются на уже существующих авторов."""
+        content = export('--format=csv', '--models', 'posts')
+        self.assertTrue(content.startswith('id,text,pub_date,author,'))
+        Post.objects.all().delete()
+        self.import_file(content, '--model=posts', suffix='.csv')
+        post = Post.objects.get()
+        self.assertEqual(post.author, self.author)
+        self.assertEqual(post.image_width, None)
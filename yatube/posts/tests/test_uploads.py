@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails, uploads
+from ..constants import IMAGE_MAX_SIDE
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+EXIF_ORIENTATION = 0x0112
+
+
+def jpeg_file(name='photo.jpg', size=(4000, 3000), orientation=None):
+    """JPEG со случайным шумом и, при необходимости, поворотом в EXIF."""
+    image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[EXIF_ORIENTATION] = orientation
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=95, exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadNormalizationTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_image_is_rotated_capped_and_stripped(self):
+        """Картинка поворачивается по EXIF, уменьшается и теряет EXIF."""
+        upload = jpeg_file(orientation=6)
+        normalized, width, height, size = uploads.normalize_image(upload)
+        self.assertEqual(normalized.name, 'photo.jpg')
+        self.assertEqual((width, height), (1920, IMAGE_MAX_SIDE))
+        self.assertEqual(size, normalized.size)
+        image = Image.open(normalized)
+        self.assertEqual(image.size, (width, height))
+        self.assertNotIn(EXIF_ORIENTATION, image.getexif())
+
+    def test_image_fits_size_budget(self):
+        """Файл перекодируется, пока не уложится в бюджет размера."""
+        with mock.patch.object(uploads, 'IMAGE_MAX_BYTES', 50 * 1024):
+            _, width, _, size = uploads.normalize_image(
+                jpeg_file(size=(800, 600))
+            )
+        self.assertLessEqual(size, 50 * 1024)
+        self.assertLess(width, 800)
+
+    def test_png_is_encoded_once_per_size(self):
+        """PNG без quality перекодируется только с уменьшением размера."""
+        image = Image.frombytes('RGB', (300, 300), os.urandom(300 * 300 * 3))
+        buffer = BytesIO()
+        image.save(buffer, 'PNG')
+        upload = SimpleUploadedFile('noise.png', buffer.getvalue())
+        encode = mock.Mock(wraps=uploads._encode)
+        with mock.patch.object(uploads, 'IMAGE_MAX_BYTES', 20 * 1024), \
+                mock.patch.object(uploads, '_encode', encode):
+            normalized, width, _, size = uploads.normalize_image(upload)
+        self.assertEqual(normalized.name, 'noise.png')
+        self.assertLessEqual(size, 20 * 1024)
+        self.assertLess(width, 300)
+        sizes = [call.args[0].size for call in encode.call_args_list]
+        self.assertEqual(len(sizes), len(set(sizes)))
+
+    def test_too_large_upload_is_rejected(self):
+        """Слишком большой файл отклоняется до декодирования."""
+        with mock.patch.object(uploads, 'IMAGE_UPLOAD_MAX_BYTES', 1024):
+            with self.assertRaises(ValidationError):
+                uploads.normalize_image(jpeg_file(size=(100, 100)))
+
+    def test_post_form_records_dimensions(self):
+        """Форма поста сохраняет размеры нормализованной картинки."""
+        client = Client()
+        client.force_login(self.user)
+        with mock.patch.object(thumbnails, 'run_in_background'), \
+                mock.patch.object(thumbnails, 'schedule_presets'):
+            client.post(reverse('posts:post_create'), {
+                'text': 'Photo', 'image': jpeg_file(size=(3000, 1000)),
+            })
+        post = Post.objects.get(text='Photo')
+        self.assertEqual(
+            (post.image_width, post.image_height), (IMAGE_MAX_SIDE, 853)
+        )
+        self.assertEqual(post.image_bytes, post.image.size)
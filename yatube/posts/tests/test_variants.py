@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails, variants
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(name='image.png', size=(800, 600)):
+    """PNG-картинка заданного размера для загрузки в пост."""
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageVariantsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        with mock.patch.object(thumbnails, 'run_in_background'), \
+                mock.patch.object(thumbnails, 'schedule_presets'):
+            self.post = Post.objects.create(
+                text='Test text', author=self.user, image=image_file(),
+            )
+
+    def test_variants_cover_widths_and_formats(self):
+        """Варианты строятся во всех ширинах до исходной и всех форматах."""
+        built = variants.build_variants(self.post.image.name)
+        formats = variants.available_formats() + ['PNG']
+        self.assertEqual(
+            [(item['width'], item['format']) for item in built],
+            [(width, name) for width in (350, 700, 800) for name in formats],
+        )
+        for item in built:
+            with default_storage.open(item['name']) as saved:
+                self.assertEqual(Image.open(saved).width, item['width'])
+
+    def test_picture_is_rendered_without_storage_calls(self):
+        """Разметка <picture> строится по сохраненным именам вариантов."""
+        variants.save_variants(self.post.pk, self.post.image.name)
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.variants)
+        with mock.patch.object(FileSystemStorage, 'exists') as exists:
+            response = self.client.get(
+                reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+            )
+        exists.assert_not_called()
+        self.assertContains(response, '<picture>')
+        self.assertContains(
+            response, default_storage.url(self.post.variants[-1]['name'])
+        )
+
+    def test_new_image_resets_variants(self):
+        """Замена картинки сбрасывает варианты и ставит новые в очередь."""
+        variants.save_variants(self.post.pk, self.post.image.name)
+        self.post.refresh_from_db()
+        with mock.patch.object(thumbnails, 'run_in_background') as queued, \
+                mock.patch.object(thumbnails, 'schedule_presets'):
+            self.post.image = image_file('other.png', (600, 400))
+            self.post.save()
+        queued.assert_called_with(
+            variants.save_variants, self.post.pk, self.post.image.name
+        )
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).image_variants, ''
+        )
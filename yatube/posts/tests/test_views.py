@@ -1,3 +1,5 @@
+import base64
+import json
 import shutil
 import tempfile
 
@@ -9,8 +11,10 @@ from django.urls import reverse
 from django.test import Client, TestCase, override_settings
 
 
+from .. import thumbnails
 from ..models import Group, Post, User, Follow, Comment
-from ..constants import ALL_POSTS, POSTS_PER_PAGE
+from ..constants import (ALL_POSTS, COMMENTS_PER_PAGE, POSTS_PER_PAGE,
+                         THUMBNAIL_PRESETS)
 from ..forms import PostForm, CommentForm
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -247,20 +251,61 @@ class PostViewsTests(TestCase):
         is_edit = response.context['is_edit']
         self.assertTrue(is_edit, True)
 
+    def test_post_edit_saves_fresh_post(self):
+        """Правка поста не затирает поля, измененные после кеширования."""
+        self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        Post.objects.filter(pk=self.post.pk).update(image_variants='[]')
+        self.author.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            {'text': 'Edited', 'group': self.group.pk},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Edited')
+        self.assertEqual(self.post.image_variants, '[]')
+
     def test_cache_index_page(self):
-        """Посты на странице index кешируются."""
+        """
+        Посты на странице index кешируются, а сохранение поста
+        сразу делает закешированный фрагмент устаревшим.
+        """
+        # Готовая миниатюра: ее генерация тоже обновляет фрагмент.
+        for geometry_string, options in THUMBNAIL_PRESETS:
+            thumbnails.generate(self.post.image.name, geometry_string, options)
         response = self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Changed quietly')
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Changed quietly', response.content.decode())
+        self.post.text = 'Changed with save'
+        self.post.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('Changed with save', response.content.decode())
+
+    def test_new_post_appears_on_cached_index_page(self):
+        """Новый пост сразу виден на закешированной странице index."""
+        self.client.get(reverse('posts:index'))
         new_post = Post.objects.create(
             text='Cache test text',
             author=self.user2,
             group=self.group,
         )
         response = self.client.get(reverse('posts:index'))
-        self.assertNotIn(new_post.text, response.content.decode())
-        cache.clear()
-        response = self.client.get(reverse('posts:index'))
         self.assertIn(new_post.text, response.content.decode())
 
+    def test_cached_pages_do_not_mix(self):
+        """Разные страницы ленты кешируются под разными ключами."""
+        Post.objects.bulk_create([
+            Post(text=f'Bulk post {number}', author=self.user2)
+            for number in range(POSTS_PER_PAGE)
+        ])
+        first_page = self.client.get(reverse('posts:index'))
+        second_page = self.client.get(reverse('posts:index'), {
+            'cursor': first_page.context['page_obj'].paginator.next_cursor
+        })
+        self.assertIn(self.post.text, second_page.content.decode())
+        self.assertNotIn(self.post.text, first_page.content.decode())
+
     def test_authorized_client_can_follow(self):
         """
         Авторизованный пользователь может подписываться
@@ -348,6 +393,9 @@ class PaginatorViewsTest(TestCase):
         ]
         Post.objects.bulk_create(cls.posts_list)
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_page_contains_ten_records(self):
         """
         На первой странице index/group_list/profile
@@ -384,3 +432,93 @@ class PaginatorViewsTest(TestCase):
                 response.context['page_obj']),
                 ALL_POSTS - POSTS_PER_PAGE,
             )
+
+    def test_cursor_pages_follow_each_other(self):
+        """
+        Курсор `next_cursor` ведет на следующую страницу,
+        а `previous_cursor` возвращает на предыдущую.
+        """
+        url = reverse('posts:index')
+        first_page = self.authorized_client.get(url).context['page_obj']
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+        second_page = self.authorized_client.get(
+            url, {'cursor': first_page.paginator.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page), ALL_POSTS - POSTS_PER_PAGE)
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        shown = {post.id for post in first_page} | {
+            post.id for post in second_page
+        }
+        self.assertEqual(len(shown), ALL_POSTS)
+        back_page = self.authorized_client.get(
+            url, {'cursor': second_page.paginator.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [post.id for post in back_page],
+            [post.id for post in first_page],
+        )
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор показывает первую страницу ленты."""
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(len(response.context['page_obj']), POSTS_PER_PAGE)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_forged_cursor_shows_first_page(self):
+        """
+        Курсор с позицией не того типа, с null или не той длины
+        показывает первую страницу, а не ошибку.
+        """
+        post = Post.objects.first()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:post_comments', args=[post.pk]),
+            reverse('api:posts'),
+        )
+        positions = (
+            ['garbage', '1'], ['2020-01-01T00:00:00', 'x'], [None, None],
+            'ab', ['2020-01-01T00:00:00'], ['', ''],
+        )
+        for url in urls:
+            for position in positions:
+                cursor = base64.urlsafe_b64encode(
+                    json.dumps({'d': 'n', 'p': position}).encode()
+                ).decode()
+                with self.subTest(url=url, position=position):
+                    response = self.authorized_client.get(
+                        url, {'cursor': cursor}
+                    )
+                    self.assertEqual(response.status_code, 200)
+
+    def test_comments_load_by_pages(self):
+        """
+        На post_detail выводится первая страница комментариев,
+        остальные подгружаются по курсору фрагментом или JSON.
+        """
+        post = Post.objects.first()
+        Comment.objects.bulk_create([
+            Comment(post=post, author=self.user, text=f'Comment {number}')
+            for number in range(COMMENTS_PER_PAGE + 2)
+        ])
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        url = reverse('posts:post_comments', kwargs={'post_id': post.id})
+        cursor = comments.paginator.next_cursor
+        fragment = self.authorized_client.get(url, {'cursor': cursor})
+        self.assertTemplateUsed(fragment, 'posts/includes/comment_list.html')
+        self.assertEqual(len(fragment.context['comments']), 2)
+        data = self.authorized_client.get(
+            url, {'cursor': cursor, 'format': 'json'}
+        ).json()
+        self.assertIsNone(data['next_cursor'])
+        shown = {comment.id for comment in comments} | {
+            comment['id'] for comment in data['comments']
+        }
+        self.assertEqual(len(shown), COMMENTS_PER_PAGE + 2)
@@ -0,0 +1,205 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+
+from . import conditional
+from .caching import bump_versions
+from .constants import THUMBNAIL_PRESETS, THUMBNAIL_WORKERS
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_pending_lock = threading.Lock()
+_deferred = threading.local()
+
+
+class PendingThumbnail(ImageFile):
+    """
+    Заглушка вместо еще не готовой миниатюры: ссылка на оригинал
+    с запрошенными размерами, чтобы не сдвигалась верстка.
+    """
+
+    is_pending = True
+
+
+class AsyncThumbnailBackend(ThumbnailBackend):
+    """
+    Бэкенд sorl.thumbnail, который не строит миниатюры в запросе.
+
+    Готовая миниатюра берется из хранилища ключей sorl, а пока ее нет,
+    отдается `PendingThumbnail` с адресом исходного изображения и
+    генерация ставится в фоновый пул (повторно - только после
+    завершения уже поставленной). Заранее миниатюры строятся после
+    сохранения поста (см. `schedule_presets`) и командой
+    `warm_thumbnails`.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        cached = self.cached_thumbnail(file_, geometry_string, **options)
+        if cached is not None:
+            return cached
+        queue_missing(
+            getattr(file_, 'name', file_), geometry_string, options
+        )
+        placeholder = PendingThumbnail(file_)
+        placeholder.set_size(parse_geometry(geometry_string))
+
+        return placeholder
+
+    def cached_thumbnail(self, file_, geometry_string, **options):
+        """Миниатюра из хранилища ключей или None, без генерации."""
+        source = ImageFile(file_)
+        options = self.full_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+    def full_options(self, source, options):
+        """Опции с умолчаниями sorl, как в ThumbnailBackend.get_thumbnail."""
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
+
+    def generate(self, file_, geometry_string, **options):
+        """Строит миниатюру синхронно средствами sorl."""
+        return super().get_thumbnail(file_, geometry_string, **options)
+
+
+def _executor_instance():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+        )
+    return _executor
+
+
+def _job_key(name, geometry_string, options):
+    return name, geometry_string, tuple(sorted(options.items()))
+
+
+def source_file(name):
+    """Исходная картинка поста в хранилище поля Post.image."""
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def generate(name, geometry_string, options):
+    """
+    Строит миниатюру и сбрасывает версии постов с этим изображением,
+    чтобы кешированные фрагменты и страницы перестали показывать
+    заглушку.
+    """
+    backend = AsyncThumbnailBackend()
+    try:
+        thumbnail = backend.generate(
+            source_file(name), geometry_string, **options
+        )
+        posts = list(Post.objects.filter(image=name).values_list(
+            'pk', 'author_id', 'group_id'
+        ))
+        bump_versions([f'post:{pk}' for pk, _, _ in posts])
+        conditional.touch([
+            name for post in posts for name in conditional.post_pages(*post)
+        ])
+        return thumbnail
+    finally:
+        with _pending_lock:
+            _pending.discard(_job_key(name, geometry_string, options))
+
+
+def background_enabled():
+    """Идет ли обработка в пуле (settings.POSTS_IMAGES_IN_BACKGROUND)."""
+    return getattr(settings, 'POSTS_IMAGES_IN_BACKGROUND', True)
+
+
+def _call(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Обработка изображения %s завершилась ошибкой', args)
+
+
+def _run(func, *args):
+    try:
+        _call(func, *args)
+    finally:
+        connections.close_all()
+
+
+def _submit(func, *args):
+    if background_enabled():
+        _executor_instance().submit(_run, func, *args)
+    else:
+        _call(func, *args)
+
+
+def _submit_thumbnail(name, geometry_string, options):
+    key = _job_key(name, geometry_string, options)
+    with _pending_lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+    _submit(generate, name, geometry_string, options)
+
+
+def queue_missing(name, geometry_string, options):
+    """
+    Ставит в очередь миниатюру, которой не оказалось при показе.
+    Без фонового пула она строится после ответа (build_deferred),
+    а не посреди рендеринга страницы.
+    """
+    if background_enabled():
+        _submit_thumbnail(name, geometry_string, options)
+        return
+    if not hasattr(_deferred, 'jobs'):
+        _deferred.jobs = {}
+    _deferred.jobs.setdefault(
+        _job_key(name, geometry_string, options),
+        (name, geometry_string, options),
+    )
+
+
+def build_deferred():
+    """Строит миниатюры, отложенные queue_missing (сигнал request_finished)."""
+    jobs = getattr(_deferred, 'jobs', {})
+    _deferred.jobs = {}
+    for job in jobs.values():
+        _submit_thumbnail(*job)
+
+
+def schedule(name, geometry_string, options):
+    """Ставит генерацию миниатюры в пул после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: _submit_thumbnail(name, geometry_string, options)
+    )
+
+
+def schedule_presets(name):
+    """Ставит в очередь все миниатюры, которые показывают шаблоны."""
+    for geometry_string, options in THUMBNAIL_PRESETS:
+        schedule(name, geometry_string, options)
+
+
+def run_in_background(func, *args):
+    """Выполняет func(*args) в том же пуле после фиксации транзакции."""
+    transaction.on_commit(lambda: _submit(func, *args))
@@ -0,0 +1,226 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import OuterRef, Q, Subquery
+from django.utils.functional import cached_property
+
+from .constants import (FANOUT_BATCH_SIZE, FANOUT_MAX_FOLLOWERS,
+                        TIMELINE_LENGTH, TIMELINE_TRIM_BATCH_SIZE)
+from .models import AuthorStats, FeedEntry, Follow, Post, User
+from .paginators import CursorPaginator
+
+ENTRY_ORDERING = ('-pub_date', '-post_id')
+
+
+def fanout_enabled():
+    """Включена ли готовая лента подписок (settings.POSTS_FOLLOW_FANOUT)."""
+    return getattr(settings, 'POSTS_FOLLOW_FANOUT', False)
+
+
+def is_celebrity(author_id):
+    """
+    Автор с числом подписчиков больше FANOUT_MAX_FOLLOWERS.
+    Его посты не раскладываются по лентам, а подмешиваются при чтении.
+    """
+    return AuthorStats.objects.filter(
+        author_id=author_id, followers_count__gt=FANOUT_MAX_FOLLOWERS
+    ).exists()
+
+
+def celebrity_ids(user):
+    """Авторы из подписок пользователя, чьи посты читаются напрямую."""
+    return list(Follow.objects.filter(
+        user=user, author__stats__followers_count__gt=FANOUT_MAX_FOLLOWERS
+    ).values_list('author_id', flat=True))
+
+
+def _save_entries(entries):
+    """
+    Вставляет записи лент. Размер пачки не больше допустимого для базы:
+    в Django 2.2 явный batch_size не ограничивается лимитами SQLite.
+    """
+    batch_size = min(FANOUT_BATCH_SIZE, max(connection.ops.bulk_batch_size(
+        FeedEntry._meta.concrete_fields, entries
+    ), 1))
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=batch_size, ignore_conflicts=True
+    )
+
+
+def _push_batch(entries):
+    _save_entries(entries)
+    trim([entry.user_id for entry in entries])
+
+
+def push_post(post):
+    """
+    Раскладывает новый пост по лентам подписчиков автора и сразу
+    обрезает эти ленты до TIMELINE_LENGTH.
+    """
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    batch = []
+    for user_id in followers.iterator(chunk_size=FANOUT_BATCH_SIZE):
+        batch.append(FeedEntry(
+            user_id=user_id, post_id=post.pk,
+            author_id=post.author_id, pub_date=post.pub_date,
+        ))
+        if len(batch) == FANOUT_BATCH_SIZE:
+            _push_batch(batch)
+            batch = []
+    _push_batch(batch)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние посты автора."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:TIMELINE_LENGTH]
+    _save_entries([
+        FeedEntry(
+            user_id=user_id, post_id=post_id,
+            author_id=author_id, pub_date=pub_date,
+        )
+        for post_id, pub_date in posts
+    ])
+    trim([user_id])
+
+
+REBUILD_SQL = """
+    INSERT INTO {entries} (user_id, post_id, author_id, pub_date)
+    SELECT user_id, post_id, author_id, pub_date FROM (
+        SELECT follow.user_id, post.id AS post_id, post.author_id,
+               post.pub_date, {position} AS position
+        FROM {follows} follow
+        JOIN {posts} post ON post.author_id = follow.author_id
+        LEFT JOIN {stats} stats ON stats.author_id = follow.author_id
+        WHERE follow.user_id BETWEEN %s AND %s
+          AND (stats.followers_count IS NULL
+               OR stats.followers_count <= %s)
+    ) feed
+    WHERE position <= %s
+"""
+
+# Номер поста в ленте подписчика; без оконных функций лента
+# вставляется целиком и обрезается trim.
+POSITION_SQL = (
+    'ROW_NUMBER() OVER (PARTITION BY follow.user_id '
+    'ORDER BY post.pub_date DESC, post.id DESC)'
+)
+
+
+def rebuild(first_user_id, last_user_id):
+    """
+    Собирает заново ленты пользователей с id от first_user_id до
+    last_user_id одним INSERT ... SELECT: последние TIMELINE_LENGTH
+    постов всех их авторов, кроме "звезд".
+    """
+    FeedEntry.objects.filter(
+        user_id__gte=first_user_id, user_id__lte=last_user_id
+    ).delete()
+    sql = REBUILD_SQL.format(
+        entries=FeedEntry._meta.db_table,
+        follows=Follow._meta.db_table,
+        posts=Post._meta.db_table,
+        stats=AuthorStats._meta.db_table,
+        position=(
+            POSITION_SQL if connection.features.supports_over_clause
+            else '0'
+        ),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [
+            first_user_id, last_user_id, FANOUT_MAX_FOLLOWERS,
+            TIMELINE_LENGTH,
+        ])
+    if not connection.features.supports_over_clause:
+        trim(Follow.objects.filter(
+            user_id__gte=first_user_id, user_id__lte=last_user_id
+        ).values_list('user_id', flat=True).distinct())
+
+
+def cleanup(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def _boundary(field):
+    """Поле первой лишней (TIMELINE_LENGTH + 1-й) записи ленты."""
+    return Subquery(FeedEntry.objects.filter(
+        user_id=OuterRef('pk')
+    ).order_by(*ENTRY_ORDERING).values(field)[
+        TIMELINE_LENGTH:TIMELINE_LENGTH + 1
+    ])
+
+
+def trim(user_ids):
+    """
+    Обрезает ленты пользователей до TIMELINE_LENGTH записей. На пачку
+    из TIMELINE_TRIM_BATCH_SIZE лент - один запрос за первыми лишними
+    записями и одно удаление их и более старых записей.
+    """
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), TIMELINE_TRIM_BATCH_SIZE):
+        overflowing = User.objects.filter(
+            pk__in=user_ids[start:start + TIMELINE_TRIM_BATCH_SIZE]
+        ).annotate(
+            boundary_date=_boundary('pub_date'),
+            boundary_post=_boundary('post_id'),
+        ).filter(boundary_date__isnull=False).values_list(
+            'pk', 'boundary_date', 'boundary_post'
+        )
+        condition = Q()
+        for user_id, pub_date, post_id in overflowing:
+            condition |= Q(user_id=user_id) & (
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, post_id__lte=post_id)
+            )
+        if condition:
+            FeedEntry.objects.filter(condition).delete()
+
+
+class TimelinePaginator(CursorPaginator):
+    """
+    Курсорный вывод ленты подписок из готовых записей FeedEntry.
+
+    Посты авторов-"звезд" в ленты не раскладываются: они выбираются
+    напрямую тем же ключом (pub_date, id) и сливаются с готовой лентой.
+    Лента хранит не больше TIMELINE_LENGTH последних постов, более
+    старые записи доступны по номерам страниц `?page=`.
+    """
+
+    def __init__(self, object_list, per_page, user):
+        super().__init__(object_list, per_page)
+        self.user = user
+
+    @cached_property
+    def celebrity_ids(self):
+        return celebrity_ids(self.user)
+
+    def _fetch(self, position, forward, limit):
+        entry_fields = [name.lstrip('-') for name in ENTRY_ORDERING]
+        entries = FeedEntry.objects.filter(user=self.user)
+        pulled = Post.objects.filter(author_id__in=self.celebrity_ids)
+        if position is not None:
+            entries = entries.filter(
+                self._seek(position, forward, entry_fields)
+            )
+            pulled = pulled.filter(self._seek(position, forward))
+        if forward:
+            entries = entries.order_by(*ENTRY_ORDERING)
+        else:
+            entries = entries.order_by(
+                *self._reversed_ordering(entry_fields)
+            )
+            pulled = pulled.order_by(*self._reversed_ordering())
+        keys = set(entries.values_list('pub_date', 'post_id')[:limit])
+        if self.celebrity_ids:
+            keys.update(pulled.values_list('pub_date', 'id')[:limit])
+        keys = sorted(keys, reverse=forward)[:limit]
+        posts = self.object_list.in_bulk([post_id for _, post_id in keys])
+
+        return [posts[post_id] for _, post_id in keys if post_id in posts]
@@ -0,0 +1,339 @@
+import csv
+import json
+import os
+from collections import Counter, defaultdict
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Max
+
+from . import conditional, counters, search
+from .constants import TRANSFER_BATCH_SIZE, TRANSFER_CHUNK_SIZE
+from .models import Comment, Follow, Group, Post, User
+
+
+def restore_dates(model, objects, dates, names):
+    """
+    Возвращает полям auto_now_add (names) значения, которые
+    перезаписал bulk_create, одним bulk_update. dates - {id(obj):
+    [значения полей]}; None оставляет дату вставки. У объектов
+    уже должны быть id.
+    """
+    restore = []
+    for obj in objects:
+        saved = dates[id(obj)]
+        if any(value is not None for value in saved):
+            for name, value in zip(names, saved):
+                if value is not None:
+                    setattr(obj, name, value)
+            restore.append(obj)
+    if restore:
+        model.objects.bulk_update(restore, names)
+
+
+class Spec:
+    """
+    Описание модели для выгрузки и загрузки: поля (внешние ключи -
+    по имени поля, значение - id), на какие модели они ссылаются,
+    естественный ключ для поиска уже существующих записей и даты
+    auto_now_add, которые нужно сохранить из файла.
+    """
+
+    def __init__(self, model, fields, relations=None, natural_key=(),
+                 dates=()):
+        self.model = model
+        self.fields = fields
+        self.relations = relations or {}
+        self.natural_key = natural_key
+        self.dates = dates
+
+    def field(self, name):
+        return self.model._meta.get_field(name)
+
+    def attnames(self):
+        return [self.field(name).attname for name in self.fields]
+
+
+SPECS = {
+    'users': Spec(
+        User,
+        ('username', 'first_name', 'last_name', 'email', 'date_joined'),
+        natural_key=('username',),
+    ),
+    'groups': Spec(
+        Group, ('title', 'slug', 'description'), natural_key=('slug',),
+    ),
+    'posts': Spec(
+        Post,
+        ('text', 'pub_date', 'author', 'group', 'image', 'image_width',
+         'image_height', 'image_bytes'),
+        relations={'author': 'users', 'group': 'groups'},
+        dates=('pub_date',),
+    ),
+    'comments': Spec(
+        Comment,
+        ('post', 'author', 'text', 'created'),
+        relations={'post': 'posts', 'author': 'users'},
+        dates=('created',),
+    ),
+    'follows': Spec(
+        Follow,
+        ('user', 'author'),
+        relations={'user': 'users', 'author': 'users'},
+        natural_key=('user', 'author'),
+    ),
+}
+
+# Порядок выгрузки: модель идет после тех, на которые ссылается.
+MODEL_NAMES = tuple(SPECS)
+
+
+def export_rows(name, chunk_size=TRANSFER_CHUNK_SIZE):
+    """Записи модели словарями по возрастанию id, без загрузки всех."""
+    spec = SPECS[name]
+    columns = ('id',) + spec.fields
+    rows = spec.model.objects.order_by('pk').values_list(
+        'pk', *spec.attnames()
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(columns, row))
+
+
+def write_ndjson(stream, names, chunk_size=TRANSFER_CHUNK_SIZE):
+    """Выгружает модели в NDJSON: одна запись с полем model на строку."""
+    written = Counter()
+    for name in names:
+        for row in export_rows(name, chunk_size):
+            stream.write(json.dumps(
+                {'model': name, **row},
+                cls=DjangoJSONEncoder, ensure_ascii=False,
+            ) + '\n')
+            written[name] += 1
+    return written
+
+
+def write_csv(stream, name, chunk_size=TRANSFER_CHUNK_SIZE):
+    """Выгружает одну модель в CSV с заголовком из имен полей."""
+    writer = csv.DictWriter(stream, ('id',) + SPECS[name].fields)
+    writer.writeheader()
+    written = Counter()
+    for row in export_rows(name, chunk_size):
+        writer.writerow(row)
+        written[name] += 1
+    return written
+
+
+def read_ndjson(stream):
+    """Пары (модель, запись) из NDJSON."""
+    for line in stream:
+        if line.strip():
+            row = json.loads(line)
+            yield row.pop('model'), row
+
+
+def read_csv(stream, name):
+    """Пары (модель, запись) из CSV одной модели."""
+    for row in csv.DictReader(stream):
+        yield name, row
+
+
+class Importer:
+    """
+    Загрузка записей пачками через bulk_create, каждая пачка в своей
+    транзакции.
+
+    Старые id из файла сопоставляются новым: пользователи ищутся по
+    имени, группы по slug, подписки по паре пользователей, а ссылки на
+    записи, которых не было в файле, остаются как есть, если такие
+    записи уже есть в базе. Записи с ненайденной обязательной ссылкой
+    пропускаются. Картинки копируются из `media_root`, если он задан.
+    """
+
+    def __init__(self, batch_size=TRANSFER_BATCH_SIZE, media_root=None):
+        self.batch_size = batch_size
+        self.media_root = media_root
+        self.ids = defaultdict(dict)
+        self.created = Counter()
+        self.skipped = Counter()
+        self.touched = defaultdict(set)
+
+    def load(self, records):
+        name, batch = None, []
+        for record_name, row in records:
+            if record_name not in SPECS:
+                raise ValueError(f'Неизвестная модель: {record_name}')
+            if batch and (record_name != name
+                          or len(batch) >= self.batch_size):
+                self.flush(name, batch)
+                batch = []
+            name = record_name
+            batch.append(row)
+        if batch:
+            self.flush(name, batch)
+        return self.created
+
+    def _clean(self, spec, row):
+        values = {}
+        for name in spec.fields:
+            field = spec.field(name)
+            value = row.get(name)
+            if value == '' and field.null:
+                value = None
+            if name in spec.relations:
+                values[name] = value
+            elif value is not None:
+                values[name] = field.to_python(value)
+        return values
+
+    def _map_existing(self, spec, rows):
+        """Ссылки на записи вне файла: id, которые уже есть в базе."""
+        for name, target in spec.relations.items():
+            mapping = self.ids[target]
+            unknown = {
+                int(row[name]) for row in rows
+                if row[name] is not None and int(row[name]) not in mapping
+            }
+            if unknown:
+                model = SPECS[target].model
+                for pk in model.objects.filter(
+                    pk__in=unknown
+                ).values_list('pk', flat=True):
+                    mapping[pk] = pk
+
+    def _resolve(self, spec, values):
+        """
+        Подставляет новые id ссылок. Ненайденная ссылка обнуляется, если
+        связь объявлена с on_delete=SET_NULL, иначе запись пропускается
+        (возвращается None).
+        """
+        for name, target in spec.relations.items():
+            field = spec.field(name)
+            old = values.pop(name)
+            new = None if old is None else self.ids[target].get(int(old))
+            if (new is None and old is not None
+                    and field.remote_field.on_delete is not models.SET_NULL):
+                return None
+            values[field.attname] = new
+        return values
+
+    def _existing(self, spec, objects):
+        """Записи с тем же естественным ключом, что уже есть в базе."""
+        if not spec.natural_key or not objects:
+            return {}
+        attnames = [spec.field(name).attname for name in spec.natural_key]
+        lookup = {
+            f'{attnames[0]}__in': {
+                getattr(obj, attnames[0]) for obj in objects
+            }
+        }
+        return {
+            tuple(row[1:]): row[0]
+            for row in spec.model.objects.filter(**lookup).values_list(
+                'pk', *attnames
+            )
+        }
+
+    def _copy_image(self, obj):
+        path = os.path.join(self.media_root, obj.image.name)
+        if not os.path.isfile(path):
+            obj.image = ''
+            obj.image_width = obj.image_height = obj.image_bytes = None
+            return
+        field = Post._meta.get_field('image')
+        # Имя в выгрузке уже может быть хешем содержимого: сохраняем
+        # под каталогом upload_to, чтобы хранилище не вложило каталог
+        # хеша еще раз и имя совпало с исходным.
+        name = os.path.join(field.upload_to, os.path.basename(obj.image.name))
+        with open(path, 'rb') as source:
+            obj.image = field.storage.save(name, File(source))
+
+    def _prepare(self, name, spec, rows):
+        """Объекты для вставки и их старые id; связи уже сопоставлены."""
+        prepared = []
+        for row in rows:
+            values = self._resolve(spec, self._clean(spec, row))
+            if values is None:
+                self.skipped[name] += 1
+                continue
+            obj = spec.model(**values)
+            if name == 'users':
+                obj.password = make_password(None)
+            if name == 'posts' and obj.image and self.media_root:
+                self._copy_image(obj)
+            prepared.append((int(row['id']), obj))
+        return prepared
+
+    def _bulk_create(self, spec, objects):
+        """
+        bulk_create с id у созданных объектов. SQLite и MySQL не
+        возвращают id, поэтому они читаются после вставки по порядку:
+        пачка вставляется в транзакции, id растут.
+        """
+        if not objects:
+            return
+        model = spec.model
+        last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        dates = {
+            id(obj): [getattr(obj, name) for name in spec.dates]
+            for obj in objects
+        }
+        model.objects.bulk_create(objects)
+        if objects[0].pk is None:
+            pks = model.objects.filter(pk__gt=last_pk).order_by(
+                'pk'
+            ).values_list('pk', flat=True)
+            for obj, pk in zip(objects, pks):
+                obj.pk = pk
+        restore_dates(model, objects, dates, spec.dates)
+
+    def flush(self, name, rows):
+        spec = SPECS[name]
+        mapping = self.ids[name]
+        self._map_existing(spec, rows)
+        prepared = self._prepare(name, spec, rows)
+        with transaction.atomic():
+            existing = self._existing(spec, [obj for _, obj in prepared])
+            attnames = [
+                spec.field(field).attname for field in spec.natural_key
+            ]
+            new, aliases = [], []
+            for old_pk, obj in prepared:
+                key = tuple(getattr(obj, attname) for attname in attnames)
+                if attnames and key in existing:
+                    aliases.append((old_pk, existing[key]))
+                    self.skipped[name] += 1
+                    continue
+                if attnames:
+                    existing[key] = obj
+                new.append((old_pk, obj))
+            self._bulk_create(spec, [obj for _, obj in new])
+            for old_pk, obj in new:
+                mapping[old_pk] = obj.pk
+            for old_pk, target in aliases:
+                mapping[old_pk] = getattr(target, 'pk', target)
+            if name == 'posts':
+                search.get_backend().index([obj for _, obj in new])
+        self.created[name] += len(new)
+        for _, obj in new:
+            self._touch(name, obj)
+
+    def _touch(self, name, obj):
+        if name == 'posts':
+            self.touched['author'].add(obj.author_id)
+            if obj.group_id is not None:
+                self.touched['group'].add(obj.group_id)
+        elif name == 'follows':
+            self.touched['follow'].add(obj.user_id)
+
+    def forget_counts(self):
+        """
+        Сбрасывает кеш счетчиков лент, в которые попали записи, и
+        отмечает изменение всех страниц для условного GET.
+        """
+        feeds = [counters.feed('all')]
+        for kind, pks in self.touched.items():
+            feeds.extend(counters.feed(kind, pk) for pk in pks)
+        counters.forget_counts(feeds)
+        conditional.touch([conditional.SITE])
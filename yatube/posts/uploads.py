@@ -0,0 +1,97 @@
+import os
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+from .constants import (IMAGE_MAX_BYTES, IMAGE_MAX_SIDE, IMAGE_QUALITY_STEPS,
+                        IMAGE_UPLOAD_MAX_BYTES)
+
+CONTENT_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+}
+# Форматы, размер которых зависит от параметра quality.
+QUALITY_FORMATS = ('JPEG', 'WEBP')
+
+
+def _encode(image, image_format, quality):
+    """Кодирует изображение без метаданных (EXIF, ICC, комментарии)."""
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    options = {'optimize': True}
+    if image_format in QUALITY_FORMATS:
+        options['quality'] = quality
+    if image_format == 'JPEG':
+        options['progressive'] = True
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def _fit_budget(image, image_format):
+    """
+    Перекодирует с понижением качества, а затем и размера, пока
+    результат не уложится в IMAGE_MAX_BYTES. Форматы без quality
+    (PNG, GIF) кодируются один раз на каждый шаг размера.
+    """
+    if image_format in QUALITY_FORMATS:
+        qualities = IMAGE_QUALITY_STEPS
+    else:
+        qualities = IMAGE_QUALITY_STEPS[:1]
+    while True:
+        for quality in qualities:
+            data = _encode(image, image_format, quality)
+            if len(data) <= IMAGE_MAX_BYTES:
+                return image, data
+        width, height = image.size
+        if max(width, height) <= 1:
+            return image, data
+        image = image.resize(
+            (max(width * 3 // 4, 1), max(height * 3 // 4, 1)), Image.LANCZOS
+        )
+
+
+def normalize_image(upload):
+    """
+    Подготавливает загруженную картинку к хранению.
+
+    Поворачивает по EXIF, ограничивает длинную сторону IMAGE_MAX_SIDE,
+    убирает метаданные и укладывает файл в IMAGE_MAX_BYTES. Формат и
+    имя файла сохраняются, кроме редких форматов: они переводятся
+    в JPEG. Анимированные картинки не перекодируются.
+    Возвращает новый файл и его ширину, высоту и размер в байтах.
+    """
+    if upload.size > IMAGE_UPLOAD_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            params={'limit': IMAGE_UPLOAD_MAX_BYTES // 2 ** 20},
+            code='file_too_large',
+        )
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+        image_format = image.format
+        if getattr(image, 'is_animated', False):
+            upload.seek(0)
+            return upload, image.width, image.height, upload.size
+        image.draft('RGB', (IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.LANCZOS)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Не удалось прочитать изображение.', code='invalid_image',
+        )
+    name = os.path.basename(upload.name)
+    if image_format not in CONTENT_TYPES:
+        image_format = 'JPEG'
+        name = os.path.splitext(name)[0] + '.jpg'
+    image, data = _fit_budget(image, image_format)
+    normalized = SimpleUploadedFile(
+        name, data, content_type=CONTENT_TYPES[image_format]
+    )
+
+    return normalized, image.width, image.height, len(data)
@@ -14,6 +14,11 @@ urlpatterns = [
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/', views.post_comments,
+        name='post_comments'
+    ),
+    path('search/', views.search, name='search'),
     path('follow/', views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/', views.profile_follow,
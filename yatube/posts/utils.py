@@ -1,11 +1,46 @@
-from django.core.paginator import Paginator
+from . import counters
+from .caching import attach_versions
+from .constants import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+from .paginators import CountedPaginator, CursorPaginator
 
-from .constants import POSTS_PER_PAGE
 
+def pagination(request, post_list, feed=None, cursor_paginator=None):
+    """
+    Функция-обработчик организации контента на странице.
 
-def pagination(request, post_list):
-    """Функция-обработчик организации контента на странице."""
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
+    По умолчанию лента листается курсором `?cursor=`, номера страниц
+    используются, только если они явно запрошены через `?page=`.
+    Число постов для номеров страниц берется из кеша счетчиков
+    ленты `feed` (см. posts.counters). Вместо курсорного вывода по
+    post_list можно передать готовый `cursor_paginator`.
+    Постам и странице проставляются версии для фрагментного кеша.
+    """
     page_number = request.GET.get('page')
+    if page_number is not None:
+        if feed is None:
+            def count():
+                return post_list.count()
+        else:
+            def count():
+                return counters.get_count(feed, post_list)
+        paginator = CountedPaginator(post_list, POSTS_PER_PAGE, count)
 
-    return paginator.get_page(page_number)
+        return attach_versions(paginator.get_page(page_number))
+
+    paginator = cursor_paginator or CursorPaginator(post_list, POSTS_PER_PAGE)
+
+    return attach_versions(paginator.get_page(request.GET.get('cursor')))
+
+
+def comment_page(post, cursor=None):
+    """
+    Страница комментариев к посту, от новых к старым.
+    Следующая страница запрашивается токеном `next_cursor` пагинатора.
+    """
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        COMMENTS_PER_PAGE,
+        ordering=('-created', '-id'),
+    )
+
+    return paginator.get_page(cursor)
@@ -0,0 +1,92 @@
+import json
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .constants import VARIANT_FORMATS, VARIANT_QUALITY, VARIANT_WIDTHS
+from .models import Post
+
+VARIANTS_DIR = 'variants'
+
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+}
+
+
+def available_formats():
+    """Форматы из VARIANT_FORMATS, которые умеет сохранять Pillow."""
+    Image.init()
+    return [name for name in VARIANT_FORMATS if name in Image.SAVE]
+
+
+def fallback_format(image):
+    """Формат запасного варианта для браузеров без WebP/AVIF."""
+    return image.format if image.format in ('JPEG', 'PNG', 'GIF') else 'JPEG'
+
+
+def variant_widths(width):
+    """Ширины вариантов: из VARIANT_WIDTHS меньше исходной и сама исходная."""
+    widths = {size for size in VARIANT_WIDTHS if size < width}
+    widths.add(min(width, max(VARIANT_WIDTHS)))
+    return sorted(widths)
+
+
+def variant_name(name, width, image_format):
+    stem = os.path.splitext(name)[0]
+    return f'{VARIANTS_DIR}/{stem}_{width}w.{image_format.lower()}'
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=VARIANT_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def build_variants(name, storage=default_storage):
+    """
+    Сохраняет уменьшенные копии изображения во всех ширинах и форматах.
+    Возвращает список словарей с именем файла, шириной и форматом.
+    """
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image.load()
+    formats = available_formats() + [fallback_format(image)]
+    variants = []
+    for width in variant_widths(image.width):
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.resize((width, height), Image.LANCZOS)
+        for image_format in formats:
+            saved_name = storage.save(
+                variant_name(name, width, image_format),
+                _encode(resized, image_format),
+            )
+            variants.append({
+                'name': saved_name, 'width': width, 'format': image_format,
+            })
+
+    return variants
+
+
+def save_variants(post_id, name):
+    """
+    Строит варианты картинки поста и записывает их имена в пост,
+    если картинка за это время не сменилась. Варианты той же картинки
+    у другого поста используются повторно.
+    """
+    post = Post.objects.filter(pk=post_id, image=name).first()
+    if post is None:
+        return
+    shared = Post.objects.filter(image=name).exclude(
+        image_variants=''
+    ).values_list('image_variants', flat=True).first()
+    post.image_variants = shared or json.dumps(build_variants(name))
+    post.save(update_fields=['image_variants'])
@@ -1,27 +1,47 @@
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render, get_object_or_404, redirect
-
-from .models import User, Post, Group, Follow
-from .forms import PostForm, CommentForm
-from .utils import pagination
+from django.db import transaction
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
 
+from core.queries import query_budget
 
+from .models import Post, Follow
+from .forms import PostForm, CommentForm
+from .caching import attach_versions, get_author, get_group, get_post
+from .conditional import (conditional_page, group_state, index_state,
+                          page_object, post_state, profile_state)
+from .counters import feed
+from .constants import POSTS_PER_PAGE
+from .pagecache import anonymous_page_cache
+from .paginators import CountedPaginator
+from .search import search_posts
+from .stats import get_author_stats
+from .timeline import TimelinePaginator, fanout_enabled
+from .utils import comment_page, pagination
+
+
+@query_budget(10)
+@conditional_page(index_state)
+@anonymous_page_cache
 def index(request):
     """Функция-обработчик главной страницы проекта."""
     template = 'posts/index.html'
     post_list = Post.objects.select_related('group', 'author')
-    page_obj = pagination(request, post_list)
+    page_obj = pagination(request, post_list, feed('all'))
     context = {'page_obj': page_obj}
 
     return render(request, template, context)
 
 
+@query_budget(10)
+@conditional_page(group_state)
+@anonymous_page_cache
 def group_posts(request, slug):
     """Функция-обработчик страницы сообществ."""
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
+    group = page_object(request, get_group, slug)
     post_list = group.posts.select_related('group', 'author')
-    page_obj = pagination(request, post_list)
+    page_obj = pagination(request, post_list, feed('group', group.pk))
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -30,18 +50,22 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@query_budget(20)
+@conditional_page(profile_state)
+@anonymous_page_cache
 def profile(request, username):
     """Функция-обработчик персональной страницы автора."""
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
+    author = page_object(request, get_author, username)
     user = request.user
     post_list = author.posts.select_related('group', 'author')
-    page_obj = pagination(request, post_list)
+    page_obj = pagination(request, post_list, feed('author', author.pk))
     following = user.is_authenticated and Follow.objects.filter(
         user=user, author=author
     ).exists()
     context = {
         'author': author,
+        'stats': get_author_stats(author),
         'page_obj': page_obj,
         'following': following,
     }
@@ -49,14 +73,18 @@ def profile(request, username):
     return render(request, template, context)
 
 
+@query_budget(7)
+@conditional_page(post_state)
+@anonymous_page_cache
 def post_detail(request, post_id):
     """Функция-обработчик страницы для просмотра отдельного поста."""
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = page_object(request, get_post, post_id)
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = comment_page(post)
     context = {
         'post': post,
+        'author_stats': get_author_stats(post.author),
         'form': form,
         'comments': comments,
     }
@@ -64,6 +92,56 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+@query_budget(8)
+def search(request):
+    """
+    Функция-обработчик поиска по постам: `?q=` - запрос,
+    результаты идут от более к менее релевантным.
+    """
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    results = search_posts(query)
+    paginator = CountedPaginator(results, POSTS_PER_PAGE, results.count)
+    page_obj = attach_versions(paginator.get_page(request.GET.get('page')))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+
+    return render(request, template, context)
+
+
+@query_budget(4)
+def post_comments(request, post_id):
+    """
+    Функция-обработчик для подгрузки следующих страниц комментариев.
+
+    Отдает HTML-фрагмент, а при `?format=json` - JSON со списком
+    комментариев и токеном следующей страницы.
+    """
+    post = get_post(post_id)
+    comments = comment_page(post, request.GET.get('cursor'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.paginator.next_cursor,
+        })
+
+    return render(request, 'posts/includes/comment_list.html', {
+        'post': post,
+        'comments': comments,
+    })
+
+
+@query_budget(16)
 @login_required
 def post_create(request):
     """Функция-обработчик создания нового поста."""
@@ -75,19 +153,22 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        with transaction.atomic():
+            post.save()
 
         return redirect('posts:profile', username=post.author)
 
     return render(request, template, {'form': form})
 
 
+@query_budget(15)
 @login_required
 def post_edit(request, post_id):
     """Функция-обработчик для редактирования поста."""
     template = 'posts/create_post.html'
+    # Пост из кеша может быть устаревшим: сохраняем прочитанный из базы.
     post = get_object_or_404(Post, pk=post_id)
-    if request.user != post.author:
+    if request.user.pk != post.author_id:
 
         return redirect('posts:post_detail', post_id)
 
@@ -99,7 +180,8 @@ def post_edit(request, post_id):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        with transaction.atomic():
+            post.save()
 
         return redirect('posts:post_detail', post_id)
 
@@ -110,20 +192,23 @@ def post_edit(request, post_id):
     })
 
 
+@query_budget(10)
 @login_required
 def add_comment(request, post_id):
     """Добавление комментария к посту"""
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_post(post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
 
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(12)
 @login_required
 def follow_index(request):
     """
@@ -134,29 +219,42 @@ def follow_index(request):
     posts_to_sign = Post.objects.filter(
         author__following__user=request.user
     ).select_related('author', 'group')
-    page_obj = pagination(request, posts_to_sign)
+    timeline = None
+    if fanout_enabled():
+        timeline = TimelinePaginator(
+            Post.objects.select_related('author', 'group'),
+            POSTS_PER_PAGE,
+            request.user,
+        )
+    page_obj = pagination(
+        request, posts_to_sign, feed('follow', request.user.pk), timeline
+    )
     context = {'page_obj': page_obj}
 
     return render(request, template, context)
 
 
+@query_budget(16)
 @login_required
 def profile_follow(request, username):
     """Функция-обработчик, позволяющая подписаться на автора."""
-    author = get_object_or_404(User, username=username)
+    author = get_author(username)
     if request.user != author and request.user.is_authenticated:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=author,
-        )
+        with transaction.atomic():
+            Follow.objects.get_or_create(
+                user=request.user,
+                author=author,
+            )
 
     return redirect('posts:follow_index')
 
 
+@query_budget(12)
 @login_required
 def profile_unfollow(request, username):
     """Функция-обработчик, позволяющая отписаться от автора."""
-    author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    author = get_author(username)
+    with transaction.atomic():
+        Follow.objects.filter(user=request.user, author=author).delete()
 
     return redirect('posts:index')
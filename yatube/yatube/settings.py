@@ -33,10 +33,13 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryInstrumentationMiddleware',
+    'core.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,13 +75,44 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Бэкенд SQLite с профилем настроек (core/backends/sqlite3):
+# SQLITE_PROFILE=tuned - WAL, прагмы и повтор при блокировке,
+# stock - поведение Django по умолчанию. SQLITE_PRAGMAS дополняет
+# прагмы профиля. Соединения живут DATABASE_CONN_MAX_AGE секунд.
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'tuned')
+SQLITE_PRAGMAS = {}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 60)),
     }
 }
 
+# Реплики для чтения задаются через окружение списком файлов SQLite
+# через запятую, например:
+# DATABASE_REPLICA_FILES=/var/lib/yatube/replica1.sqlite3
+# Реплики только читаются: миграции и записи идут в основную базу.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICA_FILES', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+# Модели этих приложений читаются из реплик.
+DATABASE_REPLICA_APPS = ('posts',)
+# Сколько секунд после изменяющего запроса пользователь читает
+# основную базу, чтобы видеть свои записи.
+DATABASE_REPLICA_PIN_SECONDS = 10
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,10 +148,27 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Общий для всех воркеров кеш задается через окружение, например:
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# CACHE_LOCATION=/var/tmp/yatube_cache
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+POSTS_FOLLOW_FANOUT = True
+
+# Миниатюры строятся в фоне, до готовности шаблоны получают заглушку.
+THUMBNAIL_BACKEND = 'posts.thumbnails.AsyncThumbnailBackend'
+# В режиме отладки миниатюры и варианты картинок строятся сразу после
+# фиксации транзакции в том же потоке, без пула.
+POSTS_IMAGES_IN_BACKGROUND = not DEBUG
 
+# Превышение @query_budget: True - исключение, False - запись в журнал.
+# manage.py test включает строгий режим через StrictQueryBudgetRunner.
+QUERY_BUDGET_STRICT = False
+TEST_RUNNER = 'core.runner.StrictQueryBudgetRunner'
@@ -3,6 +3,8 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import query_summary
+
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
@@ -10,6 +12,8 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/', include('api.urls', namespace='api')),
+    path('queries/', query_summary, name='query_summary'),
 ]
 
 handler404 = 'core.views.page_not_found'